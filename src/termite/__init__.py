@@ -1 +1 @@
-from . import game, map, units
\ No newline at end of file
+from . import game, map, units, storage, spatial, targeting, vec_env, spaces, subproc_env, gym_env, snapshot, journal, zobrist, replay, corpus, divergence, benchmark, instrumentation, events, recorder, geometry, threat, decisions
@@ -0,0 +1,248 @@
+"""
+Benchmarks of the simulator on fixed scenarios.
+
+Each :class:`Scenario` plays a number of turns or whole games between scripted players, and measures
+throughput (frames, action phases, turns and games per second), peak memory, and the time spent in
+``TerminalGame.deploy_phase``, ``TerminalGame.action_phase`` and ``Pathfinder.find_path``. Phase times are
+inclusive: path finding is part of the action phase.
+
+Results are saved as a JSON baseline and compared against it::
+
+    python -m termite.benchmark --save baseline.json
+    python -m termite.benchmark --compare baseline.json --threshold 0.1
+
+Comparing exits with status 1 if a scenario got slower, or used more memory, by more than the threshold.
+"""
+import argparse
+import functools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Type
+
+from .game import Player, TerminalGame
+from .units import Unit, Demolisher, Interceptor, MobileUnit, Scout, Structure, Support, Turret, Wall
+
+def _mirror(side: str, position: Tuple[int, int]) -> Tuple[int, int]:
+    x, y = position
+    return (x, y) if side == 'bottom' else (27 - x, 27 - y)
+
+class RushPlayer(Player):
+    """
+    Builds a fixed layout of structures on the first turn, then spends all its mobile points on one
+    unit type every turn. Positions are given for the bottom player and mirrored for the top one.
+    """
+    def __init__(self, unit_type: Type[MobileUnit] = Scout, spawn: Tuple[int, int] = (13, 0),
+                 structures: Sequence[Tuple[Type[Structure], Tuple[int, int]]] = ()):
+        super().__init__()
+        self.unit_type = unit_type
+        self.spawn = spawn
+        self.structures = structures
+
+    def deploy(self, game_state: dict) -> List[Tuple[Unit, Tuple[int, int]]]:
+        deployments = []
+        if game_state['current_turn'] == 0:
+            deployments += [(unit_type(), _mirror(self.side, position)) for unit_type, position in self.structures]
+        count = int(self.mobile_points // self.unit_type().cost)
+        deployments += [(self.unit_type(), _mirror(self.side, self.spawn)) for _ in range(count)]
+        return deployments
+
+class ScriptedPlayer(Player):
+    """
+    Builds a small defense, reinforces it over the game, and sends a different attack every turn.
+    """
+    def deploy(self, game_state: dict) -> List[Tuple[Unit, Tuple[int, int]]]:
+        turn = game_state['current_turn']
+        mirror = functools.partial(_mirror, self.side)
+        deployments = []
+        if turn == 0:
+            deployments += [(Wall(), mirror((x, 12))) for x in (3, 4, 23, 24)]
+            deployments += [(Turret(), mirror((4, 11))), (Turret(), mirror((23, 11))), (Support(), mirror((13, 6)))]
+        elif turn % 5 == 0 and turn <= 50:
+            x = 6 + (turn // 5) * 2 % 16
+            deployments.append((Turret(), mirror((x, 10))))
+        attack = (turn + (0 if self.side == 'bottom' else 1)) % 3
+        if attack == 0:
+            deployments += [(Scout(), mirror((13, 0))) for _ in range(int(self.mobile_points))]
+        elif attack == 1:
+            deployments += [(Demolisher(), mirror((6, 7))) for _ in range(int(self.mobile_points // 3))]
+        else:
+            deployments += [(Interceptor(), mirror((20, 6))), (Scout(), mirror((8, 5))), (Scout(), mirror((8, 5)))]
+        return deployments
+
+# Two rows of walls with openings at opposite ends, so that attackers zig-zag, and turrets behind them.
+_MAZE = ([(Wall, (x, 12)) for x in range(1, 24)] + [(Wall, (x, 9)) for x in range(7, 24)]
+         + [(Turret, (x, 10)) for x in range(8, 24, 3)] + [(Turret, (x, 13)) for x in range(4, 24, 4)])
+_SUPPORTS = [(Support, (x, 5)) for x in range(11, 17)] + [(Wall, (x, 13)) for x in range(6, 22, 2)]
+
+class Scenario(NamedTuple):
+    """
+    A benchmark workload: ``games`` games set up by ``setup``, each played for ``turns`` turns or until it is over.
+    """
+    name: str
+    setup: Callable[[], TerminalGame]
+    turns: int
+    games: int = 1
+
+def _game(player1: Player, player2: Player, structure_points: float = 40, health: float = 30) -> TerminalGame:
+    game = TerminalGame(player1, player2)
+    for player in (game.player1, game.player2):
+        player.structure_points = structure_points
+        player.health = health
+    return game
+
+SCENARIOS = (
+    Scenario('scout_rush', lambda: _game(RushPlayer(Scout), RushPlayer(Scout)), turns=20, games=4),
+    Scenario('heavy_maze', lambda: _game(RushPlayer(Scout, structures=_MAZE), RushPlayer(Scout, structures=_MAZE),
+                                         structure_points=200), turns=20, games=4),
+    Scenario('demolisher_push', lambda: _game(RushPlayer(Demolisher, structures=_SUPPORTS),
+                                              RushPlayer(Demolisher, structures=_SUPPORTS), structure_points=60), turns=20, games=4),
+    Scenario('interceptor_defence', lambda: _game(RushPlayer(Scout), RushPlayer(Interceptor, spawn=(20, 6))),
+             turns=20, games=4),
+    # Enough health for the games to last the 100 turns.
+    Scenario('full_games', lambda: _game(ScriptedPlayer(), ScriptedPlayer(), health=1000), turns=100, games=2),
+)
+
+class _PhaseTimer:
+    """
+    Wraps methods of one game to accumulate their wall time and number of calls.
+    """
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+
+    def wrap(self, obj: object, method: str, name: str) -> None:
+        function = getattr(obj, method)
+        self.seconds.setdefault(name, 0.0)
+        self.calls.setdefault(name, 0)
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.seconds[name] += time.perf_counter() - start
+                self.calls[name] += 1
+        setattr(obj, method, timed)
+
+def _play(scenario: Scenario, timer: Optional[_PhaseTimer] = None) -> Tuple[int, int, int, int]:
+    """
+    Play a scenario. Returns the number of frames, action phases, turns and games played.
+    """
+    frames = action_phases = turns = 0
+    for _ in range(scenario.games):
+        game = scenario.setup()
+        if timer is not None:
+            timer.wrap(game, 'deploy_phase', 'deploy_phase')
+            timer.wrap(game, 'action_phase', 'action_phase')
+            timer.wrap(game.pathfinder, 'find_path', 'find_path')
+        start_frame = game.frame_count
+        for _ in range(scenario.turns):
+            game.play_turn()
+            turns += 1
+            action_phases += 1
+            if game.is_game_over():
+                break
+        frames += game.frame_count - start_frame
+    return frames, action_phases, turns, scenario.games
+
+def run_scenario(scenario: Scenario, memory: bool = True) -> Dict:
+    """
+    Benchmark one scenario.
+
+    :param memory: Also play the scenario under ``tracemalloc`` to measure its peak memory, in a second run
+        so that tracing does not slow down the timed one.
+    """
+    timer = _PhaseTimer()
+    start = time.perf_counter()
+    frames, action_phases, turns, games = _play(scenario, timer)
+    seconds = time.perf_counter() - start
+    peak_memory = None
+    if memory:
+        tracemalloc.start()
+        try:
+            _play(scenario)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {
+        'seconds': seconds,
+        'frames': frames,
+        'frames_per_second': frames / seconds,
+        'action_phases_per_second': action_phases / seconds,
+        'turns_per_second': turns / seconds,
+        'games_per_second': games / seconds,
+        'peak_memory_bytes': peak_memory,
+        'phases': {name: {'seconds': timer.seconds[name], 'calls': timer.calls[name]} for name in timer.seconds},
+    }
+
+def run(scenarios: Sequence[Scenario] = SCENARIOS, memory: bool = True) -> Dict:
+    """
+    Benchmark scenarios. Returns the results by scenario name, with a description of the machine.
+    """
+    return {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'scenarios': {scenario.name: run_scenario(scenario, memory) for scenario in scenarios},
+    }
+
+def compare(results: Dict, baseline: Dict, threshold: float = 0.1) -> List[str]:
+    """
+    Returns a description of every regression of the results against the baseline: a drop in frames per second,
+    or an increase of peak memory, by more than ``threshold`` (relative). Scenarios missing from either are skipped.
+    """
+    regressions = []
+    for name, result in results['scenarios'].items():
+        reference = baseline['scenarios'].get(name)
+        if reference is None:
+            continue
+        speed, reference_speed = result['frames_per_second'], reference['frames_per_second']
+        if speed < reference_speed * (1 - threshold):
+            regressions.append(f"{name}: {speed:.0f} frames/s, down {1 - speed / reference_speed:.0%} "
+                               f"from {reference_speed:.0f}")
+        memory, reference_memory = result['peak_memory_bytes'], reference['peak_memory_bytes']
+        if memory is not None and reference_memory is not None and memory > reference_memory * (1 + threshold):
+            regressions.append(f"{name}: peak memory {memory / 2 ** 20:.1f} MiB, up {memory / reference_memory - 1:.0%} "
+                               f"from {reference_memory / 2 ** 20:.1f} MiB")
+    return regressions
+
+def format_results(results: Dict) -> str:
+    lines = []
+    for name, result in results['scenarios'].items():
+        phases = ', '.join(f"{phase} {values['seconds']:.2f}s/{values['calls']}"
+                           for phase, values in result['phases'].items())
+        memory = result['peak_memory_bytes']
+        lines.append(f"{name:20s} {result['frames_per_second']:9.0f} frames/s {result['action_phases_per_second']:7.1f} "
+                     f"action phases/s {result['games_per_second']:6.2f} games/s"
+                     + (f" {memory / 2 ** 20:6.1f} MiB" if memory is not None else '') + f"  ({phases})")
+    return '\n'.join(lines)
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the simulator.")
+    parser.add_argument('--scenarios', nargs='+', choices=[scenario.name for scenario in SCENARIOS],
+                        help="Scenarios to run (default: all).")
+    parser.add_argument('--save', help="Write the results to this JSON file.")
+    parser.add_argument('--compare', help="Compare the results with this JSON baseline.")
+    parser.add_argument('--threshold', type=float, default=0.1, help="Relative change flagged as a regression.")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the peak memory measurement.")
+    args = parser.parse_args(argv)
+
+    scenarios = [scenario for scenario in SCENARIOS if args.scenarios is None or scenario.name in args.scenarios]
+    results = run(scenarios, memory=not args.no_memory)
+    print(format_results(results))
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for regression in regressions:
+            print("Regression:", regression)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+Memory-mapped corpus of replay turns, for imitation learning.
+
+:func:`build_corpus` converts replays into a directory of shards. Every shard holds, for each turn of
+its replays, the structures on the board at the start of the turn with the stats of both players, and
+the deployments of both players that turn, as plain ``.npy`` files:
+
+- ``boards.npy``: (turns, 28, 28) array of ``TILE_DTYPE``, indexed [y, x];
+- ``stats.npy``: (turns, 2, 4) float32 array of health, structure points, mobile points and computation time;
+- ``deployments.npy``: array of ``DEPLOYMENT_DTYPE``, the deployments of turn ``i`` of the shard being rows
+  ``deployment_offsets[i]:deployment_offsets[i + 1]``, in the order the engine spawned them.
+
+Deployment codes are the replay spawn codes: unit type codes 0-5, 6 to remove a structure and 7 to upgrade one.
+``index.npy`` maps every turn of the corpus, sorted by (replay, turn), to its shard and row, and
+``replays.json`` lists the source replays. :class:`ReplayCorpus` opens the shards memory-mapped, so that
+random turns are read without copying or parsing JSON.
+
+Shards are built in parallel, one task per shard.
+"""
+import json
+import multiprocessing as mp
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .replay import REMOVE_CODE, UPGRADE_CODE, ReplayReader
+
+WIDTH = HEIGHT = 28
+NO_STRUCTURE = -1
+
+# What is on a tile at the start of a turn. Type is NO_STRUCTURE on empty tiles, player is 1 or 2.
+TILE_DTYPE = np.dtype([('type', np.int8), ('player', np.int8), ('health', np.float32),
+                       ('upgraded', np.bool_), ('removing', np.bool_)])
+DEPLOYMENT_DTYPE = np.dtype([('player', np.int8), ('code', np.int8), ('x', np.int8), ('y', np.int8)])
+INDEX_DTYPE = np.dtype([('replay', np.int32), ('turn', np.int32), ('shard', np.int32), ('row', np.int32)])
+
+class CorpusTurn(NamedTuple):
+    """
+    One turn of a replay, as views into the memory-mapped shards.
+    """
+    board: np.ndarray
+    stats: np.ndarray
+    deployments: np.ndarray
+
+def _write_board(board: np.ndarray, units: np.ndarray) -> None:
+    board['type'] = NO_STRUCTURE
+    structures = units[units['type'] < REMOVE_CODE]
+    tiles = np.zeros(len(structures), dtype=TILE_DTYPE)
+    tiles['type'] = structures['type']
+    tiles['player'] = structures['player']
+    tiles['health'] = structures['health']
+    board[structures['y'], structures['x']] = tiles
+    for code, flag in ((UPGRADE_CODE, 'upgraded'), (REMOVE_CODE, 'removing')):
+        marked = units[units['type'] == code]
+        board[flag][marked['y'], marked['x']] = True
+
+def read_turns(path: str) -> Tuple[np.ndarray, np.ndarray, List[np.ndarray], Dict[str, Any]]:
+    """
+    Extract the turns of one replay.
+
+    The board and stats of a turn come from its deploy-phase frame, and its deployments from the spawn
+    events of its first action frame.
+
+    :return: The boards, stats, deployments of every turn, and the end stats of the replay.
+    """
+    boards, stats, deployments = [], [], []
+    with ReplayReader(path) as reader:
+        for frame in reader:
+            phase, _, frame_in_turn, _ = frame.turn_info.tolist()
+            if phase == 0:
+                board = np.zeros((HEIGHT, WIDTH), dtype=TILE_DTYPE)
+                _write_board(board, frame.units)
+                boards.append(board)
+                stats.append(frame.stats)
+                deployments.append(np.zeros(0, dtype=DEPLOYMENT_DTYPE))
+            elif phase == 1 and frame_in_turn == 0 and boards:
+                spawns = frame.events['spawn']
+                rows = np.zeros(len(spawns), dtype=DEPLOYMENT_DTYPE)
+                rows['player'], rows['code'], rows['x'], rows['y'] = (spawns['player'], spawns['type'],
+                                                                      spawns['x'], spawns['y'])
+                deployments[-1] = rows
+        end_stats = reader.end_stats or {}
+    return (np.array(boards, dtype=TILE_DTYPE).reshape(-1, HEIGHT, WIDTH),
+            np.array(stats, dtype=np.float32).reshape(-1, 2, 4), deployments, end_stats)
+
+def _build_shard(directory: str, paths: Sequence[str]) -> List[Dict[str, Any]]:
+    """
+    Write one shard from a list of replays. Returns the description of each replay, with its number of turns.
+    """
+    os.makedirs(directory, exist_ok=True)
+    boards, stats, deployments, replays = [], [], [], []
+    for path in paths:
+        replay_boards, replay_stats, replay_deployments, end_stats = read_turns(path)
+        boards.append(replay_boards)
+        stats.append(replay_stats)
+        deployments.extend(replay_deployments)
+        replays.append({'path': os.path.abspath(path), 'turns': len(replay_boards),
+                        'winner': end_stats.get('winner'),
+                        'names': [end_stats.get(player, {}).get('name') for player in ('player1', 'player2')]})
+    offsets = np.zeros(len(deployments) + 1, dtype=np.int64)
+    np.cumsum([len(rows) for rows in deployments], out=offsets[1:])
+    np.save(os.path.join(directory, 'boards.npy'), np.concatenate(boards))
+    np.save(os.path.join(directory, 'stats.npy'), np.concatenate(stats))
+    np.save(os.path.join(directory, 'deployments.npy'),
+            np.concatenate(deployments) if deployments else np.zeros(0, dtype=DEPLOYMENT_DTYPE))
+    np.save(os.path.join(directory, 'deployment_offsets.npy'), offsets)
+    return replays
+
+def _shard_name(shard: int) -> str:
+    return f'shard-{shard:05d}'
+
+def build_corpus(paths: Sequence[str], directory: str, replays_per_shard: int = 256, processes: Optional[int] = None,
+                 context: Optional[mp.context.BaseContext] = None) -> None:
+    """
+    Convert replays into a corpus.
+
+    :param paths: The replay files, numbered in this order in the index.
+    :param directory: The output directory.
+    :param replays_per_shard: The number of replays in each shard.
+    :param processes: The number of worker processes. Defaults to the number of CPUs.
+    :param context: The multiprocessing context used to start the workers. Defaults to the platform default.
+    """
+    paths = list(paths)
+    chunks = [paths[start:start + replays_per_shard] for start in range(0, len(paths), replays_per_shard)]
+    tasks = [(os.path.join(directory, _shard_name(shard)), chunk) for shard, chunk in enumerate(chunks)]
+    os.makedirs(directory, exist_ok=True)
+    context = context or mp.get_context()
+    with context.Pool(processes) as pool:
+        shards = pool.starmap(_build_shard, tasks)
+
+    index = []
+    replays = []
+    for shard, shard_replays in enumerate(shards):
+        row = 0
+        for replay in shard_replays:
+            turns = replay['turns']
+            index.append(np.array([(len(replays), turn, shard, row + turn) for turn in range(turns)], dtype=INDEX_DTYPE))
+            replays.append(replay)
+            row += turns
+    np.save(os.path.join(directory, 'index.npy'), np.concatenate(index) if index else np.zeros(0, dtype=INDEX_DTYPE))
+    with open(os.path.join(directory, 'replays.json'), 'w') as file:
+        json.dump({'num_shards': len(shards), 'replays': replays}, file)
+
+class ReplayCorpus:
+    """
+    Read-only, memory-mapped view of a corpus written by :func:`build_corpus`.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, 'replays.json')) as file:
+            metadata = json.load(file)
+        self.replays: List[Dict[str, Any]] = metadata['replays']
+        self.index: np.ndarray = np.load(os.path.join(directory, 'index.npy'), mmap_mode='r')
+        self._shards = []
+        for shard in range(metadata['num_shards']):
+            shard_directory = os.path.join(directory, _shard_name(shard))
+            self._shards.append(tuple(np.load(os.path.join(shard_directory, f'{name}.npy'), mmap_mode='r')
+                                      for name in ('boards', 'stats', 'deployments', 'deployment_offsets')))
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, position: int) -> CorpusTurn:
+        """
+        Returns the turn at a position of the index, from 0 to ``len(corpus) - 1``.
+        """
+        entry = self.index[position]
+        boards, stats, deployments, offsets = self._shards[entry['shard']]
+        row = entry['row']
+        return CorpusTurn(boards[row], stats[row], deployments[offsets[row]:offsets[row + 1]])
+
+    def position(self, replay: int, turn: int) -> int:
+        """
+        Returns the position in the index of a turn of a replay.
+
+        :raises KeyError: If the corpus does not have that turn.
+        """
+        position = int(np.searchsorted(self.index['replay'], replay))
+        if position < len(self.index) and self.index[position]['replay'] == replay \
+                and 0 <= turn < self.replays[replay]['turns']:
+            return position + turn
+        raise KeyError((replay, turn))
+
+    def turn(self, replay: int, turn: int) -> CorpusTurn:
+        """
+        Returns a turn of a replay.
+        """
+        return self[self.position(replay, turn)]
+
+    def sample(self, rng: np.random.Generator, size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the boards and stats of turns drawn uniformly at random, with their positions in the index
+        for looking up deployments. Turns are sorted by position, so that shards are read sequentially.
+
+        :return: (boards, stats, positions).
+        """
+        positions = np.sort(rng.integers(len(self.index), size=size))
+        entries = self.index[positions]
+        boards = np.empty((size, HEIGHT, WIDTH), dtype=TILE_DTYPE)
+        stats = np.empty((size, 2, 4), dtype=np.float32)
+        for shard, (shard_boards, shard_stats, _, _) in enumerate(self._shards):
+            selected = entries['shard'] == shard
+            if selected.any():
+                rows = entries['row'][selected]
+                boards[selected] = shard_boards[rows]
+                stats[selected] = shard_stats[rows]
+        return boards, stats, positions
@@ -0,0 +1,165 @@
+"""
+Asking the players for their actions, with measured and limited computation time.
+
+Every game owns a :class:`DecisionRunner` (``game.decisions``), through which the deploy and upgrade phases call
+:meth:`Player.deploy` and :meth:`Player.upgrade`. The runner measures the wall time of every call, accumulates
+it per player, and enforces an optional budget per player and turn, shared by the deploy and upgrade calls.
+A call finishing after its deadline is a timeout: its actions are dropped for the turn. The accumulated time
+breaks ties in :meth:`TerminalGame.get_winner`, as in Terminal: the player who used less time wins.
+
+By default the players are asked one after the other, as before: player 2 decides after player 1's deployments
+are placed, and a late call can only be detected once it returns. A concurrent runner asks both players at
+once, on the same state, through an executor. Each player then gets the state of its own clone of the game,
+which the engine never touches::
+
+    game = TerminalGame(player1, player2)
+    with DecisionRunner(turn_budget=5.0, concurrent=True) as game.decisions:
+        while not game.is_game_over():
+            game.play_turn()
+
+Concurrent calls stop being waited for at their deadline. A late call keeps running in the background, and
+the player is not asked again until it returns. The default thread pool only runs the players in parallel
+when they release the GIL, e.g. in numpy or torch, or while waiting on an engine in another process; pure
+Python players still take turns on the interpreter, and only gain the deadline.
+
+Computation time is measured, not simulated: it is not part of snapshots, the journal or the state hash.
+"""
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, TimeoutError
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+def _timed(function: Callable[[Any], list], argument: Any) -> Tuple[list, float]:
+    # Timed in the worker, so that time spent queued for it is not charged to the player.
+    start = time.perf_counter()
+    result = function(argument)
+    return result, time.perf_counter() - start
+
+class DecisionRunner:
+    """
+    Calls the decision methods of both players and accounts for their computation time.
+
+    Players are indexed by 0 for player 1 (bottom) and 1 for player 2 (top).
+    """
+    def __init__(self, turn_budget: Optional[float] = None, concurrent: bool = False,
+                 executor: Optional[Executor] = None):
+        """
+        :param turn_budget: The seconds each player may spend deciding per turn, or None for no limit.
+        :param concurrent: Ask both players at once. Implied by an executor.
+        :param executor: The executor running concurrent calls. Defaults to a thread pool of two workers,
+            shut down by :meth:`close`. Executors given are left to the caller to shut down.
+        """
+        self.turn_budget = turn_budget
+        self.concurrent = concurrent or executor is not None
+        self._owns_executor = self.concurrent and executor is None
+        if self._owns_executor:
+            executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='termite-player')
+        self.executor = executor
+        # Seconds spent by each player, over the game and in the current turn.
+        self.computation_time = [0.0, 0.0]
+        self.turn_time = [0.0, 0.0]
+        # Calls that missed their deadline, by player.
+        self.timeouts = [0, 0]
+        # Late concurrent calls still running, by player.
+        self._late: List[Optional[Future]] = [None, None]
+
+    def start_turn(self) -> None:
+        """
+        Give both players their full budget for a new turn.
+        """
+        self.turn_time = [0.0, 0.0]
+
+    def remaining(self, player: int) -> Optional[float]:
+        """
+        Returns the seconds a player has left this turn, or None if there is no budget.
+        """
+        if self.turn_budget is None:
+            return None
+        return max(self.turn_budget - self.turn_time[player], 0.0)
+
+    def _charge(self, player: int, seconds: float) -> None:
+        self.turn_time[player] += seconds
+        self.computation_time[player] += seconds
+
+    def _busy(self, player: int) -> bool:
+        late = self._late[player]
+        if late is not None and late.done():
+            late = self._late[player] = None
+        return late is not None or self.remaining(player) == 0.0
+
+    def call(self, player: int, function: Callable[[Any], list], argument: Any) -> list:
+        """
+        Call a decision method of one player in the calling thread.
+
+        :param player: The index of the player.
+        :param function: The bound decision method, e.g. ``player.deploy``.
+        :param argument: Its argument, the game state.
+        :return: The result, or an empty list if the call missed its deadline.
+        """
+        if self._busy(player):
+            self.timeouts[player] += 1
+            return []
+        remaining = self.remaining(player)
+        result, seconds = _timed(function, argument)
+        if remaining is not None and seconds > remaining:
+            self._charge(player, remaining)
+            self.timeouts[player] += 1
+            return []
+        self._charge(player, seconds)
+        return result
+
+    def call_all(self, functions: Sequence[Callable[[Any], list]], arguments: Sequence[Any]) -> List[list]:
+        """
+        Call a decision method of both players, concurrently if the runner is, and wait for them until
+        their deadlines.
+
+        :param functions: The bound decision methods of player 1 and player 2.
+        :param arguments: Their arguments, the game states. Give each player its own, which nothing else
+            changes: a call missing its deadline keeps reading it.
+        :return: The results, with empty lists for the calls that missed their deadline.
+        """
+        if not self.concurrent:
+            return [self.call(player, function, argument)
+                    for player, (function, argument) in enumerate(zip(functions, arguments))]
+        start = time.perf_counter()
+        futures: List[Optional[Future]] = []
+        for player, (function, argument) in enumerate(zip(functions, arguments)):
+            futures.append(None if self._busy(player) else self.executor.submit(_timed, function, argument))
+        results = []
+        for player, future in enumerate(futures):
+            if future is None:
+                self.timeouts[player] += 1
+                results.append([])
+                continue
+            remaining = self.remaining(player)
+            try:
+                wait = None if remaining is None else max(start + remaining - time.perf_counter(), 0.0)
+                result, seconds = future.result(wait)
+            except TimeoutError:
+                self._late[player] = future
+                self._charge(player, remaining)
+                self.timeouts[player] += 1
+                results.append([])
+                continue
+            if remaining is not None and seconds > remaining:
+                # Finished between its deadline and the check.
+                self._charge(player, remaining)
+                self.timeouts[player] += 1
+                results.append([])
+            else:
+                self._charge(player, seconds)
+                results.append(result)
+        return results
+
+    def close(self) -> None:
+        """
+        Shut down the thread pool of a concurrent runner, without waiting for late calls.
+        """
+        if self._owns_executor and self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def __enter__(self) -> 'DecisionRunner':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,213 @@
+"""
+Check the simulator against replays of the real game.
+
+Every turn of a replay is re-simulated on its own: a game is seeded from the deploy-phase frame starting the
+turn (:meth:`TerminalGame.from_replay_frame`), the deployments and upgrades of the turn are read from the spawn
+events, and the action phase is stepped frame by frame. After each frame, the units on the board (type, owner,
+position, health including shields) and the health and resources of both players are compared with the replay;
+the restore phase is checked against the deploy-phase frame of the next turn. The first divergence of every
+turn is reported, and the turn is abandoned there, so that one divergence does not hide the next turns.
+
+:func:`check_replays` spreads replays over a process pool. From the command line::
+
+    python -m termite.divergence notebooks/ --processes 8
+"""
+import argparse
+import glob
+import math
+import multiprocessing as mp
+import os
+from itertools import zip_longest
+from typing import Any, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Type
+
+from .game import TerminalGame
+from .replay import REMOVE_CODE, UPGRADE_CODE, ReplayFrame, ReplayReader
+from .units import MobileUnit, UNIT_TYPES
+
+# Absolute tolerance on health and resources. Replays round them to one decimal.
+TOLERANCE = 1e-3
+
+PLAYER_STATS = ('health', 'structure_points', 'mobile_points')
+
+class Divergence(NamedTuple):
+    """
+    The first difference between the simulation and a replay within one turn.
+    """
+    turn: int
+    # Frame of the replay (last entry of turnInfo).
+    frame: int
+    # "units", "frames", or "p1.health", "p2.mobile_points", ...
+    field: str
+    expected: Any
+    actual: Any
+
+    def __str__(self) -> str:
+        return f"turn {self.turn} frame {self.frame} {self.field}: expected {self.expected}, got {self.actual}"
+
+class ReplayReport(NamedTuple):
+    """
+    The divergences found in one replay.
+    """
+    path: str
+    turns: int
+    divergences: List[Divergence]
+    # Set instead of divergences if the replay could not be checked.
+    error: Optional[str] = None
+
+def _replay_units(frame: ReplayFrame) -> List[Tuple[int, int, int, int, float]]:
+    units = frame.units[frame.units['type'] < REMOVE_CODE]
+    return sorted(units[['player', 'type', 'x', 'y', 'health']].tolist())
+
+def _game_units(game: TerminalGame) -> List[Tuple[int, int, int, int, float]]:
+    game.sync_views()
+    return sorted((1 if unit.side == 'bottom' else 2, unit.type_code, *unit.position,
+                   float(unit.health + unit.shields if isinstance(unit, MobileUnit) else unit.health))
+                  for unit in game.units)
+
+def _compare(frame: ReplayFrame, game: TerminalGame) -> Optional[Divergence]:
+    """
+    Returns the first difference between a frame and the game, if any.
+    """
+    turn, frame_number = int(frame.turn_info[1]), int(frame.turn_info[3])
+    for player, name, expected_stats in zip((game.player1, game.player2), ('p1', 'p2'), frame.stats.tolist()):
+        for stat, expected in zip(PLAYER_STATS, expected_stats):
+            actual = getattr(player, stat)
+            if not math.isclose(expected, actual, abs_tol=TOLERANCE):
+                return Divergence(turn, frame_number, f'{name}.{stat}', expected, actual)
+    for expected, actual in zip_longest(_replay_units(frame), _game_units(game)):
+        if expected is None or actual is None or expected[:4] != actual[:4] \
+                or not math.isclose(expected[4], actual[4], abs_tol=TOLERANCE):
+            return Divergence(turn, frame_number, 'units', expected, actual)
+    return None
+
+def _deployments(frame: ReplayFrame) -> Tuple[list, list]:
+    """
+    Returns the deployments and upgrades of both players in the spawn events of a frame, in spawn order.
+    Removals are not supported by the engine and are skipped.
+    """
+    deployments, upgrades = ([], []), ([], [])
+    for x, y, code, _, player in frame.events['spawn'].tolist():
+        if code < len(UNIT_TYPES):
+            deployments[player - 1].append((UNIT_TYPES[code](), (x, y)))
+        elif code == UPGRADE_CODE:
+            upgrades[player - 1].append((x, y))
+    return deployments, upgrades
+
+def iter_divergences(frames: Iterable[ReplayFrame], engine: Type[TerminalGame] = TerminalGame) -> Iterator[Divergence]:
+    """
+    Re-simulate the turns of a replay and yield the first divergence of each turn.
+
+    :param frames: The frames of the replay, in order.
+    :param engine: The engine to check, :class:`TerminalGame` or a subclass.
+    """
+    game = None
+    for frame in frames:
+        phase, turn, frame_in_turn, frame_number = frame.turn_info.tolist()
+        if phase == 0:
+            if game is not None:
+                # The previous turn matched through its action phase: check its end and the restore phase.
+                if game.units_active():
+                    yield Divergence(turn - 1, frame_number, 'frames', 'end of action phase', 'mobile units left')
+                else:
+                    game.current_turn += 1
+                    game.restore_phase()
+                    divergence = _compare(frame, game)
+                    if divergence is not None:
+                        yield divergence
+            try:
+                game = engine.from_replay_frame(frame)
+            except ValueError as error:
+                yield Divergence(turn, frame_number, 'frames', 'deploy phase', str(error))
+                game = None
+        elif phase == 1 and game is not None:
+            if frame_in_turn == 0:
+                deployments, upgrades = _deployments(frame)
+                for player, player_deployments in zip((game.player1, game.player2), deployments):
+                    game.apply_deployments(player, player_deployments)
+                for player, positions in zip((game.player1, game.player2), upgrades):
+                    player.apply_upgrades(game, positions)
+            elif not game.units_active():
+                yield Divergence(turn, frame_number, 'frames', f'action frame {frame_in_turn}', 'end of action phase')
+                game = None
+                continue
+            game.process_frame()
+            game.frame_count += 1
+            divergence = _compare(frame, game)
+            if divergence is not None:
+                yield divergence
+                game = None
+
+def check_replay(path: str, engine: Type[TerminalGame] = TerminalGame) -> ReplayReport:
+    """
+    Re-simulate a replay file, see :func:`iter_divergences`.
+    """
+    turns = 0
+
+    def frames(reader: ReplayReader) -> Iterator[ReplayFrame]:
+        nonlocal turns
+        for frame in reader:
+            turns += int(frame.turn_info[0] == 0)
+            yield frame
+
+    try:
+        with ReplayReader(path) as reader:
+            divergences = list(iter_divergences(frames(reader), engine))
+    except Exception as error:
+        return ReplayReport(path, turns, [], f'{type(error).__name__}: {error}')
+    return ReplayReport(path, turns, divergences)
+
+def check_replays(paths: Sequence[str], engine: Type[TerminalGame] = TerminalGame, processes: Optional[int] = None,
+                  context: Optional[mp.context.BaseContext] = None) -> List[ReplayReport]:
+    """
+    Check replays in parallel.
+
+    :param paths: Replay files, or directories searched for ``*.replay`` and ``*.replay.gz`` files.
+    :param engine: The engine to check.
+    :param processes: The number of worker processes. Defaults to the number of CPUs.
+    :param context: The multiprocessing context used to start the workers. Defaults to the platform default.
+    :return: The reports, in the order of the files.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, '*.replay')) + glob.glob(os.path.join(path, '*.replay.gz')))
+        else:
+            files.append(path)
+    context = context or mp.get_context()
+    with context.Pool(processes) as pool:
+        return pool.starmap(check_replay, [(path, engine) for path in files], chunksize=1)
+
+def format_report(reports: Sequence[ReplayReport]) -> str:
+    """
+    One line per replay with its first divergence, followed by the fraction of turns that diverged.
+    """
+    lines = []
+    turns = sum(report.turns for report in reports)
+    diverged = 0
+    for report in reports:
+        name = os.path.basename(report.path)
+        if report.error is not None:
+            lines.append(f"{name}: error {report.error}")
+        elif report.divergences:
+            diverged += len({divergence.turn for divergence in report.divergences})
+            lines.append(f"{name}: {len(report.divergences)}/{report.turns} turns diverge, first at "
+                         f"{report.divergences[0]}")
+        else:
+            lines.append(f"{name}: {report.turns} turns match")
+    lines.append(f"{diverged}/{turns} turns diverge ({diverged / max(turns, 1):.1%})")
+    return '\n'.join(lines)
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare the simulator with Terminal replays.")
+    parser.add_argument('paths', nargs='+', help="Replay files, or directories of replays.")
+    parser.add_argument('--processes', type=int, default=None, help="Worker processes (default: number of CPUs).")
+    parser.add_argument('--columnar', action='store_true', help="Check the columnar engine.")
+    args = parser.parse_args(argv)
+    engine = TerminalGame
+    if args.columnar:
+        from .storage import ColumnarTerminalGame
+        engine = ColumnarTerminalGame
+    print(format_report(check_replays(args.paths, engine, args.processes)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Typed events raised by the simulation, for debugging, replay export and metrics.
+
+Every game owns an :class:`EventBus` (``game.events``). Listeners subscribe to one event type at a time::
+
+    game.events.subscribe(BreachEvent, lambda event: print(event.unit, "breached", event.player.side))
+
+The engine checks whether an event type has listeners before building the event, so a game nobody listens to
+pays one dictionary lookup per emit site and no allocation or formatting.
+
+Events carry the unit objects involved. In :class:`~termite.storage.ColumnarTerminalGame` those objects are
+views that are only refreshed by ``game.sync_views()``; use the positions and amounts carried by the event
+rather than the unit attributes.
+"""
+from typing import Callable, Dict, List, NamedTuple, Tuple, Type
+
+class SpawnEvent(NamedTuple):
+    """
+    A unit was placed on the map during the deploy phase.
+    """
+    unit: 'Unit'
+    position: Tuple[int, int]
+
+class UpgradeEvent(NamedTuple):
+    """
+    A structure was upgraded during the deploy phase.
+    """
+    structure: 'Structure'
+    position: Tuple[int, int]
+
+class DeploymentRejectedEvent(NamedTuple):
+    """
+    A deployment requested by a player was skipped.
+    """
+    player: 'Player'
+    unit: 'Unit'
+    position: Tuple[int, int]
+    # "invalid" (position not allowed for the unit) or "unaffordable".
+    reason: str
+
+class MoveEvent(NamedTuple):
+    """
+    A mobile unit moved one tile.
+    """
+    unit: 'MobileUnit'
+    source: Tuple[int, int]
+    destination: Tuple[int, int]
+
+class ShieldEvent(NamedTuple):
+    """
+    A support shielded a mobile unit standing at ``position``.
+    """
+    support: 'Support'
+    unit: 'MobileUnit'
+    position: Tuple[int, int]
+    amount: float
+
+class DamageEvent(NamedTuple):
+    """
+    A unit attacked another one. ``damage`` is the damage dealt before shields absorb it.
+    """
+    attacker: 'Unit'
+    target: 'Unit'
+    damage: float
+
+class SelfDestructEvent(NamedTuple):
+    """
+    A mobile unit self-destructed, damaging ``targets`` by ``damage`` each. ``targets`` is empty
+    when the unit moved less than 5 tiles.
+    """
+    unit: 'MobileUnit'
+    position: Tuple[int, int]
+    targets: List['Unit']
+    damage: float
+
+class BreachEvent(NamedTuple):
+    """
+    A mobile unit reached the enemy edge and damaged ``player``.
+    """
+    unit: 'MobileUnit'
+    position: Tuple[int, int]
+    player: 'Player'
+    damage: float
+
+class StructureDestroyedEvent(NamedTuple):
+    """
+    A structure was destroyed and removed from the map.
+    """
+    structure: 'Structure'
+    position: Tuple[int, int]
+
+class RefundEvent(NamedTuple):
+    """
+    A player got structure points back for a destroyed structure.
+    """
+    player: 'Player'
+    structure: 'Structure'
+    amount: float
+
+class FrameEvent(NamedTuple):
+    """
+    A frame of the game is complete: the deploy phase of ``turn`` is about to start (``phase`` 0, ``frame`` -1),
+    or frame ``frame`` of its action phase was processed (``phase`` 1). The numbering is the one of the
+    ``turnInfo`` of replays.
+    """
+    phase: int
+    turn: int
+    frame: int
+
+EVENT_TYPES = (SpawnEvent, UpgradeEvent, DeploymentRejectedEvent, MoveEvent, ShieldEvent, DamageEvent,
+               SelfDestructEvent, BreachEvent, StructureDestroyedEvent, RefundEvent, FrameEvent)
+
+class EventBus:
+    """
+    Dispatches events to the callbacks subscribed to their type, in subscription order.
+
+    ``event_type in bus`` is true if the type has at least one listener; emit sites test it before building
+    an event.
+    """
+    def __init__(self):
+        self._listeners: Dict[Type[NamedTuple], List[Callable]] = {}
+
+    def subscribe(self, event_type: Type[NamedTuple], callback: Callable) -> Callable:
+        """
+        Call ``callback(event)`` for every event of the given type. Returns the callback, to unsubscribe it later.
+        """
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type {event_type!r}")
+        self._listeners.setdefault(event_type, []).append(callback)
+        return callback
+
+    def unsubscribe(self, event_type: Type[NamedTuple], callback: Callable) -> None:
+        listeners = self._listeners.get(event_type, [])
+        listeners.remove(callback)
+        if not listeners:
+            del self._listeners[event_type]
+
+    def emit(self, event: NamedTuple) -> None:
+        for callback in self._listeners.get(type(event), ()):
+            callback(event)
+
+    def __contains__(self, event_type: Type[NamedTuple]) -> bool:
+        return event_type in self._listeners
+
+    def __bool__(self) -> bool:
+        return bool(self._listeners)
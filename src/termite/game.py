@@ -1,9 +1,21 @@
 from .map import Map, Pathfinder
-from .units import Unit, MobileUnit, Structure, Support
-from .units import Demolisher, Interceptor, Scout, Wall, Turret, Support
+from .targeting import BatchTargeting
+from .snapshot import GameSnapshot
+from .journal import Journal
+from .instrumentation import GameStats
+from .events import (EventBus, SpawnEvent, UpgradeEvent, DeploymentRejectedEvent, ShieldEvent, DamageEvent,
+                     SelfDestructEvent, StructureDestroyedEvent, RefundEvent, FrameEvent, MoveEvent)
+from .replay import UPGRADE_CODE, ReplayFrame, decode_frame
+from .units import Unit, MobileUnit, Structure, Support, SUPPORT, SCOUT
+from .units import Demolisher, Interceptor, Scout, Wall, Turret, Support, UNIT_TYPES
+from .geometry import SPAWN_TILE_SETS, STRUCTURE_TILES
+from .threat import PathEstimate
+from .decisions import DecisionRunner
 from colorama import init, Fore, Back, Style
+import math
+import time
 import warnings
-from typing import List, Union, Optional, Container, Tuple
+from typing import Callable, List, Union, Optional, Container, Tuple, Type
 
 class Player:
     """
@@ -45,15 +57,17 @@ class Player:
         """
         Process the upgrades requested by the player.
         """
-        upgrade_positions = self.upgrade(game.get_game_state())
+        self.apply_upgrades(game, self.upgrade(game.get_game_state()))
+
+    def apply_upgrades(self, game: 'TerminalGame', upgrade_positions: List[Tuple[int, int]]) -> None:
+        """
+        Upgrade this player's structures at the given positions, if affordable.
+        """
         for pos in upgrade_positions:
             x, y = pos
             structure = game.map.grid[y][x]
             if isinstance(structure, Structure) and structure.side == self.side:
-                if self.structure_points >= structure.upgrade_cost and not structure.is_upgraded:
-                    self.structure_points -= structure.upgrade_cost
-                    structure.upgrade()
-                else:
+                if not game.upgrade_structure(self, structure):
                     warnings.warn(f"Cannot upgrade {structure.unit_type} at position {pos}. Insufficient points or already upgraded.")
             else:
                 warnings.warn(f"Invalid upgrade position {pos}")
@@ -104,12 +118,17 @@ class TerminalGame:
 
     The game ends after 100 turns or when a player's health reaches 0.
     """
-    def __init__(self, player1: Optional[Player] = None, player2: Optional[Player] = None):
+    def __init__(self, player1: Optional[Player] = None, player2: Optional[Player] = None,
+                 decisions: Optional[DecisionRunner] = None):
         """
         Initialize the game with two players.
+
+        :param decisions: Asks the players for their actions and times them, see :mod:`termite.decisions`.
+            Defaults to asking them one after the other, without a time limit.
         """
         self.map = Map()
         self.pathfinder = Pathfinder(self.map)
+        self.targeting = BatchTargeting(self)
         if player1 is None: 
             self.player1: Player = Player()
         else:
@@ -125,6 +144,61 @@ class TerminalGame:
         self.current_turn = 0
         self.frame_count = 0
         self.units: List[Unit] = []
+        self.journal: Optional[Journal] = None
+        self.stats: Optional[GameStats] = None
+        self.events = EventBus()
+        self.decisions = decisions if decisions is not None else DecisionRunner()
+        # Skip the frames of the action phase in which no unit can interact, see skip_idle_frames.
+        self.fast_forward = True
+
+    @classmethod
+    def from_replay_frame(cls, frame: Union[ReplayFrame, dict], player1: Optional[Player] = None,
+                          player2: Optional[Player] = None) -> 'TerminalGame':
+        """
+        Create a game in the state of a replay frame: its structures with their health and upgrades,
+        the health and resources of both players, and the turn and frame counters.
+
+        Only frames between turns, such as the deploy-phase frame starting each turn, can be used:
+        the engine cannot resume mobile units mid-path. Pending removals are ignored.
+
+        :param frame: A frame from :mod:`termite.replay`, or a parsed frame line of a replay file.
+        :raises ValueError: If there are mobile units in the frame.
+        """
+        if isinstance(frame, dict):
+            frame = decode_frame(frame)
+        game = cls(player1, player2)
+        _, turn, _, frame_count = frame.turn_info.tolist()
+        game.current_turn = turn
+        game.frame_count = max(frame_count, 0)
+        for player, (health, structure_points, mobile_points, _) in zip((game.player1, game.player2),
+                                                                         frame.stats.tolist()):
+            player.health = health
+            player.structure_points = structure_points
+            player.mobile_points = mobile_points
+
+        # The structures are set up in one pass, then put on the map and in the index at once.
+        sides = (None, 'bottom', 'top')
+        rows = frame.units.tolist()
+        upgraded = {(x, y) for _, code, x, y, _, _ in rows if code == UPGRADE_CODE}
+        units = game.units
+        index_add = game.map.index.add
+        for player, code, x, y, health, _ in rows:
+            if code >= len(UNIT_TYPES):
+                continue
+            unit_type = UNIT_TYPES[code]
+            if not issubclass(unit_type, Structure):
+                raise ValueError(f"Cannot seed a game from a frame with mobile units ({unit_type.__name__} at {x, y})")
+            unit = unit_type()
+            if (x, y) in upgraded:
+                unit.upgrade()
+            unit.health = health
+            unit.creation_time = game.frame_count
+            unit.position = (x, y)
+            unit.set_side(sides[player])
+            units.append(unit)
+            index_add(unit)
+        game.map.place_structures(units)
+        return game
 
     def play_turn(self):
         """
@@ -132,6 +206,29 @@ class TerminalGame:
         """
         self.deploy_phase()
         self.action_phase()
+        if self.journal is not None:
+            self.journal.save(self, 'current_turn')
+        self.current_turn += 1
+        self.restore_phase()
+
+    def play_actions(self, deployments: Tuple[List[Tuple[Unit, Tuple[int, int]]], List[Tuple[Unit, Tuple[int, int]]]],
+                     upgrades: Tuple[List[Tuple[int, int]], List[Tuple[int, int]]] = ([], [])):
+        """
+        Play a single turn with the given deployments and upgrades, instead of asking the players for them.
+
+        :param deployments: The deployments of player 1 and player 2.
+        :param upgrades: The positions player 1 and player 2 upgrade.
+        """
+        if FrameEvent in self.events:
+            self.events.emit(FrameEvent(0, self.current_turn, -1))
+        self.decisions.start_turn()
+        for player, player_deployments in zip((self.player1, self.player2), deployments):
+            self.apply_deployments(player, player_deployments)
+        for player, positions in zip((self.player1, self.player2), upgrades):
+            player.apply_upgrades(self, positions)
+        self.action_phase()
+        if self.journal is not None:
+            self.journal.save(self, 'current_turn')
         self.current_turn += 1
         self.restore_phase()
 
@@ -140,6 +237,8 @@ class TerminalGame:
         Phase 1: All players gain resources and mobile points.
         """
         for player in (self.player1, self.player2):
+            if self.journal is not None:
+                self.journal.save(player, 'mobile_points', 'structure_points')
             player.decay_mobile_points()
             player.add_resources(self.current_turn)
         # Add logic for resource generation from structures
@@ -151,55 +250,68 @@ class TerminalGame:
         """
         Phase 2: Players deploy units onto the map and upgrade structures.
         """
-        for player in (self.player1, self.player2):
-            player_deployments = player.deploy(self.get_game_state())
-            
-            for deployment in player_deployments:
-                unit, position = deployment
-                if self.is_valid_deployment(player, unit, position):
-                    if player.can_afford(unit):
-                        self.place_unit(player, unit, position)
-                        player.deduct_cost(unit)
-                    else:
-                        print(f"Player cannot afford to deploy {unit.unit_type}")
-                else:
-                    print(f"Invalid deployment: {unit.unit_type} at {position}")
+        if FrameEvent in self.events:
+            self.events.emit(FrameEvent(0, self.current_turn, -1))
+        self.decisions.start_turn()
+        self._decide('deploy', self.apply_deployments)
         self.upgrade_phase()
+
+    def _decide(self, method: str, apply: Callable[[Player, list], None]) -> None:
+        """
+        Ask both players for their actions through ``self.decisions`` and apply them, player 1 first.
+
+        A concurrent runner asks both players on the same state; otherwise player 2 is asked once the actions
+        of player 1 are applied. Concurrent calls get the state of a clone of the game each, since a late call
+        keeps reading its state while the engine plays on.
+        """
+        players = (self.player1, self.player2)
+        decisions = self.decisions
+        if decisions.concurrent:
+            results = decisions.call_all([getattr(player, method) for player in players],
+                                         [self.clone().get_game_state() for _ in players])
+            for player, result in zip(players, results):
+                apply(player, result)
+        else:
+            for index, player in enumerate(players):
+                apply(player, decisions.call(index, getattr(player, method), self.get_game_state()))
+
+    def apply_deployments(self, player: Player, player_deployments: List[Tuple[Unit, Tuple[int, int]]]):
+        """
+        Place the given deployments of a player, skipping the invalid and unaffordable ones.
+        """
+        for deployment in player_deployments:
+            unit, position = deployment
+            if self.is_valid_deployment(player, unit, position):
+                if player.can_afford(unit):
+                    self.place_unit(player, unit, position)
+                    if self.journal is not None:
+                        self.journal.save(player, 'mobile_points', 'structure_points')
+                    player.deduct_cost(unit)
+                elif DeploymentRejectedEvent in self.events:
+                    self.events.emit(DeploymentRejectedEvent(player, unit, position, 'unaffordable'))
+            elif DeploymentRejectedEvent in self.events:
+                self.events.emit(DeploymentRejectedEvent(player, unit, position, 'invalid'))
     
     def upgrade_phase(self):
         """
         Allow players to upgrade their structures. Happens at the end of the deploy phase.
         """
-        for player in (self.player1, self.player2):
-            player.process_upgrades(self)
+        self._decide('upgrade', lambda player, positions: player.apply_upgrades(self, positions))
 
     def is_valid_deployment(self, player: Player, unit: Unit, position: Tuple[int, int]) -> bool:
         """
         Check if the position is in the player's half of the arena and if it's a valid position for the unit type.
         """
         x, y = position
-        is_player1 = player == self.player1
-        
-        # Check if the position is within the diamond-shaped arena
-        if not self.map.is_in_arena(x, y):
-            return False
-
+        side = 0 if player == self.player1 else 1
         if isinstance(unit, MobileUnit):
             # Mobile units can be deployed on the edges of the diamond on the current player's side
-            if is_player1:
-                return y <= 13 and abs(x - 13.5) + abs(y - 13.5) == 14
-            else:  # Player 2
-                return y >= 14 and abs(x - 13.5) + abs(y - 13.5) == 14
+            return (x, y) in SPAWN_TILE_SETS[side]
         elif isinstance(unit, Structure):
             # Static units can be deployed on the player's half of the diamond
-            # and cannot be deployed on top of existing structures
-            if is_player1:
-                valid_area = y <= 13 and abs(x - 13.5) + abs(y - 13.5) <= 14
-            else:  # Player 2
-                valid_area = y >= 14 and abs(x - 13.5) + abs(y - 13.5) <= 14
-            
-            return valid_area and self.map.grid[y][x] is None  # Ensure the cell is empty
-        
+            # and cannot be deployed on top of existing units
+            return ((x, y) in STRUCTURE_TILES[side] and self.map.grid[y][x] is None
+                    and not self.map.mobile_units(x, y))
         return False
 
     def place_unit(self, player: Player, unit: Unit, position: Tuple[int, int]):
@@ -210,66 +322,231 @@ class TerminalGame:
         unit.creation_time = self.frame_count
         unit.position = (x, y)
         unit.set_side('bottom' if player == self.player1 else 'top')
+        if self.journal is not None:
+            self.journal.push(self._undo_place_unit, unit)
+            unit._journal = self.journal
         self.units.append(unit)
         self.map.place_unit(unit, x, y)
+        self.map.index.add(unit)
+        if SpawnEvent in self.events:
+            self.events.emit(SpawnEvent(unit, (x, y)))
 
     def action_phase(self):
         """
         Phase 3: units move and attack each other.
         """
+        start_frame = self.frame_count
+        # Frames to process before looking for idle frames again, doubled after every fruitless look.
+        wait = backoff = 0
         while self.units_active():
+            if self.fast_forward:
+                if wait:
+                    wait -= 1
+                elif self.skip_idle_frames():
+                    backoff = 0
+                else:
+                    wait = backoff = min(2 * backoff or 1, 8)
             self.process_frame()
+            if FrameEvent in self.events:
+                self.events.emit(FrameEvent(1, self.current_turn, self.frame_count - start_frame))
+            if self.journal is not None:
+                self.journal.save(self, 'frame_count')
             self.frame_count += 1
+        # All mobile units are gone: drop them from the sets of the supports that shielded them.
+        for unit in self.units:
+            if unit.type_code == SUPPORT and unit.shielded_units:
+                if self.journal is not None:
+                    self.journal.save(unit, 'shielded_units')
+                unit.shielded_units = set()
+        if self.stats is not None:
+            self.stats.frames_per_action_phase.append(self.frame_count - start_frame)
 
     def process_frame(self):
         """
         Undergo a single frame of the action phase.
         """
+        if self.stats is not None:
+            self._process_frame_timed()
+            return
         self.apply_support_shields()
         self.move_units()
         self.reset_attack_status()
         self.resolve_attacks()
         self.remove_destroyed_units()
 
+    def _process_frame_timed(self):
+        """
+        :meth:`process_frame`, recording the time spent in each step and the number of units.
+        """
+        stats = self.stats
+        stats.units_per_frame.append(len(self.units))
+        seconds = stats.step_seconds
+        start = time.perf_counter()
+        for name, step in (('shields', self.apply_support_shields), ('move', self.move_units),
+                           ('reset_attacks', self.reset_attack_status), ('attacks', self.resolve_attacks),
+                           ('removal', self.remove_destroyed_units)):
+            step()
+            end = time.perf_counter()
+            seconds[name] += end - start
+            start = end
+
+    def skip_idle_frames(self) -> int:
+        """
+        Play the upcoming frames of the action phase in which units only walk, all at once.
+
+        A frame is idle when no mobile unit can have an enemy in range once it moved, no support can shield a
+        mobile unit it has not shielded yet, and no unit reaches the enemy edge or needs a new path. Units move
+        at most one tile per move, so the distance between two units shrinks by at most the number of moves
+        they make: frames are skipped for as long as that bound keeps every pair out of range. The mobile
+        units then jump to where their paths take them, and the frame counters are advanced.
+
+        The game ends up in the state frame-by-frame stepping gives. Nothing is skipped while moves or frames
+        have event listeners, which expect every frame.
+
+        :return: The number of frames skipped.
+        """
+        if MoveEvent in self.events or FrameEvent in self.events:
+            return 0
+        mobiles = []
+        sides = {'bottom': [], 'top': []}
+        for unit in self.units:
+            sides[unit.side].append(unit)
+            if unit.type_code >= SCOUT:
+                mobiles.append(unit)
+        if not mobiles:
+            return 0
+
+        # Frames before a unit breaches or runs out of path.
+        frames = None
+        for unit in mobiles:
+            speed, waited = unit.speed, unit.frames_since_last_move
+            path = () if unit.needs_repath else unit.path
+            enemy_edge = SPAWN_TILE_SETS[unit.side == 'bottom']
+            if unit.position in enemy_edge:
+                return 0
+            limit = (len(path) + 1) * speed - waited - 1
+            if frames is not None and limit > frames:
+                # Only the tiles reached within the frames left matter.
+                path = path[:(waited + frames) // speed]
+            for moves, tile in enumerate(path, 1):
+                if tile in enemy_edge:
+                    # The unit breaches at the start of the frame after it arrives.
+                    limit = moves * speed - waited
+                    break
+            if frames is None or limit < frames:
+                frames = limit
+                if frames <= 0:
+                    return 0
+
+        def within(unit: Unit, slack: float) -> int:
+            # The most frames during which a unit makes fewer moves than the slack.
+            if slack <= 0:
+                return 0
+            return math.ceil(slack) * unit.speed - unit.frames_since_last_move - 1
+
+        for attacker in mobiles:
+            ax, ay = attacker.position
+            reach = attacker.range
+            speed, waited = attacker.speed, attacker.frames_since_last_move
+            for target in sides['top' if attacker.side == 'bottom' else 'bottom']:
+                tx, ty = target.position
+                distance = (ax - tx) ** 2 + (ay - ty) ** 2
+                if target.type_code < SCOUT:
+                    # Out of range whatever the attacker does in the frames left.
+                    cut = reach + (waited + frames) // speed
+                    if distance > cut * cut:
+                        continue
+                    frames = min(frames, within(attacker, math.sqrt(distance) - reach))
+                else:
+                    slack = math.sqrt(distance) - reach
+                    while frames > 0 and ((waited + frames) // speed
+                                          + (target.frames_since_last_move + frames) // target.speed >= slack):
+                        frames -= 1
+                if frames <= 0:
+                    return 0
+        for support in self.units:
+            if support.type_code != SUPPORT:
+                continue
+            sx, sy = support.position
+            reach = support.range
+            for unit in mobiles:
+                if unit not in support.shielded_units:
+                    ux, uy = unit.position
+                    distance = (sx - ux) ** 2 + (sy - uy) ** 2
+                    cut = reach + (unit.frames_since_last_move + frames) // unit.speed
+                    if distance > cut * cut:
+                        continue
+                    frames = min(frames, within(unit, math.sqrt(distance) - reach))
+                    if frames <= 0:
+                        return 0
+
+        journal = self.journal
+        index = self.map.index
+        for unit in mobiles:
+            waited = unit.frames_since_last_move + frames
+            moves = waited // unit.speed
+            if journal is not None:
+                journal.save(unit, 'frames_since_last_move', 'has_attacked_this_frame')
+            unit.frames_since_last_move = waited - moves * unit.speed
+            unit.has_attacked_this_frame = False
+            if moves:
+                path = unit.path
+                destination = path[moves - 1]
+                previous = path[moves - 2] if moves > 1 else unit.position
+                if journal is not None:
+                    journal.save(unit, 'last_move', 'position', 'distance_moved', 'path')
+                    journal.push(index.move, unit, destination, unit.position)
+                index.move(unit, unit.position, destination)
+                unit.last_move = (destination[0] - previous[0], destination[1] - previous[1])
+                unit.position = destination
+                unit.path = path[moves:]
+                unit.distance_moved += moves
+        if journal is not None:
+            journal.save(self, 'frame_count')
+        self.frame_count += frames
+        if self.stats is not None:
+            self.stats.units_per_frame.extend([len(self.units)] * frames)
+            self.stats.skipped_frames += frames
+        return frames
+
     def apply_support_shields(self):
         """
         Step 1: All support units apply shields to nearby mobile units.
         """
-        for support in [u for u in self.units if isinstance(u, Support)]:
-            for unit in [u for u in self.units if isinstance(u, MobileUnit)]:
-                if support.distance_to(unit) <= support.range:
-                    support.apply_shield(unit) # apply_shield only applies the shield if the support has not already shielded.
+        emit = ShieldEvent in self.events
+        for support in [u for u in self.units if u.type_code == SUPPORT]:
+            for unit in self.map.index.query(support.position, support.range):
+                if unit.type_code >= SCOUT:
+                    amount = support.apply_shield(unit) # apply_shield only applies the shield if the support has not already shielded.
+                    if emit and amount:
+                        self.events.emit(ShieldEvent(support, unit, unit.position, amount))
 
     def move_units(self):
         """
         Step 2: All mobile units move towards their target.
         """
         for unit in list(self.units):  # Create a copy of the list to avoid modification during iteration
-            if isinstance(unit, MobileUnit):
+            if unit.type_code >= SCOUT:
                 unit.move(self)
-        # Remove all mobile units from the map
-        self.map.clear()
-        # Add all new positions to the map
-        for unit in self.units:
-            if isinstance(unit, MobileUnit):
-                x, y = unit.position
-                self.map.place_unit(unit, x, y)
-        
+
     def reset_attack_status(self):
         """
         Step 3: Reset the attack status of all mobile units.
         """
         for unit in self.units:
-            if isinstance(unit, MobileUnit):
+            if unit.type_code >= SCOUT:
                 unit.reset_attack_status()
 
     def resolve_attacks(self):
         """
         Step 4: All mobile units attack enemy units within range.
         """
-        for unit in sorted(self.units, key=lambda u: u.creation_time):
-            if isinstance(unit, MobileUnit):
-                unit.attack(self)
+        attackers = [unit for unit in sorted(self.units, key=lambda u: u.creation_time) if unit.type_code >= SCOUT]
+        results = self.targeting.resolve(attackers)
+        if DamageEvent in self.events:
+            for attacker, target, damage in results:
+                if damage:
+                    self.events.emit(DamageEvent(attacker, target, damage))
 
     def remove_destroyed_units(self):
         """
@@ -284,17 +561,24 @@ class TerminalGame:
 
         # Handle any additional effects of unit destruction
         for unit in destroyed_units:
-            if isinstance(unit, MobileUnit):
+            if unit.type_code >= SCOUT:
                 # Mobile units might have additional destruction effects
                 self.handle_mobile_unit_destruction(unit)
-            elif isinstance(unit, Structure):
+            else:
                 # Structures might have additional destruction effects
+                if StructureDestroyedEvent in self.events:
+                    self.events.emit(StructureDestroyedEvent(unit, unit.position))
                 self.handle_structure_destruction(unit)
 
     def remove_unit(self, unit: Unit):
-        self.units.remove(unit)
         x, y = unit.position
-        self.map.grid[y][x] = None
+        if self.journal is not None:
+            self.journal.push(self._undo_remove_unit, unit, self.units.index(unit))
+        self.units.remove(unit)
+        self.map.remove_unit(unit, x, y)
+        self.map.index.remove(unit)
+        if unit.type_code >= SCOUT:
+            self.pathfinder.forget(unit)
 
     def handle_mobile_unit_destruction(self, unit: MobileUnit):
         """
@@ -310,20 +594,89 @@ class TerminalGame:
         For example, refunding some resources to the player.
         """
         player = self.get_unit_owner(unit)
+        if self.journal is not None:
+            self.journal.save(player, 'structure_points')
         refund = round(0.75 * unit.cost * (unit.health / unit.max_health), 1)
         player.structure_points += refund
+        if RefundEvent in self.events:
+            self.events.emit(RefundEvent(player, unit, refund))
 
     def apply_self_destruct_damage(self, unit: MobileUnit):
         """
         Apply area damage when a mobile unit self-destructs.
         """
-        for target in self.units:
-            if target.unit_type != unit.unit_type and unit.distance_to(target) <= 1.5:
-                target.take_damage(unit.max_health)
+        targets = [target for target in self.map.index.query(unit.position, 1.5) if target.unit_type != unit.unit_type]
+        for target in targets:
+            target.take_damage(unit.max_health)
+        if SelfDestructEvent in self.events:
+            self.events.emit(SelfDestructEvent(unit, unit.position, targets, unit.max_health))
 
     """
     --------------- Helper Methods ---------------
     """
+    def enable_stats(self, stats: Optional[GameStats] = None) -> GameStats:
+        """
+        Start recording frame step timings and hot-path counters, see :mod:`termite.instrumentation`.
+
+        :param stats: Statistics to add to, e.g. shared with other games. Defaults to new ones.
+        :return: The statistics being recorded.
+        """
+        self.stats = self.pathfinder.stats = stats if stats is not None else GameStats()
+        return self.stats
+
+    def disable_stats(self) -> None:
+        """
+        Stop recording statistics.
+        """
+        self.stats = self.pathfinder.stats = None
+
+    def enable_journal(self) -> Journal:
+        """
+        Start recording an undo journal of every mutation of the game, so that :meth:`rollback` can undo them.
+
+        Snapshots (:meth:`snapshot`, :meth:`restore`) bypass the journal; do not mix the two within one rollout.
+
+        :return: The journal.
+        """
+        if self.journal is None:
+            self.journal = Journal()
+            for unit in self.units:
+                unit._journal = self.journal
+        return self.journal
+
+    def disable_journal(self) -> None:
+        """
+        Stop recording the undo journal and drop it.
+        """
+        self.journal = None
+        for unit in self.units:
+            unit._journal = None
+
+    def mark(self) -> int:
+        """
+        Returns a mark of the current state to :meth:`rollback` to. Requires :meth:`enable_journal`.
+        """
+        return self.journal.mark()
+
+    def rollback(self, mark: int) -> None:
+        """
+        Undo every mutation since the mark was taken, restoring the exact state of the game at that time.
+        """
+        self.journal.rollback(mark)
+        # Restored health values bypass the incremental hash.
+        self.map.rehash(unit for unit in self.units if isinstance(unit, Structure))
+
+    def _undo_place_unit(self, unit: Unit) -> None:
+        # Units placed later have been rolled back already, so the unit is the last one.
+        self.units.pop()
+        self.map.index.undo_add(unit)
+        self.map.remove_unit(unit, *unit.position)
+
+    def _undo_remove_unit(self, unit: Unit, index: int) -> None:
+        self.units.insert(index, unit)
+        self.map.place_unit(unit, *unit.position)
+        self.map.index.reinsert(unit)
+
     def get_unit_owner(self, unit: Union[Unit, str]) -> Player:
         """
         Determine which player owns a given unit.
@@ -336,7 +689,7 @@ class TerminalGame:
         """
         Check if there are any active mobile units on the map
         """
-        return any(isinstance(unit, MobileUnit) for unit in self.units)
+        return any(unit.type_code >= SCOUT for unit in self.units)
 
     def is_game_over(self) -> bool:
         """
@@ -352,6 +705,10 @@ class TerminalGame:
         """
         Returns the winner of the game: either "Player 1", "Player 2", or "Draw".
 
+        If both players have the same health, e.g. they destroyed each other on the same turn, the player who
+        spent less computation time deciding wins (see :mod:`termite.decisions`). It is a draw only if they
+        spent the same time.
+
         The game should be over before calling this method.
         """
         assert self.is_game_over()
@@ -359,11 +716,52 @@ class TerminalGame:
             return "Player 1"
         elif self.player2.health > self.player1.health:
             return "Player 2"
-        else:
-            # TODO: Implement computation time comparison logic -> if both players kill each other simultaneously
-            # or have the same health after 100 turns, the player with the most remaining computation time wins.
-            pass
-            return "Draw"
+        time1, time2 = self.decisions.computation_time
+        if time1 < time2:
+            return "Player 1"
+        elif time2 < time1:
+            return "Player 2"
+        return "Draw"
+
+    def sync_views(self) -> None:
+        """
+        Bring the unit objects in ``self.units`` up to date. They always are in this engine;
+        engines keeping unit state elsewhere override this.
+        """
+
+    def snapshot(self) -> GameSnapshot:
+        """
+        Save the mutable simulation state of the game (units, grid, resources, turn and frame counters).
+
+        Player objects are not part of the snapshot, only their health and resources.
+        """
+        return GameSnapshot(self)
+
+    def restore(self, snapshot: GameSnapshot) -> None:
+        """
+        Bring the game back to the state saved by :meth:`snapshot`.
+        """
+        snapshot.restore(self)
+
+    def clone(self) -> 'TerminalGame':
+        """
+        Returns an independent copy of the game, played by base :class:`Player` objects with the same health
+        and resources. Repeatedly restoring a snapshot into the same game is much cheaper for lookahead search,
+        since the clone starts with cold pathfinding caches.
+        """
+        game = TerminalGame()
+        game.restore(self.snapshot().copy())
+        return game
+
+    def state_hash(self) -> int:
+        """
+        Returns a hash of the state between turns: the structures on the map (incrementally maintained
+        Zobrist hash, see :mod:`termite.zobrist`), the health and resources of both players, and the turn.
+        Mobile units are not part of the hash.
+        """
+        p1, p2 = self.player1, self.player2
+        return hash((self.map.zobrist, p1.health, p1.structure_points, p1.mobile_points,
+                     p2.health, p2.structure_points, p2.mobile_points, self.current_turn))
 
     def get_game_state(self) -> dict:
         """
@@ -371,7 +769,7 @@ class TerminalGame:
         This should include all the information that players need to make decisions.
 
         Keys:
-        - map: A 2D list representing the game map.
+        - map: A 2D list of the structures on the map, indexed ``[y][x]`` (None on empty tiles).
         - current_turn: The current turn number.
         - player1_health: Player 1's health.
         - player2_health: Player 2's health.
@@ -395,11 +793,32 @@ class TerminalGame:
         Returns True if the upgrade was successful, False otherwise.
         """
         if player.structure_points >= structure.upgrade_cost and not structure.is_upgraded:
+            if self.journal is not None:
+                self.journal.save(player, 'structure_points')
             player.structure_points -= structure.upgrade_cost
             structure.upgrade()
+            if UpgradeEvent in self.events:
+                self.events.emit(UpgradeEvent(structure, structure.position))
             return True
         return False
 
+    def estimate_attack(self, player: Player, unit_type: Type[MobileUnit], position: Tuple[int, int],
+                        count: int = 1) -> PathEstimate:
+        """
+        Estimate what a stack of mobile units deployed at a position would go through against the current
+        structures, without playing the action phase. See :mod:`termite.threat`.
+
+        :param player: The player deploying the stack.
+        :param unit_type: The type of the units, e.g. Scout.
+        :param position: The spawn position. It is not checked to be a valid deployment.
+        :param count: The number of units in the stack.
+        """
+        unit = unit_type()
+        unit.position = position
+        unit.set_side('bottom' if player == self.player1 else 'top')
+        path = self.pathfinder.find_path(None, position, unit.target_edge)
+        return self.map.threats.estimate(path, 0 if unit.side == 'bottom' else 1, unit.stats, count)
+
     def get_unit_color(self, unit: Unit):
         """
         Helper function for rendering units with different colors based on health.
@@ -441,14 +860,10 @@ class TerminalGame:
             for x in range(self.map.width):
                 if not self.map.is_in_arena(x, y):
                     row += "  "
-                elif self.map.grid[y][x] is None:
+                elif self.map.grid[y][x] is None and not self.map.mobile_units(x, y):
                     row += f"{Fore.WHITE}· {Style.RESET_ALL}"
                 else:
-                    units = self.map.grid[y][x]
-                    if isinstance(units, list):
-                        unit = units[0]
-                    else:
-                        unit = units
+                    unit = self.map.grid[y][x] or self.map.mobile_units(x, y)[0]
                     color = self.get_unit_color(unit)
                     if isinstance(unit, Scout):
                         row += f"{color}{'S' if unit.side == 'bottom' else 's'} {Style.RESET_ALL}"
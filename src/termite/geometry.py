@@ -0,0 +1,63 @@
+"""
+Geometry of the arena, computed once at import time.
+
+The arena is the diamond of the 28x28 board whose tiles satisfy ``|x - 13.5| + |y - 13.5| <= 14``.
+Player 1 owns the bottom half (``y <= 13``) and player 2 the top half. Mobile units are deployed on the
+edges of their own half, and head for one of the two edges of the other half.
+
+Tables indexed by tile use the flat index ``y * WIDTH + x``. Tables indexed by side use 0 for the bottom
+side (player 1) and 1 for the top side (player 2), as ``SIDES``.
+"""
+from typing import Dict, FrozenSet, Tuple
+
+WIDTH = HEIGHT = 28
+
+SIDES = ('bottom', 'top')
+
+# Target edges, in the order of the target_edge names used by units and pathfinding.
+TARGET_EDGES = ('top-left', 'top-right', 'bottom-left', 'bottom-right')
+
+def _in_arena(x: int, y: int) -> bool:
+    return abs(x - 13.5) + abs(y - 13.5) <= 14
+
+def _on_edge(x: int, y: int) -> bool:
+    return abs(x - 13.5) + abs(y - 13.5) == 14
+
+def _bitmask(tiles) -> int:
+    mask = 0
+    for x, y in tiles:
+        mask |= 1 << (y * WIDTH + x)
+    return mask
+
+# The tiles of the arena, row by row.
+ARENA_TILES: Tuple[Tuple[int, int], ...] = tuple((x, y) for y in range(HEIGHT) for x in range(WIDTH) if _in_arena(x, y))
+ARENA_TILE_SET: FrozenSet[Tuple[int, int]] = frozenset(ARENA_TILES)
+# One byte per tile of the board, 1 inside the arena.
+ARENA_MASK = bytes(_in_arena(x, y) for y in range(HEIGHT) for x in range(WIDTH))
+
+# Tiles where each side may place structures: its half of the arena.
+STRUCTURE_TILES: Tuple[FrozenSet[Tuple[int, int]], ...] = tuple(
+    frozenset(tile for tile in ARENA_TILES if (tile[1] <= 13) == (side == 'bottom')) for side in SIDES)
+# Tiles where each side may deploy mobile units: the edges of its half, by increasing x.
+SPAWN_TILES: Tuple[Tuple[Tuple[int, int], ...], ...] = tuple(
+    tuple(sorted(tile for tile in tiles if _on_edge(*tile))) for tiles in STRUCTURE_TILES)
+SPAWN_TILE_SETS: Tuple[FrozenSet[Tuple[int, int]], ...] = tuple(frozenset(tiles) for tiles in SPAWN_TILES)
+
+# The tiles of each target edge, by increasing x, as searched by the pathfinder.
+EDGE_TILES: Dict[str, Tuple[Tuple[int, int], ...]] = {
+    'top-left': tuple((x, x + 14) for x in range(0, 14)),
+    'top-right': tuple((x, 41 - x) for x in range(14, 28)),
+    'bottom-left': tuple((x, 13 - x) for x in range(0, 14)),
+    'bottom-right': tuple((x, x - 14) for x in range(14, 28)),
+}
+EDGE_TILE_SETS: Dict[str, FrozenSet[Tuple[int, int]]] = {edge: frozenset(tiles) for edge, tiles in EDGE_TILES.items()}
+# Bit ``y * WIDTH + x`` is set for the tiles of the edge.
+EDGE_BITMASKS: Dict[str, int] = {edge: _bitmask(tiles) for edge, tiles in EDGE_TILES.items()}
+# The (x, y) direction of each target edge, e.g. (1, 1) for the top right.
+EDGE_DIRECTIONS: Dict[str, Tuple[int, int]] = {
+    'top-left': (-1, 1), 'top-right': (1, 1), 'bottom-left': (-1, -1), 'bottom-right': (1, -1)}
+
+# The arena neighbors of every arena tile, in the order (x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y).
+NEIGHBORS: Dict[Tuple[int, int], Tuple[Tuple[int, int], ...]] = {
+    (x, y): tuple(n for n in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)) if n in ARENA_TILE_SET)
+    for x, y in ARENA_TILES}
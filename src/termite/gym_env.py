@@ -0,0 +1,107 @@
+"""
+Gymnasium wrapper around :class:`TerminalGame`.
+
+The agent plays player 1 (bottom) against an opponent :class:`Player`; one step plays one turn.
+Observations are the preallocated arrays of :mod:`termite.spaces`, updated in place every step and
+returned as the same dict of arrays, with the action mask of the agent alongside.
+
+The opponent is asked for its actions through ``game.decisions``, so a turn budget applies to it as in
+:meth:`TerminalGame.play_turn`. The agent decides outside the environment, between steps: its computation time
+is not measured, and stays at zero in the tiebreak of :meth:`TerminalGame.get_winner`.
+
+Requires the optional ``gymnasium`` package (``pip install gymnasium``).
+"""
+import numpy as np
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    import gymnasium as gym
+except ImportError:  # Optional dependency, only needed to use TerminalEnv.
+    gym = None
+
+from .game import Player, TerminalGame
+from .spaces import (ACTION_MASK_SHAPE, BOARD_SHAPE, HEIGHT, NO_ACTION, NUM_ACTION_CODES, NUM_SCALARS, WIDTH,
+                     decode_actions, encode_observation, write_action_mask)
+
+class TerminalEnv(gym.Env if gym is not None else object):
+    """
+    Single-agent Terminal environment.
+
+    Actions are (max_actions, 3) integer arrays of (code, x, y) rows, see :mod:`termite.spaces`.
+    The reward is the change of the health difference between the agent and the opponent over the turn.
+    """
+    metadata = {'render_modes': ['human', 'ansi']}
+
+    def __init__(self, opponent: Callable[[], Player] = Player, max_actions: int = 32, render_mode: Optional[str] = None):
+        """
+        :param opponent: Creates the opponent of every new game.
+        :param max_actions: The maximum number of actions per turn.
+        :param render_mode: None, "human" to print the board after every step, or "ansi" to only return it
+            from :meth:`render`.
+        """
+        if gym is None:
+            raise ImportError("TerminalEnv requires gymnasium: pip install gymnasium")
+        self.opponent = opponent
+        self.max_actions = max_actions
+        self.render_mode = render_mode
+        self.observation_space = gym.spaces.Dict({
+            'board': gym.spaces.Box(0, np.inf, BOARD_SHAPE, dtype=np.float32),
+            'scalars': gym.spaces.Box(-np.inf, np.inf, (NUM_SCALARS,), dtype=np.float32),
+            'action_mask': gym.spaces.MultiBinary(ACTION_MASK_SHAPE),
+        })
+        self.action_space = gym.spaces.Box(low=np.full((max_actions, 3), NO_ACTION),
+                                           high=np.array([[NUM_ACTION_CODES - 1, WIDTH - 1, HEIGHT - 1]] * max_actions),
+                                           dtype=np.int16)
+        self._observation = {
+            'board': np.zeros(BOARD_SHAPE, dtype=np.float32),
+            'scalars': np.zeros(NUM_SCALARS, dtype=np.float32),
+            'action_mask': np.zeros(ACTION_MASK_SHAPE, dtype=np.bool_),
+        }
+        self._free = np.zeros((HEIGHT, WIDTH), dtype=np.bool_)
+        self._info: Dict = {}
+        self.game: Optional[TerminalGame] = None
+
+    def _observe(self) -> Dict[str, np.ndarray]:
+        observation = self._observation
+        encode_observation(self.game, observation['board'], observation['scalars'])
+        write_action_mask(observation['board'], observation['scalars'], 0, observation['action_mask'], self._free)
+        return observation
+
+    def reset(self, *, seed: Optional[int] = None, options: Optional[dict] = None) -> Tuple[Dict[str, np.ndarray], Dict]:
+        super().reset(seed=seed)
+        self.game = TerminalGame(Player(), self.opponent())
+        return self._observe(), self._info
+
+    def step(self, action: np.ndarray) -> Tuple[Dict[str, np.ndarray], float, bool, bool, Dict]:
+        game = self.game
+        agent, opponent = game.player1, game.player2
+        margin = agent.health - opponent.health
+
+        # The phases of TerminalGame.play_turn, with the agent's actions given instead of asked for.
+        deployments, upgrades = decode_actions(np.asarray(action))
+        decisions = game.decisions
+        decisions.start_turn()
+        game.apply_deployments(agent, deployments)
+        game.apply_deployments(opponent, decisions.call(1, opponent.deploy, game.get_game_state()))
+        agent.apply_upgrades(game, upgrades)
+        opponent.apply_upgrades(game, decisions.call(1, opponent.upgrade, game.get_game_state()))
+        game.action_phase()
+        game.current_turn += 1
+        game.restore_phase()
+
+        reward = float((agent.health - opponent.health) - margin)
+        terminated = agent.health <= 0 or opponent.health <= 0
+        truncated = not terminated and game.is_game_over()
+        if self.render_mode == 'human':
+            self.render()
+        return self._observe(), reward, terminated, truncated, self._info
+
+    def render(self) -> Optional[str]:
+        """
+        Print the board in "human" mode, or return it as a string with ANSI colors in "ansi" mode.
+        """
+        board = self.game.render()
+        if self.render_mode == 'human':
+            print(board)
+            return None
+        return board
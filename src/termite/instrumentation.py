@@ -0,0 +1,58 @@
+"""
+Opt-in counters and timers for the simulation hot paths.
+
+A game only records statistics after :meth:`TerminalGame.enable_stats`; otherwise every instrumented site
+costs a single ``is None`` check. Statistics accumulate in a :class:`GameStats` object, which can be shared
+by several games to aggregate them, and exported as a plain dict with :meth:`GameStats.as_dict`.
+"""
+from typing import Dict, List
+
+# The steps of TerminalGame.process_frame, in order.
+FRAME_STEPS = ('shields', 'move', 'reset_attacks', 'attacks', 'removal')
+
+class GameStats:
+    """
+    Cumulative statistics of one or more games.
+    """
+    def __init__(self):
+        # Wall time spent in each step of process_frame, in seconds.
+        self.step_seconds: Dict[str, float] = dict.fromkeys(FRAME_STEPS, 0.0)
+        # Searches of Pathfinder._idealness_search and Pathfinder._validate, and tiles they expanded.
+        self.search_calls = 0
+        self.search_nodes = 0
+        self.validate_calls = 0
+        self.validate_nodes = 0
+        # Breadth-first searches of flow fields, which replace the two searches above for most paths.
+        self.flow_field_searches = 0
+        self.flow_field_nodes = 0
+        # Targets picked, and the candidates in range they were picked from.
+        self.target_selections = 0
+        self.target_candidates = 0
+        self.frames_per_action_phase: List[int] = []
+        # Frames played by TerminalGame.skip_idle_frames instead of process_frame.
+        self.skipped_frames = 0
+        # Units on the map at the start of every frame.
+        self.units_per_frame: List[int] = []
+
+    @property
+    def frames(self) -> int:
+        return len(self.units_per_frame)
+
+    def as_dict(self) -> dict:
+        """
+        Returns the statistics as a JSON-serializable dict.
+        """
+        return {
+            'step_seconds': dict(self.step_seconds),
+            'search_calls': self.search_calls,
+            'search_nodes': self.search_nodes,
+            'validate_calls': self.validate_calls,
+            'validate_nodes': self.validate_nodes,
+            'flow_field_searches': self.flow_field_searches,
+            'flow_field_nodes': self.flow_field_nodes,
+            'target_selections': self.target_selections,
+            'target_candidates': self.target_candidates,
+            'frames_per_action_phase': list(self.frames_per_action_phase),
+            'skipped_frames': self.skipped_frames,
+            'units_per_frame': list(self.units_per_frame),
+        }
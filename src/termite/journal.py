@@ -0,0 +1,54 @@
+"""
+Undo journal for in-place search rollouts.
+
+When a :class:`TerminalGame` records a journal (see :meth:`TerminalGame.enable_journal`), every mutation
+of the simulation state during the deploy, upgrade, action and restore phases pushes an undo entry:
+the previous values of the attributes it is about to change, or an inverse operation for placements,
+removals, moves and shields. :meth:`Journal.rollback` pops and applies the entries in reverse order,
+bringing the game back to the exact state it had when the mark was taken.
+"""
+from typing import Any, Callable, List, Tuple
+
+def _set_attributes(obj: Any, names: Tuple[str, ...], values: tuple) -> None:
+    for name, value in zip(names, values):
+        setattr(obj, name, value)
+
+class Journal:
+    """
+    A stack of undo entries.
+    """
+    def __init__(self):
+        self.entries: List[Tuple[Callable, tuple]] = []
+
+    def mark(self) -> int:
+        """
+        Returns a mark to roll back to.
+        """
+        return len(self.entries)
+
+    def save(self, obj: Any, *names: str) -> None:
+        """
+        Record the current values of attributes of an object that are about to change.
+        """
+        self.entries.append((_set_attributes, (obj, names, tuple([getattr(obj, name) for name in names]))))
+
+    def push(self, undo: Callable, *args) -> None:
+        """
+        Record an operation undoing a mutation, called as ``undo(*args)`` on rollback.
+        """
+        self.entries.append((undo, args))
+
+    def rollback(self, mark: int) -> None:
+        """
+        Undo every mutation recorded since the mark was taken, most recent first.
+        """
+        entries = self.entries
+        while len(entries) > mark:
+            undo, args = entries.pop()
+            undo(*args)
+
+    def clear(self) -> None:
+        """
+        Forget all entries, e.g. once a simulated line of play is kept. Marks taken before become invalid.
+        """
+        self.entries.clear()
@@ -1,40 +1,136 @@
 import heapq
-from typing import List, Union, Optional, Tuple
+from typing import Callable, Dict, Iterable, List, Union, Optional, Sequence, Set, Tuple
 class Map:
+    """
+    The arena, stored in layers:
+
+    - :attr:`grid`, the structure layer: ``grid[y][x]`` is the structure on a tile, or None.
+    - :attr:`blocked`, the same layer as a flat bitboard (one byte per tile, ``y * width + x``), read by pathfinding.
+    - :attr:`index`, the occupancy layer: every unit on the map, bucketed by tile. Mobile units are moved
+      between buckets one tile at a time as they move, so keeping the map up to date costs nothing per frame
+      beyond the units that moved.
+    - :attr:`threats`, the turret damage and support shielding covering each tile, see :mod:`termite.threat`.
+    """
     def __init__(self):
         self.width = 28
         self.height = 28
-        self.grid: List = [[None for _ in range(self.width)] for _ in range(self.height)]
+        self.grid: List[List[Optional['Structure']]] = [[None for _ in range(self.width)] for _ in range(self.height)]
+        self.blocked = bytearray(self.width * self.height)
+        # Units bucketed by tile for range queries. Maintained by TerminalGame as units are placed, move and die.
+        self.index = SpatialIndex(self.width, self.height)
+        self.threats = ThreatMap(self)
+        # Incremented whenever a structure is placed or removed, so that cached pathing data can be invalidated.
+        self.structure_version = 0
+        # Zobrist hash of the structures on the map, see termite.zobrist.
+        self.zobrist = 0
+        self._structure_listeners: List[Callable[['Structure', int, int, bool], None]] = []
+
+    def subscribe(self, callback: Callable[['Structure', int, int, bool], None]) -> None:
+        """
+        Register a callback invoked as ``callback(structure, x, y, placed)`` whenever a structure
+        is placed (``placed=True``) or removed (``placed=False``).
+        """
+        self._structure_listeners.append(callback)
 
     def is_in_arena(self, x: int, y: int) -> bool:
         """
         Check if a given position is within the arena boundaries.
         """
-        return abs(x - 13.5) + abs(y - 13.5) <= 14
+        return (x, y) in ARENA_TILE_SET
+
+    def mobile_units(self, x: int, y: int) -> List['MobileUnit']:
+        """
+        Returns the mobile units standing on a tile, in placement order.
+        """
+        return [unit for unit in self.index.tiles[y * self.width + x] if unit.type_code >= SCOUT]
 
     def place_unit(self, unit: 'Unit', x: int, y: int):
         """
         Place a unit on the map at the given position.
+
+        Only structures are stored in the structure layer. Mobile units are only tracked by :attr:`index`.
         """
         assert self.is_in_arena(x, y) # Redundant check
-        if isinstance(unit, MobileUnit):
-            # Mobile units can be stacked, so we'll store them in a list
-            if self.grid[y][x] is None or not isinstance(self.grid[y][x], list):
-                self.grid[y][x] = []
-            self.grid[y][x].append(unit)
-        else:
-            # Structures cannot be stacked
-            self.grid[y][x] = unit
+        if unit.type_code >= SCOUT:
+            return
+        self.grid[y][x] = unit
+        self.blocked[y * self.width + x] = 1
+        unit._map = self
+        unit._hash_key = structure_key(unit, x, y)
+        self.zobrist ^= unit._hash_key
+        self.threats.add(unit)
+        self.structure_version += 1
+        for callback in self._structure_listeners:
+            callback(unit, x, y, True)
+
+    def place_structures(self, structures: Iterable['Structure']) -> None:
+        """
+        Place many structures at their positions at once, e.g. when setting up a position.
+
+        Listeners are not notified: cached pathing data is invalidated as a whole instead of repaired
+        structure by structure, so mobile units on the map are not flagged for repathing.
+        """
+        grid = self.grid
+        blocked = self.blocked
+        zobrist = self.zobrist
+        for structure in structures:
+            x, y = structure.position
+            assert self.is_in_arena(x, y)
+            grid[y][x] = structure
+            blocked[y * self.width + x] = 1
+            structure._map = self
+            structure._hash_key = structure_key(structure, x, y)
+            zobrist ^= structure._hash_key
+            self.threats.add(structure)
+        self.zobrist = zobrist
+        self.structure_version += 1
 
-    def clear(self):
+    def remove_unit(self, unit: 'Unit', x: int, y: int):
         """
-        Clear the map of all mobile units.
+        Remove a unit from the map at the given position.
         """
-        for y in range(self.height):
-            for x in range(self.width):
-                if isinstance(self.grid[y][x], list):
-                    self.grid[y][x] = None
-        return self
+        if unit.type_code >= SCOUT:
+            return
+        self.grid[y][x] = None
+        self.blocked[y * self.width + x] = 0
+        unit._map = None
+        self.zobrist ^= unit._hash_key
+        self.threats.remove(unit)
+        self.structure_version += 1
+        for callback in self._structure_listeners:
+            callback(unit, x, y, False)
+
+    def rehash_structure(self, structure: 'Structure') -> None:
+        """
+        Update the hash after the health or upgrade state of a structure on the map changed.
+        """
+        key = structure_key(structure, *structure.position)
+        self.zobrist ^= structure._hash_key ^ key
+        structure._hash_key = key
+
+    def upgrade_structure(self, structure: 'Structure') -> None:
+        """
+        Update the layers after a structure on the map was upgraded.
+        """
+        self.rehash_structure(structure)
+        self.threats.update(structure)
+
+    def rehash(self, structures: Iterable['Structure']) -> None:
+        """
+        Recompute the hash from scratch, after the structures were changed without going through the map
+        (e.g. restoring a snapshot or rolling back a journal).
+
+        The threat map is rebuilt lazily as well.
+
+        :param structures: All the structures on the map.
+        """
+        self.threats.invalidate()
+        zobrist = 0
+        for structure in structures:
+            structure._hash_key = structure_key(structure, *structure.position)
+            zobrist ^= structure._hash_key
+        self.zobrist = zobrist
+
 class Pathfinder:
     """
     Pathing class that implements the A* algorithm to find the shortest path between two points on the map.
@@ -43,36 +139,150 @@ class Pathfinder:
 
     A lot of code is ported from the Terminal python-algo starter kit.
     """
-    def __init__(self, game_map: Map):
+    def __init__(self, game_map: Map, use_flow_field: bool = True):
+        """
+        :param game_map: The map to path on.
+        :param use_flow_field: If True, paths are read from a :class:`FlowField` shared by all units heading
+            to the same target edge, instead of running a separate search for every unit.
+        """
         self.game_map = game_map
         self.HORIZONTAL = 1
         self.VERTICAL = 2
+        self.use_flow_field = use_flow_field
+        self._flow_fields = {}
+        self._flow_field_version = None
+        self._regions = None
+        # Mobile units following a path computed by this pathfinder, mapped to their target edge.
+        self._routes: Dict['MobileUnit', str] = {}
+        # Search counters, set by TerminalGame.enable_stats.
+        self.stats: Optional[GameStats] = None
+        game_map.subscribe(self._on_structure_change)
+
+    def find_path(self, unit: 'MobileUnit', start: Tuple[int, int], target_edge: str,
+                  move_direction: int = 0) -> List[Tuple[int, int]]:
+        """
+        Returns the path from the start tile to the target edge, including the start tile.
 
-    def find_path(self, unit: 'MobileUnit', start: Tuple[int, int], target_edge: str) -> List[Tuple[int, int]]:
-        print(target_edge)
+        :param unit: The unit following the path, whose route is tracked to flag it when structures change,
+            or None.
+        :param move_direction: The direction of the unit's previous move (HORIZONTAL or VERTICAL), or 0 for
+            a unit that has not moved yet. A unit repathing mid-route keeps its zigzag.
+        """
+        if unit is not None:
+            if unit._journal is not None:
+                unit._journal.push(self._restore_route, unit, self._routes.get(unit))
+            self._routes[unit] = target_edge
+        if self.use_flow_field:
+            path = self.get_flow_field(target_edge).get_path(start, move_direction)
+            if path is not None:
+                return path
         end_points = self._get_end_points(target_edge)
-        print(end_points)
         ideal_endpoint = self._idealness_search(start, end_points)
-        print(ideal_endpoint)
         self._validate(ideal_endpoint, end_points)
-        return self._get_path(start, end_points)
+        return self._get_path(start, end_points, move_direction)
+
+    def get_flow_field(self, target_edge: str) -> 'FlowField':
+        """
+        Returns the flow field towards the target edge for the current structure layout.
+
+        Flow fields are cached per target edge and rebuilt once the map's structures have changed.
+        """
+        if self._flow_field_version != self.game_map.structure_version:
+            self._flow_fields = {}
+            self._flow_field_version = self.game_map.structure_version
+            self._passable, self._regions = self._get_regions()
+        flow_field = self._flow_fields.get(target_edge)
+        if flow_field is None:
+            if self._regions is None:
+                # Keep the passable dict shared with the existing flow fields, which repairs keep up to date.
+                _, self._regions = self._get_regions()
+            flow_field = FlowField(self, target_edge, self._passable, self._regions)
+            self._flow_fields[target_edge] = flow_field
+        return flow_field
+
+    def forget(self, unit: 'MobileUnit') -> None:
+        """
+        Stop tracking the route of a unit, e.g. once it has been removed from the game.
+        """
+        target_edge = self._routes.pop(unit, None)
+        if target_edge is not None and unit._journal is not None:
+            unit._journal.push(self._restore_route, unit, target_edge)
+
+    def _restore_route(self, unit: 'MobileUnit', target_edge: Optional[str]) -> None:
+        if target_edge is None:
+            self._routes.pop(unit, None)
+        else:
+            self._routes[unit] = target_edge
+
+    def get_routes(self) -> Dict['MobileUnit', str]:
+        """
+        Returns a copy of the tracked routes: the units pathing with this pathfinder, mapped to their target edge.
+        """
+        return dict(self._routes)
+
+    def set_routes(self, routes: Dict['MobileUnit', str]) -> None:
+        """
+        Replace the tracked routes, e.g. when restoring a snapshot of the game.
+        """
+        self._routes = dict(routes)
+
+    def _on_structure_change(self, structure: 'Structure', x: int, y: int, placed: bool) -> None:
+        """
+        Repair the cached flow fields after a structure was placed or removed, and flag every routed unit
+        for a new path.
 
-    def _get_end_points(self, target_edge: str) -> List[Tuple[int, int]]:
+        All units are flagged, whether or not the cache was warm, so that which units repath only depends on
+        the state of the game. Units repath keeping the direction of their last move, so a unit whose
+        route did not change keeps following it.
+        """
+        tile = (x, y)
+        if self._flow_field_version == self.game_map.structure_version - 1:
+            self._passable[tile] = not placed
+            self._regions = None  # Relabelled lazily, only needed to build new flow fields.
+            for flow_field in self._flow_fields.values():
+                flow_field.repair(tile)
+            self._flow_field_version = self.game_map.structure_version
+
+        for unit in self._routes:
+            if not unit.needs_repath:
+                if unit._journal is not None:
+                    unit._journal.save(unit, 'needs_repath')
+                unit.needs_repath = True
+
+    def _get_regions(self) -> Tuple[dict, List[List[Tuple[int, int]]]]:
+        """
+        Label the connected regions of passable tiles for the current structure layout.
+
+        :return: A dict mapping every arena tile to whether it is passable, and the list of regions,
+            each given as the list of its tiles.
+        """
+        game_map = self.game_map
+        blocked = game_map.blocked
+        width = game_map.width
+        passable = {(x, y): not blocked[y * width + x] for x, y in ARENA_TILES}
+
+        regions = []
+        labelled = set()
+        for position, is_passable in passable.items():
+            if not is_passable or position in labelled:
+                continue
+            region = [position]
+            labelled.add(position)
+            for current in region:
+                for neighbor in self._get_neighbors(current):
+                    if neighbor not in labelled and passable.get(neighbor, False):
+                        labelled.add(neighbor)
+                        region.append(neighbor)
+            regions.append(region)
+        return passable, regions
+
+    def _get_end_points(self, target_edge: str) -> Tuple[Tuple[int, int], ...]:
         """
         Returns the most ideal targets to reach based on the target edge.
         """
-        end_points = []
-        if target_edge == 'top-left':
-            end_points = [(x, x + 14) for x in range(0, 14) if self.game_map.is_in_arena(x, x+14)]
-        elif target_edge == 'top-right':
-            end_points = [(x, 41-x) for x in range(14, 28) if self.game_map.is_in_arena(x, 41-x)]
-        elif target_edge == 'bottom-left':
-            end_points = [(x, 13-x) for x in range(0, 14) if self.game_map.is_in_arena(x, 13-x)]
-        elif target_edge == 'bottom-right':
-            end_points = [(x, x-14) for x in range(14, 28) if self.game_map.is_in_arena(x, x-14)]
-        return end_points
+        return EDGE_TILES.get(target_edge, ())
 
-    def _idealness_search(self, start: Tuple[int, int], end_points: List[Tuple[int, int]]) -> Tuple[int, int]:
+    def _idealness_search(self, start: Tuple[int, int], end_points: Sequence[Tuple[int, int]]) -> Tuple[int, int]:
         """
         Implements a BFS to find the most ideal reachable point.
 
@@ -88,7 +298,7 @@ class Pathfinder:
         while queue:
             current = queue.pop(0)
             for neighbor in self._get_neighbors(current):
-                if neighbor not in visited and self.game_map.is_in_arena(*neighbor) and not self._is_blocked(neighbor):
+                if neighbor not in visited and not self._is_blocked(neighbor):
                     visited.add(neighbor)
                     queue.append(neighbor)
                     current_idealness = self._get_idealness(neighbor, end_points)
@@ -96,16 +306,18 @@ class Pathfinder:
                         best_idealness = current_idealness
                         most_ideal = neighbor
 
+        if self.stats is not None:
+            self.stats.search_calls += 1
+            self.stats.search_nodes += len(visited)
         return most_ideal
 
-    def _get_neighbors(self, location: Tuple[int, int]) -> List[Tuple[int, int]]:
+    def _get_neighbors(self, location: Tuple[int, int]) -> Tuple[Tuple[int, int], ...]:
         """
-        Get the neighbors of a given location.
+        Get the neighbors of a given arena location that are inside the arena.
         """
-        x, y = location
-        return [(x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)]
+        return NEIGHBORS[location]
 
-    def _get_idealness(self, location: Tuple[int, int], end_points: List[Tuple[int, int]]) -> int:
+    def _get_idealness(self, location: Tuple[int, int], end_points: Sequence[Tuple[int, int]]) -> int:
         """
         Calculates the idealness of a location based on its distance from the target edge 
         and how deep it's in the enemy territory.
@@ -129,7 +341,7 @@ class Pathfinder:
         
         return idealness
 
-    def _get_direction_from_endpoints(self, end_points: List[Tuple[int, int]]) -> Tuple[int, int]:
+    def _get_direction_from_endpoints(self, end_points: Sequence[Tuple[int, int]]) -> Tuple[int, int]:
         """
         Get the direction of the target edge based on the end points.
 
@@ -145,25 +357,31 @@ class Pathfinder:
             direction[1] = -1
         return tuple(direction)
 
-    def _validate(self, ideal_tile: Tuple[int, int], end_points: List[Tuple[int, int]]):
+    def _validate(self, ideal_tile: Tuple[int, int], end_points: Sequence[Tuple[int, int]]):
         """
         Scan with BFS from the ideal point to calculate pathlengths from all reachable points.
         """
-        queue = [ideal_tile] if ideal_tile not in end_points else end_points.copy()
+        # Blocked end points are not valid sources: units could never step onto them,
+        # and seeding them would leave tiles without a neighbor one step closer to the edge.
+        queue = [ideal_tile] if ideal_tile not in end_points else [p for p in end_points if not self._is_blocked(p)]
         visited = set(queue)
         pathlengths = {pos: 0 for pos in queue}
 
         while queue:
             current = queue.pop(0)
             for neighbor in self._get_neighbors(current):
-                if neighbor not in visited and self.game_map.is_in_arena(*neighbor) and not self._is_blocked(neighbor):
+                if neighbor not in visited and not self._is_blocked(neighbor):
                     visited.add(neighbor)
                     queue.append(neighbor)
                     pathlengths[neighbor] = pathlengths[current] + 1
 
+        if self.stats is not None:
+            self.stats.validate_calls += 1
+            self.stats.validate_nodes += len(visited)
         self.pathlengths = pathlengths
 
-    def _get_path(self, start: Tuple[int, int], end_points: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    def _get_path(self, start: Tuple[int, int], end_points: Sequence[Tuple[int, int]],
+                  move_direction: int = 0) -> List[Tuple[int, int]]:
         """
         Once all nodes are validated, and a target is found, the unit can path to its target.
 
@@ -172,7 +390,6 @@ class Pathfinder:
         """
         path = [start]
         current = start
-        move_direction = 0
 
         while current not in end_points and self.pathlengths.get(current, float('inf')) > 0:
             next_move = self._choose_next_move(current, move_direction, end_points)
@@ -185,7 +402,7 @@ class Pathfinder:
 
         return path
 
-    def _choose_next_move(self, current: Tuple[int, int], previous_move_direction: int, end_points: List[Tuple[int, int]]) -> Tuple[int, int]:
+    def _choose_next_move(self, current: Tuple[int, int], previous_move_direction: int, end_points: Sequence[Tuple[int, int]]) -> Tuple[int, int]:
         """
         Implements movement preferences as detailed in "Patching."
 
@@ -197,14 +414,14 @@ class Pathfinder:
         :return: The next position to move to.
         """
         neighbors = self._get_neighbors(current)
-        valid_neighbors = [n for n in neighbors if self.game_map.is_in_arena(*n) and not self._is_blocked(n)]
+        valid_neighbors = [n for n in neighbors if not self._is_blocked(n)]
         
         ideal_neighbor = min(valid_neighbors, key=lambda n: (self.pathlengths.get(n, float('inf')), 
                                                              not self._better_direction(current, n, current, previous_move_direction, end_points)))
         return ideal_neighbor
 
     def _better_direction(self, prev_tile: Tuple[int, int], new_tile: Tuple[int, int], prev_best: Tuple[int, int], 
-                          previous_move_direction: int, end_points: List[Tuple[int, int]]) -> bool:
+                          previous_move_direction: int, end_points: Sequence[Tuple[int, int]]) -> bool:
         """
         Returns if the new tile is a better direction than the previous best tile.
 
@@ -226,7 +443,260 @@ class Pathfinder:
 
     def _is_blocked(self, position: Tuple[int, int]) -> bool:
         x, y = position
-        return isinstance(self.game_map.grid[y][x], Structure)
+        return self.game_map.blocked[y * self.game_map.width + x] != 0
+
+class FlowField:
+    """
+    Pathlengths and next steps towards one target edge, shared by every unit pathing to that edge.
+
+    Reproduces :meth:`Pathfinder._idealness_search` and :meth:`Pathfinder._validate` for all start tiles at once:
+    - Regions that contain a free tile of the target edge use the pathlengths of a BFS seeded from those tiles.
+    - Every other region paths towards its own most ideal tile, so it gets a BFS seeded from that tile.
+
+    Next steps are looked up per (tile, previous move direction) and memoized, following the
+    zigzag preference of :meth:`Pathfinder._choose_next_move`.
+
+    When a structure is placed or removed, :meth:`repair` updates only the pathlengths that depend on
+    the changed tile instead of rebuilding the field.
+    """
+    def __init__(self, pathfinder: Pathfinder, target_edge: str, passable: dict, regions: List[List[Tuple[int, int]]]):
+        """
+        :param pathfinder: The pathfinder whose movement rules to use.
+        :param target_edge: The target edge, e.g. 'top-left'.
+        :param passable: Maps every arena tile to whether it is free of structures. Shared with the pathfinder,
+            which keeps it up to date.
+        :param regions: The connected regions of passable tiles, see :meth:`Pathfinder._get_regions`.
+        """
+        self.pathfinder = pathfinder
+        self.target_edge = target_edge
+        self.end_points = pathfinder._get_end_points(target_edge)
+        self._end_point_set = EDGE_TILE_SETS[target_edge]
+        self.passable = passable
+        self._next_steps = {}
+        self._touched = {}
+
+        # Pathlengths for regions connected to the target edge.
+        self._edge_lengths = self._bfs([p for p in self.end_points if passable.get(p, False)])
+
+        # Regions without a free end point path towards their most ideal tile instead.
+        self._fallback_lengths = {}
+        for region in regions:
+            if region[0] not in self._edge_lengths:
+                self._add_fallback_region(region)
+
+    def pathlength(self, tile: Tuple[int, int]) -> Optional[int]:
+        """
+        Returns the pathlength of a tile, or None if no path goes through it.
+        """
+        length = self._edge_lengths.get(tile)
+        if length is None:
+            length = self._fallback_lengths.get(tile)
+        return length
+
+    def _bfs(self, sources: List[Tuple[int, int]]) -> dict:
+        """
+        Breadth-first search over passable tiles, returning the distance of every reached tile to the closest source.
+        """
+        pathlengths = {source: 0 for source in sources}
+        queue = list(sources)
+        neighbors = self.pathfinder._get_neighbors
+        for current in queue:
+            distance = pathlengths[current] + 1
+            for neighbor in neighbors(current):
+                if neighbor not in pathlengths and self.passable.get(neighbor, False):
+                    pathlengths[neighbor] = distance
+                    queue.append(neighbor)
+        stats = self.pathfinder.stats
+        if stats is not None:
+            stats.flow_field_searches += 1
+            stats.flow_field_nodes += len(pathlengths)
+        return pathlengths
+
+    def _add_fallback_region(self, region: List[Tuple[int, int]]) -> None:
+        """
+        Fill in the pathlengths of a region that cannot reach the target edge.
+        """
+        ideal_tile = max(region, key=lambda tile: self.pathfinder._get_idealness(tile, self.end_points))
+        for tile in region:
+            self._touch(tile)
+        self._fallback_lengths.update(self._bfs([ideal_tile]))
+
+    def _touch(self, tile: Tuple[int, int]) -> None:
+        """
+        Remember the pathlength of a tile before :meth:`repair` modifies it.
+        """
+        if tile not in self._touched:
+            self._touched[tile] = self.pathlength(tile)
+
+    def repair(self, tile: Tuple[int, int]) -> Set[Tuple[int, int]]:
+        """
+        Update the field after a structure was placed on or removed from a tile.
+
+        ``self.passable`` must already reflect the change.
+
+        :return: The tiles whose next steps may have changed: tiles whose pathlength changed, and their neighbors.
+        """
+        self._touched = {}
+        self._touch(tile)
+        if self.passable[tile]:
+            self._repair_unblocked(tile)
+            unreached = []
+        else:
+            unreached = self._repair_blocked(tile)
+        self._repair_fallback(tile, unreached)
+
+        changed = [t for t, length in self._touched.items() if self.pathlength(t) != length]
+        changed.append(tile)
+        stale = set(changed)
+        for t in changed:
+            stale.update(self.pathfinder._get_neighbors(t))
+        for t in stale:
+            for direction in (0, self.pathfinder.HORIZONTAL, self.pathfinder.VERTICAL):
+                self._next_steps.pop((t, direction), None)
+        self._touched = {}
+        return stale
+
+    def _repair_blocked(self, tile: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """
+        Dynamic BFS update for a tile that became blocked.
+
+        Invalidates the tiles that have no shortest path left that avoids the tile,
+        then re-seeds them from their still valid neighbors.
+
+        :return: The tiles that can no longer reach the target edge.
+        """
+        edge_lengths = self._edge_lengths
+        if tile not in edge_lengths:
+            return []
+        neighbors = self.pathfinder._get_neighbors
+        old_lengths = {tile: edge_lengths.pop(tile)}
+        queue = [tile]
+        for current in queue:
+            child_length = old_lengths[current] + 1
+            for child in neighbors(current):
+                if edge_lengths.get(child) != child_length:
+                    continue
+                if any(edge_lengths.get(parent) == child_length - 1 for parent in neighbors(child)):
+                    continue
+                self._touch(child)
+                old_lengths[child] = edge_lengths.pop(child)
+                queue.append(child)
+
+        invalidated = set(queue[1:])
+        heap = []
+        for current in invalidated:
+            lengths = [edge_lengths[n] + 1 for n in neighbors(current) if n in edge_lengths]
+            if lengths:
+                heapq.heappush(heap, (min(lengths), current))
+        while heap:
+            length, current = heapq.heappop(heap)
+            if current in edge_lengths:
+                continue
+            edge_lengths[current] = length
+            for neighbor in neighbors(current):
+                if neighbor in invalidated and neighbor not in edge_lengths:
+                    heapq.heappush(heap, (length + 1, neighbor))
+        return [t for t in invalidated if t not in edge_lengths]
+
+    def _repair_unblocked(self, tile: Tuple[int, int]) -> None:
+        """
+        Dynamic BFS update for a tile that became passable: propagate the shorter pathlengths it opens up.
+        """
+        edge_lengths = self._edge_lengths
+        neighbors = self.pathfinder._get_neighbors
+        if tile in self._end_point_set:
+            length = 0
+        else:
+            lengths = [edge_lengths[n] + 1 for n in neighbors(tile) if n in edge_lengths]
+            if not lengths:
+                return
+            length = min(lengths)
+        edge_lengths[tile] = length
+        queue = [tile]
+        for current in queue:
+            length = edge_lengths[current] + 1
+            for neighbor in neighbors(current):
+                if self.passable.get(neighbor, False) and edge_lengths.get(neighbor, length + 1) > length:
+                    self._touch(neighbor)
+                    edge_lengths[neighbor] = length
+                    queue.append(neighbor)
+
+    def _repair_fallback(self, tile: Tuple[int, int], unreached: List[Tuple[int, int]]) -> None:
+        """
+        Recompute the regions without a free end point that touch the changed tile or were just cut off.
+        """
+        fallback = self._fallback_lengths
+        neighbors = self.pathfinder._get_neighbors
+        seeds = [tile, *neighbors(tile), *unreached]
+
+        # Drop the old regions that touch the seeds.
+        dropped = [t for t in seeds if t in fallback]
+        for t in dropped:
+            self._touch(t)
+            fallback.pop(t)
+        for current in dropped:
+            for neighbor in neighbors(current):
+                if neighbor in fallback:
+                    self._touch(neighbor)
+                    fallback.pop(neighbor)
+                    dropped.append(neighbor)
+
+        # Relabel whatever is passable and cannot reach the edge.
+        for seed in seeds + dropped:
+            if not self.passable.get(seed, False) or seed in self._edge_lengths or seed in fallback:
+                continue
+            region = [seed]
+            labelled = {seed}
+            for current in region:
+                for neighbor in neighbors(current):
+                    if neighbor not in labelled and self.passable.get(neighbor, False):
+                        labelled.add(neighbor)
+                        region.append(neighbor)
+            self._add_fallback_region(region)
+
+    def next_step(self, current: Tuple[int, int], previous_move_direction: int) -> Tuple[int, int]:
+        """
+        Returns the tile a unit at `current` moves to next, given the direction of its previous move.
+        """
+        key = (current, previous_move_direction)
+        step = self._next_steps.get(key)
+        if step is None:
+            pathfinder = self.pathfinder
+            valid_neighbors = [n for n in pathfinder._get_neighbors(current) if self.passable.get(n, False)]
+            def sort_key(n):
+                length = self.pathlength(n)
+                return (float('inf') if length is None else length,
+                        not pathfinder._better_direction(current, n, current, previous_move_direction, self.end_points))
+            step = min(valid_neighbors, key=sort_key)
+            self._next_steps[key] = step
+        return step
+
+    def get_path(self, start: Tuple[int, int], move_direction: int = 0) -> Optional[List[Tuple[int, int]]]:
+        """
+        Returns the path from the start tile to the target edge, including the start tile.
+
+        Returns None if the start tile is not a passable tile of the arena.
+
+        :param move_direction: The direction of the previous move, see :meth:`Pathfinder.find_path`.
+        """
+        if not self.passable.get(start, False):
+            return None
+        path = [start]
+        current = start
+        while current not in self._end_point_set and self.pathlength(current) > 0:
+            next_move = self.next_step(current, move_direction)
+            if current[0] == next_move[0]:
+                move_direction = self.pathfinder.VERTICAL
+            else:
+                move_direction = self.pathfinder.HORIZONTAL
+            path.append(next_move)
+            current = next_move
+        return path
 
 # Prevent circular import
-from .units import Unit, MobileUnit, Structure
\ No newline at end of file
+from .units import Unit, MobileUnit, Structure, SCOUT
+from .spatial import SpatialIndex
+from .threat import ThreatMap
+from .geometry import ARENA_TILES, ARENA_TILE_SET, EDGE_TILES, EDGE_TILE_SETS, NEIGHBORS
+from .zobrist import structure_key
+from .instrumentation import GameStats
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""
+Record games of the simulator as Terminal ``.replay`` files.
+
+A :class:`ReplayRecorder` listens to the events of a game (:mod:`termite.events`) and writes one replay frame
+per deploy phase and per action frame, in the layout of the official replays, so that recorded games open in
+the official viewer and read back with :mod:`termite.replay`::
+
+    game = TerminalGame(player1, player2)
+    with ReplayRecorder(game, 'game.replay.gz'):
+        while not game.is_game_over():
+            game.play_turn()
+
+Frames are streamed through a :class:`~termite.replay.ReplayWriter`. Unit ids are assigned in spawn order.
+The computation time of the players, measured by ``game.decisions``, is only recorded in the ``endStats``;
+the computation time of every frame is recorded as 0.
+"""
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from .events import (BreachEvent, DamageEvent, FrameEvent, MoveEvent, SelfDestructEvent, ShieldEvent, SpawnEvent,
+                     UpgradeEvent)
+from .replay import REMOVE_CODE, UPGRADE_CODE, ReplayWriter
+from .units import Unit, MobileUnit, Structure, UNIT_STATS, SUPPORT, TURRET, SCOUT, INTERCEPTOR
+
+# Icons and shorthands of the official viewer, by type code.
+_ICONS = ('S3_filter', 'S3_encryptor', 'S3_destructor', 'S3_ping', 'S3_emp', 'S3_scrambler', 'S3_removal', 'S3_upgrade')
+_SHORTHANDS = ('FF', 'EF', 'DF', 'PI', 'EI', 'SI', 'RM', 'UP')
+# Keys of the official unit information for the stats of UNIT_STATS that change with an upgrade.
+_UPGRADE_KEYS = {'health': 'startHealth', 'damage': 'attackDamageWalker', 'shielding': 'shieldPerUnit'}
+
+_RECORDED_EVENTS = (SpawnEvent, UpgradeEvent, MoveEvent, ShieldEvent, DamageEvent, SelfDestructEvent, BreachEvent)
+
+def unit_information() -> List[Dict[str, Any]]:
+    """
+    Returns the ``unitInformation`` of a replay header, built from :data:`~termite.units.UNIT_STATS`.
+    """
+    information = []
+    for code, (stats, upgraded) in enumerate(UNIT_STATS):
+        entry = {'display': stats.name, 'shorthand': _SHORTHANDS[code], 'icon': _ICONS[code],
+                 'startHealth': stats.health, 'getHitRadius': 0.01}
+        if code < SCOUT:
+            entry.update(unitCategory=0, cost1=stats.cost, refundPercentage=0.75, turnsRequiredToRemove=1)
+            range_key = 'shieldRange' if code == SUPPORT else 'attackRange'
+            if code == SUPPORT:
+                entry.update(shieldRange=stats.range, shieldPerUnit=stats.shielding, shieldBonusPerY=0, shieldDecay=0)
+            elif code == TURRET:
+                entry.update(attackRange=stats.range, attackDamageWalker=stats.damage, attackDamageTower=0)
+            upgrade = {_UPGRADE_KEYS.get(field, range_key): value
+                       for field, value in upgraded._asdict().items() if value != getattr(stats, field)}
+            if stats.upgrade_cost != stats.cost:
+                upgrade['cost1'] = stats.upgrade_cost
+            entry['upgrade'] = upgrade
+        else:
+            entry.update(unitCategory=1, cost2=stats.cost, speed=1 / stats.speed, attackRange=stats.range,
+                         attackDamageWalker=stats.damage, attackDamageTower=0 if code == INTERCEPTOR else stats.damage,
+                         selfDestructDamageWalker=stats.health, selfDestructDamageTower=stats.health,
+                         selfDestructRange=1.5, selfDestructStepsRequired=5, playerBreachDamage=1, metalForBreach=1)
+        information.append(entry)
+    for code, display in ((REMOVE_CODE, 'Remove'), (UPGRADE_CODE, 'Upgrade')):
+        information.append({'display': display, 'shorthand': _SHORTHANDS[code], 'icon': _ICONS[code]})
+    return information
+
+def _number(value: float) -> Union[int, float]:
+    # Replays round health and resources to one decimal, and write whole numbers without one.
+    value = round(float(value), 1)
+    return int(value) if value.is_integer() else value
+
+class ReplayRecorder:
+    """
+    Writes the frames of a game to a replay file as it is played.
+
+    The recorder subscribes to the events of the game when created, and writes the last frame, with the
+    ``endStats``, when closed.
+    """
+    def __init__(self, game: 'TerminalGame', path: str, buffer_size: int = 1 << 20, compresslevel: int = 1):
+        """
+        :param game: The game to record, from its current state.
+        :param path: The replay file. Files ending in ``.gz`` are gzip-compressed.
+        :param buffer_size: See :class:`~termite.replay.ReplayWriter`.
+        :param compresslevel: See :class:`~termite.replay.ReplayWriter`.
+        """
+        self.game = game
+        self.writer = ReplayWriter(path, {'unitInformation': unit_information()}, buffer_size, compresslevel)
+        self._ids: Dict[Unit, str] = {}
+        self._upgrade_ids: Dict[Structure, str] = {}
+        self._next_id = 1
+        # Events of the frame being played, written with it.
+        self._pending: List[tuple] = []
+        # Units of the last written frame, to find the ones that died since.
+        self._alive: List[Unit] = []
+        self._frame = 0
+        self._turn_info: Optional[List[int]] = None
+        self._action_frames = 0
+        self._spent = [[0, 0], [0, 0]]
+        self._points = [0, 0]
+        self._start = time.perf_counter()
+        for event_type in _RECORDED_EVENTS:
+            game.events.subscribe(event_type, self._pending.append)
+        game.events.subscribe(FrameEvent, self._on_frame)
+
+    def _id(self, unit: Unit) -> str:
+        unit_id = self._ids.get(unit)
+        if unit_id is None:
+            unit_id = self._ids[unit] = str(self._next_id)
+            self._next_id += 1
+        return unit_id
+
+    @staticmethod
+    def _player(unit: Unit) -> int:
+        return 1 if unit.side == 'bottom' else 2
+
+    def _on_frame(self, event: FrameEvent) -> None:
+        if event.phase == 0 and self._turn_info is not None and not self._action_frames and self._pending:
+            # The action phase of the previous turn had no frame: write its deployments in a frame of their own.
+            self._write(1, self._turn_info[1], 0)
+        self._action_frames = 0 if event.phase == 0 else self._action_frames + 1
+        self._write(event.phase, event.turn, event.frame)
+
+    def _write(self, phase: int, turn: int, frame_in_turn: int, end_stats: Optional[Dict[str, Any]] = None) -> None:
+        state = self.game.get_game_state()
+        units = state['units']
+        events = self._events()
+        alive = set(units)
+        for unit in self._alive:
+            if unit not in alive:
+                events['death'].append([list(unit.position), unit.type_code, self._ids.pop(unit),
+                                        self._player(unit), False])
+                self._upgrade_ids.pop(unit, None)
+        self._alive = list(units)
+
+        unit_lists = ([[] for _ in range(UPGRADE_CODE + 1)], [[] for _ in range(UPGRADE_CODE + 1)])
+        for unit in units:
+            x, y = unit.position
+            health = unit.health + unit.shields if isinstance(unit, MobileUnit) else unit.health
+            player_units = unit_lists[self._player(unit) - 1]
+            player_units[unit.type_code].append([x, y, _number(health), self._id(unit)])
+            if unit in self._upgrade_ids:
+                player_units[UPGRADE_CODE].append([x, y, 0, self._upgrade_ids[unit]])
+
+        self._turn_info = [phase, turn, frame_in_turn, self._frame]
+        frame = {'p1Units': unit_lists[0], 'p2Units': unit_lists[1],
+                 'p1Stats': self._stats(state['player1_health'], state['player1_resources']),
+                 'p2Stats': self._stats(state['player2_health'], state['player2_resources']),
+                 'events': events, 'turnInfo': self._turn_info}
+        if end_stats is not None:
+            frame['endStats'] = end_stats
+        else:
+            self._frame += 1
+        self.writer.write_frame(frame)
+
+    @staticmethod
+    def _stats(health: float, resources: Dict[str, float]) -> List[Union[int, float]]:
+        return [_number(health), _number(resources['structure']), _number(resources['mobile']), 0]
+
+    def _events(self) -> Dict[str, list]:
+        """
+        Convert the events received since the last frame to their replay layout.
+        """
+        events = {kind: [] for kind in ('selfDestruct', 'breach', 'damage', 'shield', 'move', 'spawn', 'death',
+                                        'attack', 'melee')}
+        for event in self._pending:
+            if isinstance(event, MoveEvent):
+                unit = event.unit
+                events['move'].append([list(event.source), list(event.destination), [0, 0], unit.type_code,
+                                       self._id(unit), self._player(unit)])
+            elif isinstance(event, DamageEvent):
+                attacker, target = event.attacker, event.target
+                damage = _number(event.damage)
+                events['attack'].append([list(attacker.position), list(target.position), damage, attacker.type_code,
+                                         self._id(attacker), self._id(target), self._player(attacker)])
+                events['damage'].append([list(target.position), damage, target.type_code, self._id(target),
+                                         self._player(target)])
+            elif isinstance(event, ShieldEvent):
+                support, unit = event.support, event.unit
+                events['shield'].append([list(support.position), list(event.position), _number(event.amount),
+                                         support.type_code, self._id(support), self._id(unit), self._player(unit)])
+            elif isinstance(event, SpawnEvent):
+                unit = event.unit
+                events['spawn'].append([list(event.position), unit.type_code, self._id(unit), self._player(unit)])
+                self._spent[self._player(unit) - 1][isinstance(unit, MobileUnit)] += unit.cost
+            elif isinstance(event, UpgradeEvent):
+                structure = event.structure
+                upgrade_id = self._upgrade_ids[structure] = str(self._next_id)
+                self._next_id += 1
+                events['spawn'].append([list(event.position), UPGRADE_CODE, upgrade_id, self._player(structure)])
+                self._spent[self._player(structure) - 1][0] += structure.upgrade_cost
+            elif isinstance(event, SelfDestructEvent):
+                unit = event.unit
+                events['selfDestruct'].append([list(event.position), [list(target.position) for target in event.targets],
+                                               _number(event.damage), unit.type_code, self._id(unit),
+                                               self._player(unit)])
+            elif isinstance(event, BreachEvent):
+                unit = event.unit
+                events['breach'].append([list(event.position), _number(event.damage), unit.type_code, self._id(unit),
+                                         self._player(unit)])
+                self._points[self._player(unit) - 1] += event.damage
+        self._pending.clear()
+        return events
+
+    def _end_stats(self) -> Dict[str, Any]:
+        game = self.game
+        winner = 0
+        if game.is_game_over():
+            winner = {'Player 1': 1, 'Player 2': 2}.get(game.get_winner(), 0)
+        end_stats = {'duration': int((time.perf_counter() - self._start) * 1000), 'winner': winner,
+                     'frames': self._turn_info[3], 'turns': game.current_turn}
+        for index, player in enumerate((game.player1, game.player2)):
+            end_stats[f'player{index + 1}'] = {
+                'name': type(player).__name__, 'points_scored': _number(self._points[index]),
+                'stationary_resource_spent': _number(self._spent[index][0]),
+                'dynamic_resource_spent': _number(self._spent[index][1]),
+                'total_computation_time': int(game.decisions.computation_time[index] * 1000), 'crashed': False,
+                'timeout_death': False}
+        return end_stats
+
+    def close(self) -> None:
+        """
+        Write the last frame and close the file. The game can keep being played without being recorded.
+        """
+        if self.writer is None:
+            return
+        for event_type in _RECORDED_EVENTS:
+            self.game.events.unsubscribe(event_type, self._pending.append)
+        self.game.events.unsubscribe(FrameEvent, self._on_frame)
+        if self._turn_info is not None:
+            if not self._action_frames and self._pending:
+                self._write(1, self._turn_info[1], 0)
+            _, turn, frame_in_turn, self._frame = self._turn_info
+            self._write(2, turn, frame_in_turn, self._end_stats())
+        self.writer.close()
+        self.writer = None
+
+    def __enter__(self) -> 'ReplayRecorder':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
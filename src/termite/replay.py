@@ -0,0 +1,276 @@
+"""
+Streaming reader and writer for Terminal ``.replay`` files.
+
+A replay is newline-delimited JSON: a header line (game configuration, with the stats of every unit
+type under ``unitInformation``), then one line per frame. The last frame line also holds ``endStats``.
+:class:`ReplayReader` decodes the file one line at a time into :class:`ReplayFrame` records of typed
+NumPy arrays, so memory stays bounded by the size of one frame whatever the length of the replay.
+:func:`load_replay` concatenates the frames of one replay into columns. :class:`ReplayWriter` writes the
+same layout from frame dicts (see :mod:`termite.recorder` to record games of the simulator).
+
+Type codes follow the replay spawn codes: 0-5 are the unit types, 6 marks a structure pending removal
+and 7 an upgrade. Players are 1 and 2.
+"""
+import gzip
+import json
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+# Type codes of the replay unit lists and spawn events beyond the unit types.
+REMOVE_CODE = 6
+UPGRADE_CODE = 7
+
+# Units on the board in one frame, one row per unit, from the p1Units and p2Units lists.
+UNIT_DTYPE = np.dtype([('player', np.int8), ('type', np.int8), ('x', np.int8), ('y', np.int8),
+                       ('health', np.float64), ('id', np.int32)])
+
+# One dtype per event kind, with the fields in the order of the JSON lists.
+EVENT_DTYPES: Dict[str, np.dtype] = {
+    'spawn': np.dtype([('x', np.int8), ('y', np.int8), ('type', np.int8), ('id', np.int32), ('player', np.int8)]),
+    'move': np.dtype([('x', np.int8), ('y', np.int8), ('to_x', np.int8), ('to_y', np.int8),
+                      ('aux_x', np.int8), ('aux_y', np.int8), ('type', np.int8), ('id', np.int32), ('player', np.int8)]),
+    'damage': np.dtype([('x', np.int8), ('y', np.int8), ('damage', np.float32), ('type', np.int8),
+                        ('id', np.int32), ('player', np.int8)]),
+    'shield': np.dtype([('x', np.int8), ('y', np.int8), ('to_x', np.int8), ('to_y', np.int8), ('amount', np.float32),
+                        ('type', np.int8), ('id', np.int32), ('target_id', np.int32), ('player', np.int8)]),
+    'death': np.dtype([('x', np.int8), ('y', np.int8), ('type', np.int8), ('id', np.int32), ('player', np.int8),
+                       ('removed', np.bool_)]),
+    'attack': np.dtype([('x', np.int8), ('y', np.int8), ('to_x', np.int8), ('to_y', np.int8), ('damage', np.float32),
+                        ('type', np.int8), ('id', np.int32), ('target_id', np.int32), ('player', np.int8)]),
+    'breach': np.dtype([('x', np.int8), ('y', np.int8), ('damage', np.float32), ('type', np.int8),
+                        ('id', np.int32), ('player', np.int8)]),
+    # The list of tiles hit by the explosion is not kept.
+    'selfDestruct': np.dtype([('x', np.int8), ('y', np.int8), ('damage', np.float32), ('type', np.int8),
+                              ('id', np.int32), ('player', np.int8)]),
+}
+# Melee events have the layout of attacks.
+EVENT_DTYPES['melee'] = EVENT_DTYPES['attack']
+EVENT_KINDS = tuple(EVENT_DTYPES)
+
+# Flatten one JSON event of each kind into a row of its dtype.
+_EVENT_ROWS = {
+    'spawn': lambda e: (e[0][0], e[0][1], e[1], int(e[2]), e[3]),
+    'move': lambda e: (e[0][0], e[0][1], e[1][0], e[1][1], e[2][0], e[2][1], e[3], int(e[4]), e[5]),
+    'damage': lambda e: (e[0][0], e[0][1], e[1], e[2], int(e[3]), e[4]),
+    'shield': lambda e: (e[0][0], e[0][1], e[1][0], e[1][1], e[2], e[3], int(e[4]), int(e[5]), e[6]),
+    'death': lambda e: (e[0][0], e[0][1], e[1], int(e[2]), e[3], e[4]),
+    'attack': lambda e: (e[0][0], e[0][1], e[1][0], e[1][1], e[2], e[3], int(e[4]), int(e[5]), e[6]),
+    'breach': lambda e: (e[0][0], e[0][1], e[1], e[2], int(e[3]), e[4]),
+    'selfDestruct': lambda e: (e[0][0], e[0][1], e[2], e[3], int(e[4]), e[5]),
+}
+_EVENT_ROWS['melee'] = _EVENT_ROWS['attack']
+
+class ReplayFrame(NamedTuple):
+    """
+    One decoded frame of a replay.
+    """
+    # (phase, turn, frame in turn, frame), int32.
+    turn_info: np.ndarray
+    # (player, stat) float64 array of shape (2, 4): health, structure points, mobile points, computation time in ms.
+    stats: np.ndarray
+    # Array of UNIT_DTYPE, player 1 first, by type code.
+    units: np.ndarray
+    # Arrays of EVENT_DTYPES by event kind.
+    events: Dict[str, np.ndarray]
+
+class Replay(NamedTuple):
+    """
+    All the frames of one replay as columns. Rows of frame ``i`` are ``units[unit_offsets[i]:unit_offsets[i + 1]]``,
+    and the same with ``event_offsets[kind]`` for the events.
+    """
+    header: Dict[str, Any]
+    end_stats: Optional[Dict[str, Any]]
+    turn_info: np.ndarray
+    stats: np.ndarray
+    units: np.ndarray
+    unit_offsets: np.ndarray
+    events: Dict[str, np.ndarray]
+    event_offsets: Dict[str, np.ndarray]
+
+    def frame(self, index: int) -> ReplayFrame:
+        """
+        Returns frame ``index`` as views into the columns.
+        """
+        return ReplayFrame(self.turn_info[index], self.stats[index],
+                           self.units[self.unit_offsets[index]:self.unit_offsets[index + 1]],
+                           {kind: events[self.event_offsets[kind][index]:self.event_offsets[kind][index + 1]]
+                            for kind, events in self.events.items()})
+
+def decode_units(p1_units: List[List[list]], p2_units: List[List[list]]) -> np.ndarray:
+    """
+    Decode the p1Units and p2Units lists of a frame: for each type code, a list of [x, y, health, id].
+    """
+    rows = [(player, code, x, y, health, int(unit_id))
+            for player, units in ((1, p1_units), (2, p2_units))
+            for code, units_of_type in enumerate(units)
+            for x, y, health, unit_id in units_of_type]
+    return np.array(rows, dtype=UNIT_DTYPE)
+
+def decode_events(events: Dict[str, list]) -> Dict[str, np.ndarray]:
+    """
+    Decode the events of a frame. Kinds missing from the frame decode to empty arrays.
+    """
+    decoded = {}
+    for kind in EVENT_KINDS:
+        row = _EVENT_ROWS[kind]
+        decoded[kind] = np.array([row(event) for event in events.get(kind, ())], dtype=EVENT_DTYPES[kind])
+    return decoded
+
+def decode_frame(frame: Dict[str, Any]) -> ReplayFrame:
+    """
+    Decode one parsed frame line.
+    """
+    return ReplayFrame(np.array(frame['turnInfo'], dtype=np.int32),
+                       np.array([frame['p1Stats'], frame['p2Stats']], dtype=np.float64),
+                       decode_units(frame['p1Units'], frame['p2Units']),
+                       decode_events(frame['events']))
+
+def _open(path: str):
+    if str(path).endswith('.gz'):
+        return gzip.open(path, 'rt')
+    return open(path)
+
+class ReplayReader:
+    """
+    Iterates over the frames of a replay file, reading one line at a time.
+
+    The header is read when the reader is created. :attr:`end_stats` is set once the last frame has been read.
+    Files ending in ``.gz`` are decompressed on the fly.
+
+    ::
+
+        with ReplayReader(path) as reader:
+            for frame in reader:
+                ...
+            winner = reader.end_stats['winner']
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = _open(path)
+        line = self._file.readline()
+        if not line.strip():
+            self._file.close()
+            raise ValueError(f"{path} is not a replay: missing header")
+        # Game configuration. unit_information holds the stats of each type code.
+        self.header: Dict[str, Any] = json.loads(line)
+        self.unit_information: List[Dict[str, Any]] = self.header.get('unitInformation', [])
+        self.end_stats: Optional[Dict[str, Any]] = None
+
+    def __iter__(self) -> Iterator[ReplayFrame]:
+        for line in self._file:
+            if not line.strip():
+                continue
+            frame = json.loads(line)
+            if 'endStats' in frame:
+                self.end_stats = frame['endStats']
+            yield decode_frame(frame)
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> 'ReplayReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class ReplayWriter:
+    """
+    Writes a replay file: a header, then frame dicts, one JSON line each.
+
+    Lines are encoded as they are written but only reach the file once ``buffer_size`` bytes have accumulated,
+    in one write (and one compression call). Files ending in ``.gz`` are gzip-compressed.
+
+    ::
+
+        with ReplayWriter(path, header) as writer:
+            writer.write_frame(frame)
+    """
+    def __init__(self, path: str, header: Dict[str, Any], buffer_size: int = 1 << 20, compresslevel: int = 1):
+        """
+        :param header: The header line, with the stats of every unit type under ``unitInformation``.
+        :param buffer_size: Bytes of encoded lines kept in memory before writing them out.
+        :param compresslevel: Gzip compression level of ``.gz`` files, from 1 (fastest) to 9 (smallest).
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        if str(path).endswith('.gz'):
+            self._file = gzip.open(path, 'wb', compresslevel=compresslevel)
+        else:
+            self._file = open(path, 'wb')
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+        self._write_line(header)
+
+    def _write_line(self, value: Dict[str, Any]) -> None:
+        line = json.dumps(value, separators=(',', ':')).encode() + b'\n'
+        self._buffer.append(line)
+        self._buffered += len(line)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def write_frame(self, frame: Dict[str, Any]) -> None:
+        """
+        Write a frame dict with the ``p1Units``, ``p2Units``, ``p1Stats``, ``p2Stats``, ``events`` and
+        ``turnInfo`` keys, and ``endStats`` for the last frame.
+        """
+        self._write_line(frame)
+
+    def flush(self) -> None:
+        """
+        Write the buffered lines to the file.
+        """
+        self._file.write(b''.join(self._buffer))
+        self._file.flush()
+        self._buffer.clear()
+        self._buffered = 0
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self) -> 'ReplayWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def iter_frames(path: str) -> Iterator[ReplayFrame]:
+    """
+    Generator over the decoded frames of a replay file.
+    """
+    with ReplayReader(path) as reader:
+        yield from reader
+
+def load_replay(path: str) -> Replay:
+    """
+    Read a whole replay into columns.
+    """
+    turn_info = []
+    stats = []
+    units = []
+    events: Dict[str, list] = {kind: [] for kind in EVENT_KINDS}
+    with ReplayReader(path) as reader:
+        for frame in reader:
+            turn_info.append(frame.turn_info)
+            stats.append(frame.stats)
+            units.append(frame.units)
+            for kind, rows in frame.events.items():
+                events[kind].append(rows)
+        header, end_stats = reader.header, reader.end_stats
+
+    def offsets(arrays: List[np.ndarray]) -> np.ndarray:
+        result = np.zeros(len(arrays) + 1, dtype=np.int64)
+        np.cumsum([len(array) for array in arrays], out=result[1:])
+        return result
+
+    return Replay(header, end_stats,
+                  np.array(turn_info, dtype=np.int32).reshape(-1, 4),
+                  np.array(stats, dtype=np.float64).reshape(-1, 2, 4),
+                  np.concatenate(units) if units else np.zeros(0, dtype=UNIT_DTYPE), offsets(units),
+                  {kind: np.concatenate(rows) if rows else np.zeros(0, dtype=EVENT_DTYPES[kind])
+                   for kind, rows in events.items()},
+                  {kind: offsets(rows) for kind, rows in events.items()})
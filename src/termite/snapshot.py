@@ -0,0 +1,102 @@
+"""
+Snapshots of the mutable simulation state of a :class:`TerminalGame`, for lookahead search.
+
+A :class:`GameSnapshot` keeps references to the unit objects of the game together with flat tuples of their
+mutable attributes (health, position, path, shields, ...), the routes tracked by the pathfinder, the player resources and the turn and frame counters. The engine only ever mutates
+unit objects and never replaces them, so restoring writes the saved attributes back into the same objects.
+
+Restoring only places or removes the structures that differ from the current layout, through
+:meth:`Map.place_unit` and :meth:`Map.remove_unit`, so the pathfinder repairs its flow fields
+incrementally instead of rebuilding them. Restoring a snapshot into the game it was taken from is the
+fast path; :meth:`GameSnapshot.copy` gives a snapshot with its own unit objects, to restore into another game.
+"""
+import copy
+from operator import attrgetter
+from typing import Dict, Tuple
+
+from .units import Unit, MobileUnit, Structure, SCOUT, SUPPORT
+
+# Attributes saved for each kind of unit. Anything else is either constant once a unit is
+# placed (type, side, creation time, target edge, ...) or saved separately (paths, shielded units).
+# The stats of a structure follow from its upgrade, see UNIT_STATS.
+MOBILE_FIELDS = ('health', 'shields', 'position', 'frames_since_last_move', 'last_move',
+                 'needs_repath', 'distance_moved', 'has_attacked_this_frame')
+STRUCTURE_FIELDS = ('health', 'stats')
+
+_getters = {fields: attrgetter(*fields) for fields in (MOBILE_FIELDS, STRUCTURE_FIELDS)}
+
+class GameSnapshot:
+    """
+    The mutable simulation state of a game at one point in time.
+    """
+    def __init__(self, game: 'TerminalGame'):
+        game.sync_views()
+        units = game.units
+        self.units: Tuple[Unit, ...] = tuple(units)
+        records = []
+        for unit in units:
+            if unit.type_code >= SCOUT:
+                fields, extra = MOBILE_FIELDS, tuple(unit.path)
+            elif unit.type_code == SUPPORT:
+                fields, extra = STRUCTURE_FIELDS, frozenset(unit.shielded_units)
+            else:
+                fields, extra = STRUCTURE_FIELDS, None
+            records.append((fields, _getters[fields](unit), extra))
+        self.records: Tuple[Tuple[Tuple[str, ...], tuple, object], ...] = tuple(records)
+        self.routes: Dict[MobileUnit, str] = game.pathfinder.get_routes()
+        self.next_order = game.map.index.next_order
+        self.players = tuple((p.health, p.structure_points, p.mobile_points) for p in (game.player1, game.player2))
+        self.current_turn = game.current_turn
+        self.frame_count = game.frame_count
+
+    def copy(self) -> 'GameSnapshot':
+        """
+        Returns a snapshot of the same state with its own unit objects, so that it can be restored
+        into another game without the two games sharing units.
+        """
+        clones = {id(unit): copy.copy(unit) for unit in self.units}
+        snapshot = copy.copy(self)
+        snapshot.units = tuple(clones[id(unit)] for unit in self.units)
+        snapshot.records = tuple((fields, values, frozenset(clones[id(u)] for u in extra if id(u) in clones))
+                                 if isinstance(extra, frozenset) else (fields, values, extra)
+                                 for fields, values, extra in self.records)
+        snapshot.routes = {clones[id(unit)]: edge for unit, edge in self.routes.items() if id(unit) in clones}
+        return snapshot
+
+    def restore(self, game: 'TerminalGame') -> None:
+        """
+        Bring a game back to the state of this snapshot.
+        """
+        game_map = game.map
+        grid = game_map.grid
+        # Structures: only touch the tiles whose occupancy changed, so that flow fields are repaired incrementally.
+        structures = {unit.position: unit for unit in self.units if not isinstance(unit, MobileUnit)}
+        # A tile may hold another structure than in the snapshot, e.g. one built after the saved one was destroyed.
+        for unit in game.units:
+            if isinstance(unit, Structure):
+                x, y = unit.position
+                if structures.get((x, y)) is not unit:
+                    game_map.remove_unit(unit, x, y)
+        for (x, y), unit in structures.items():
+            if grid[y][x] is not unit:
+                game_map.place_unit(unit, x, y)
+        game_map.index.reset(game.units, (), self.next_order)
+
+        for unit, (fields, values, extra) in zip(self.units, self.records):
+            for name, value in zip(fields, values):
+                setattr(unit, name, value)
+            if fields is MOBILE_FIELDS:
+                unit.path = list(extra)
+            elif extra is not None:
+                unit.shielded_units = set(extra)
+        game.units[:] = self.units
+        game_map.index.reset((), self.units, self.next_order)
+        game_map.rehash(structures.values())
+        game.pathfinder.set_routes(self.routes)
+
+        for player, (health, structure_points, mobile_points) in zip((game.player1, game.player2), self.players):
+            player.health = health
+            player.structure_points = structure_points
+            player.mobile_points = mobile_points
+        game.current_turn = self.current_turn
+        game.frame_count = self.frame_count
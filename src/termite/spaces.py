@@ -0,0 +1,165 @@
+"""
+Fixed-shape encodings of observations and actions.
+
+Used wherever game state has to leave the engine as plain arrays: shared-memory worker
+processes, and the Gymnasium wrapper.
+
+Observations are taken between turns and made of two arrays:
+
+- a board of shape ``BOARD_SHAPE`` = (channels, y, x), with one channel per unit type counting
+  the units of that type on each tile, one channel per player marking the tiles they occupy,
+  the health fraction of the structure on each tile, and an upgrade flag;
+- ``NUM_SCALARS`` scalars: health, mobile points and structure points of both players,
+  followed by the current turn.
+
+Actions of one player are an integer array of shape (max_actions, 3), one (code, x, y) row per
+action, in the order they are applied. Codes follow the replay spawn codes: unit type codes 0-5
+deploy a unit, ``UPGRADE_CODE`` upgrades the structure at (x, y), and negative codes pad unused rows.
+
+Action masks have shape ``ACTION_MASK_SHAPE`` = (codes, y, x), and are built from the deploy-position
+tables of :mod:`termite.geometry`, combined with the occupancy and resources of the observation.
+"""
+import numpy as np
+from typing import List, Tuple
+
+from .geometry import HEIGHT, SPAWN_TILES, STRUCTURE_TILES, WIDTH
+from .replay import REMOVE_CODE, UPGRADE_CODE
+from .units import Unit, Structure, UNIT_TYPES
+
+NUM_UNIT_TYPES = len(UNIT_TYPES)
+# Board channels after the per-unit-type counts.
+PLAYER1_CHANNEL = NUM_UNIT_TYPES
+PLAYER2_CHANNEL = NUM_UNIT_TYPES + 1
+HEALTH_CHANNEL = NUM_UNIT_TYPES + 2
+UPGRADED_CHANNEL = NUM_UNIT_TYPES + 3
+NUM_CHANNELS = NUM_UNIT_TYPES + 4
+BOARD_SHAPE = (NUM_CHANNELS, HEIGHT, WIDTH)
+
+# Scalars: player 1 health, mobile points, structure points, the same for player 2, then the turn.
+NUM_SCALARS = 7
+
+# Action codes beyond the unit type codes are the REMOVE_CODE and UPGRADE_CODE of replay spawn events.
+NO_ACTION = -1
+NUM_ACTION_CODES = UPGRADE_CODE + 1
+ACTION_MASK_SHAPE = (NUM_ACTION_CODES, HEIGHT, WIDTH)
+
+# Stats by type code.
+_prototypes = [unit_type() for unit_type in UNIT_TYPES]
+IS_STRUCTURE = np.array([isinstance(unit, Structure) for unit in _prototypes])
+UNIT_COSTS = np.array([unit.cost for unit in _prototypes], dtype=np.float64)
+UPGRADE_COSTS = np.array([getattr(unit, 'upgrade_cost', 0) for unit in _prototypes], dtype=np.float64)
+STRUCTURE_CODES = tuple(np.flatnonzero(IS_STRUCTURE).tolist())
+MOBILE_CODES = tuple(np.flatnonzero(~IS_STRUCTURE).tolist())
+del _prototypes
+
+def _deploy_masks(tiles_by_side) -> np.ndarray:
+    masks = np.zeros((len(tiles_by_side), HEIGHT, WIDTH), dtype=np.bool_)
+    for side, tiles in enumerate(tiles_by_side):
+        for x, y in tiles:
+            masks[side, y, x] = True
+    return masks
+
+# Tiles where player 1 (index 0) and player 2 (index 1) may deploy structures and mobile units.
+STRUCTURE_DEPLOY_MASKS = _deploy_masks(STRUCTURE_TILES)
+MOBILE_DEPLOY_MASKS = _deploy_masks(SPAWN_TILES)
+STRUCTURE_DEPLOY_MASKS.setflags(write=False)
+MOBILE_DEPLOY_MASKS.setflags(write=False)
+
+def encode_observation(game: 'TerminalGame', board: np.ndarray, scalars: np.ndarray) -> None:
+    """
+    Write the observation of a game into preallocated arrays.
+
+    :param game: The game to observe.
+    :param board: Output array of shape ``BOARD_SHAPE``.
+    :param scalars: Output array of shape (``NUM_SCALARS``,).
+    """
+    game.sync_views()
+    board.fill(0)
+    for unit in game.units:
+        x, y = unit.position
+        board[unit.type_code, y, x] += 1
+        board[PLAYER1_CHANNEL if unit.side == 'bottom' else PLAYER2_CHANNEL, y, x] = 1
+        if isinstance(unit, Structure):
+            board[HEALTH_CHANNEL, y, x] = unit.health / unit.max_health
+            board[UPGRADED_CHANNEL, y, x] = unit.is_upgraded
+    player1, player2 = game.player1, game.player2
+    scalars[0] = player1.health
+    scalars[1] = player1.mobile_points
+    scalars[2] = player1.structure_points
+    scalars[3] = player2.health
+    scalars[4] = player2.mobile_points
+    scalars[5] = player2.structure_points
+    scalars[6] = game.current_turn
+
+def decode_actions(actions: np.ndarray) -> Tuple[List[Tuple[Unit, Tuple[int, int]]], List[Tuple[int, int]]]:
+    """
+    Turn the action rows of one player into engine deployments and upgrades.
+
+    Removals (``REMOVE_CODE``) are not supported by the engine and are ignored, like padding rows.
+
+    :param actions: Integer array of shape (max_actions, 3).
+    :return: The (unit, position) deployments and the upgrade positions.
+    """
+    deployments = []
+    upgrades = []
+    for code, x, y in actions.tolist():
+        if 0 <= code < NUM_UNIT_TYPES:
+            deployments.append((UNIT_TYPES[code](), (x, y)))
+        elif code == UPGRADE_CODE:
+            upgrades.append((x, y))
+    return deployments, upgrades
+
+def encode_actions(deployments: List[Tuple[Unit, Tuple[int, int]]], upgrades: List[Tuple[int, int]], out: np.ndarray) -> None:
+    """
+    Write the deployments and upgrades of one player as action rows, deployments first.
+
+    :param out: Integer array of shape (max_actions, 3). Unused rows are padded with ``NO_ACTION``.
+    :raises ValueError: If there are more actions than rows.
+    """
+    if len(deployments) + len(upgrades) > len(out):
+        raise ValueError(f"{len(deployments) + len(upgrades)} actions do not fit in {len(out)} rows")
+    out.fill(NO_ACTION)
+    row = 0
+    for unit, (x, y) in deployments:
+        out[row] = (unit.type_code, x, y)
+        row += 1
+    for x, y in upgrades:
+        out[row] = (UPGRADE_CODE, x, y)
+        row += 1
+
+def write_action_mask(board: np.ndarray, scalars: np.ndarray, player: int, out: np.ndarray, free: np.ndarray) -> None:
+    """
+    Write which actions are valid for a player, given an observation from :func:`encode_observation`.
+
+    Each action is checked on its own against the observed state: structures on free tiles of the
+    player's half, mobile units on the player's edges, upgrades of the player's structures that are not
+    upgraded yet, all restricted to what the player can currently afford.
+
+    :param player: 0 for player 1, 1 for player 2.
+    :param out: Boolean output array of shape ``ACTION_MASK_SHAPE``.
+    :param free: Boolean scratch array of shape (``HEIGHT``, ``WIDTH``).
+    """
+    mobile_points = scalars[3 * player + 1]
+    structure_points = scalars[3 * player + 2]
+    np.logical_or(board[PLAYER1_CHANNEL], board[PLAYER2_CHANNEL], out=free)
+    np.logical_not(free, out=free)
+    for code in STRUCTURE_CODES:
+        if UNIT_COSTS[code] <= structure_points:
+            np.logical_and(STRUCTURE_DEPLOY_MASKS[player], free, out=out[code])
+        else:
+            out[code].fill(False)
+    for code in MOBILE_CODES:
+        if UNIT_COSTS[code] <= mobile_points:
+            np.copyto(out[code], MOBILE_DEPLOY_MASKS[player])
+        else:
+            out[code].fill(False)
+    out[REMOVE_CODE].fill(False)
+
+    upgrades = out[UPGRADE_CODE]
+    upgrades.fill(False)
+    for code in STRUCTURE_CODES:
+        if UPGRADE_COSTS[code] <= structure_points:
+            np.logical_or(upgrades, board[code], out=upgrades)
+    np.logical_and(upgrades, board[PLAYER2_CHANNEL if player else PLAYER1_CHANNEL], out=upgrades)
+    np.logical_not(board[UPGRADED_CHANNEL], out=free)
+    np.logical_and(upgrades, free, out=upgrades)
@@ -0,0 +1,146 @@
+"""
+Grid-bucketed spatial index used for range queries (targeting, shielding and self-destruct damage).
+
+Instead of scanning every unit of the game and computing Euclidean distances, units are bucketed by tile,
+and a query only visits the tiles inside the disc of the requested range. Disc offsets are precomputed per range.
+"""
+from typing import Dict, List, Tuple
+
+# Ranges used by the units of the game: self-destruct (1.5), turrets (2.5, 3.5 upgraded),
+# scouts and supports (3.5), demolishers and interceptors (4.5) and upgraded supports (7).
+UNIT_RANGES = (1.5, 2.5, 3.5, 4.5, 7)
+
+_disc_offsets: Dict[float, List[Tuple[int, int]]] = {}
+
+def disc_offsets(radius: float) -> List[Tuple[int, int]]:
+    """
+    Returns the (dx, dy) offsets of all tiles within Euclidean distance `radius` of the origin.
+    """
+    offsets = _disc_offsets.get(radius)
+    if offsets is None:
+        reach = int(radius)
+        offsets = [(dx, dy) for dy in range(-reach, reach + 1) for dx in range(-reach, reach + 1)
+                   if dx * dx + dy * dy <= radius * radius]
+        _disc_offsets[radius] = offsets
+    return offsets
+
+for _radius in UNIT_RANGES:
+    disc_offsets(_radius)
+
+class SpatialIndex:
+    """
+    Per-tile occupancy lists of the units on the map.
+
+    The occupancy layer of :class:`~termite.map.Map`, updated incrementally as units are placed, move and are removed.
+    Query results are returned in placement order, i.e. the order of ``TerminalGame.units``, which
+    the targeting tie-breaks depend on.
+    """
+    def __init__(self, width: int = 28, height: int = 28):
+        self.width = width
+        self.height = height
+        self.tiles: List[List['Unit']] = [[] for _ in range(width * height)]
+        self._next_order = 0
+        # (range, tile index) -> indices of the in-bounds tiles within range of that tile.
+        self._discs: Dict[Tuple[float, int], Tuple[int, ...]] = {}
+
+    @property
+    def next_order(self) -> int:
+        """
+        The placement order given to the next added unit.
+        """
+        return self._next_order
+
+    def add(self, unit: 'Unit') -> None:
+        """
+        Add a unit at its current position.
+        """
+        unit._index_order = self._next_order
+        self._next_order += 1
+        x, y = unit.position
+        self.tiles[y * self.width + x].append(unit)
+
+    def remove(self, unit: 'Unit') -> None:
+        """
+        Remove a unit from its current position.
+        """
+        x, y = unit.position
+        self.tiles[y * self.width + x].remove(unit)
+
+    def undo_add(self, unit: 'Unit') -> None:
+        """
+        Remove the unit added last, and hand its placement order out again.
+        """
+        self.remove(unit)
+        self._next_order = unit._index_order
+
+    def reinsert(self, unit: 'Unit') -> None:
+        """
+        Put a removed unit back at its current position, keeping its placement order.
+        """
+        x, y = unit.position
+        tile = self.tiles[y * self.width + x]
+        tile.append(unit)
+        tile.sort(key=lambda u: u._index_order)
+
+    def move(self, unit: 'Unit', old_position: Tuple[int, int], new_position: Tuple[int, int]) -> None:
+        """
+        Move a unit between two tiles.
+        """
+        if old_position == new_position:
+            return
+        tile = self.tiles[old_position[1] * self.width + old_position[0]]
+        tile.remove(unit)
+        new_tile = self.tiles[new_position[1] * self.width + new_position[0]]
+        # Keep each tile sorted by placement order so that most queries need no sorting.
+        if new_tile and new_tile[-1]._index_order > unit._index_order:
+            new_tile.append(unit)
+            new_tile.sort(key=lambda u: u._index_order)
+        else:
+            new_tile.append(unit)
+
+    def reset(self, old_units: List['Unit'], units: List['Unit'], next_order: int) -> None:
+        """
+        Replace the content of the index, keeping the placement order stored on the units.
+
+        :param old_units: All units currently in the index, at the positions they were indexed at.
+        :param units: The new units, in placement order.
+        :param next_order: The placement order given to the next added unit.
+        """
+        tiles = self.tiles
+        width = self.width
+        for unit in old_units:
+            x, y = unit.position
+            tiles[y * width + x].clear()
+        for unit in units:
+            x, y = unit.position
+            tiles[y * width + x].append(unit)
+        self._next_order = next_order
+
+    def disc(self, position: Tuple[int, int], radius: float) -> Tuple[int, ...]:
+        """
+        Returns the indices (``y * width + x``) of the board tiles within Euclidean distance `radius` of a position.
+        """
+        x, y = position
+        key = (radius, y * self.width + x)
+        disc = self._discs.get(key)
+        if disc is None:
+            disc = tuple((y + dy) * self.width + (x + dx) for dx, dy in disc_offsets(radius)
+                         if 0 <= x + dx < self.width and 0 <= y + dy < self.height)
+            self._discs[key] = disc
+        return disc
+
+    def query(self, position: Tuple[int, int], range: float) -> List['Unit']:
+        """
+        Returns all units within Euclidean distance `range` of a position, in placement order.
+        """
+        tiles = self.tiles
+        found = []
+        occupied = 0
+        for index in self.disc(position, range):
+            units = tiles[index]
+            if units:
+                found.extend(units)
+                occupied += 1
+        if occupied > 1:
+            found.sort(key=lambda u: u._index_order)
+        return found
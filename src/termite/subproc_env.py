@@ -0,0 +1,190 @@
+"""
+Vectorized environment spreading games over worker processes.
+
+Each worker process owns a contiguous block of :class:`TerminalGame` instances. Observations,
+actions, rewards and done flags live in NumPy arrays backed by ``multiprocessing.shared_memory``
+blocks, which are allocated once by the parent and mapped by every worker; the pipes to the workers
+only carry short commands. Observations and actions use the encodings of :mod:`termite.spaces`.
+
+Rewards are the change of the health difference between the two players over the turn, from the
+point of view of each player. Finished games are reset automatically: their done flag is set for
+the step they finish on, and the observation written for them is the first one of the new game.
+"""
+import multiprocessing as mp
+import numpy as np
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+from .game import TerminalGame
+from .spaces import BOARD_SHAPE, NUM_SCALARS, decode_actions, encode_observation
+
+def _buffer_specs(num_games: int, max_actions: int) -> Dict[str, Tuple[Tuple[int, ...], np.dtype]]:
+    """
+    Shapes and dtypes of the shared buffers.
+    """
+    return {
+        'board': ((num_games,) + BOARD_SHAPE, np.dtype(np.float32)),
+        'scalars': ((num_games, NUM_SCALARS), np.dtype(np.float32)),
+        'actions': ((num_games, 2, max_actions, 3), np.dtype(np.int16)),
+        'rewards': ((num_games, 2), np.dtype(np.float32)),
+        'dones': ((num_games,), np.dtype(np.bool_)),
+    }
+
+def _map_buffers(blocks: Dict[str, shared_memory.SharedMemory],
+                 specs: Dict[str, Tuple[Tuple[int, ...], np.dtype]]) -> Dict[str, np.ndarray]:
+    return {name: np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf) for name, (shape, dtype) in specs.items()}
+
+def _worker(conn, block_names: Dict[str, str], num_games: int, max_actions: int, start: int, stop: int) -> None:
+    """
+    Worker loop: owns the games ``start:stop`` and serves commands from the parent until "close".
+    """
+    blocks = {name: shared_memory.SharedMemory(name=block_name) for name, block_name in block_names.items()}
+    buffers = _map_buffers(blocks, _buffer_specs(num_games, max_actions))
+    board, scalars = buffers['board'], buffers['scalars']
+    actions, rewards, dones = buffers['actions'], buffers['rewards'], buffers['dones']
+    games: List[TerminalGame] = []
+    try:
+        while True:
+            command = conn.recv()
+            if command == 'reset':
+                games = [TerminalGame() for _ in range(start, stop)]
+                for i, game in enumerate(games, start):
+                    encode_observation(game, board[i], scalars[i])
+                    rewards[i] = 0
+                    dones[i] = False
+            elif command == 'step':
+                for i, game in enumerate(games, start):
+                    margin = game.player1.health - game.player2.health
+                    (deployments1, upgrades1), (deployments2, upgrades2) = (decode_actions(actions[i, 0]),
+                                                                            decode_actions(actions[i, 1]))
+                    game.play_actions((deployments1, deployments2), (upgrades1, upgrades2))
+                    change = (game.player1.health - game.player2.health) - margin
+                    rewards[i, 0] = change
+                    rewards[i, 1] = -change
+                    dones[i] = game.is_game_over()
+                    if dones[i]:
+                        game = games[i - start] = TerminalGame()
+                    encode_observation(game, board[i], scalars[i])
+            elif command == 'close':
+                break
+            conn.send(True)
+    finally:
+        del board, scalars, actions, rewards, dones, buffers
+        for block in blocks.values():
+            block.close()
+        conn.close()
+
+class SubprocVecTerminalGame:
+    """
+    Games of Terminal played by worker processes, exchanging arrays through shared memory.
+
+    The arrays returned by :meth:`reset` and :meth:`step` are views on the shared buffers: they are
+    overwritten by the next step, so copy them to keep them. Actions can either be passed to
+    :meth:`step`, or written in place into :attr:`actions` before calling :meth:`step` without arguments.
+    """
+    def __init__(self, num_workers: int, games_per_worker: int, max_actions: int = 32,
+                 context: Optional[mp.context.BaseContext] = None):
+        """
+        :param num_workers: The number of worker processes.
+        :param games_per_worker: The number of games owned by each worker.
+        :param max_actions: The maximum number of actions per player and turn.
+        :param context: The multiprocessing context used to start the workers. Defaults to the platform default.
+        """
+        self.num_workers = num_workers
+        self.num_games = num_workers * games_per_worker
+        self.max_actions = max_actions
+        context = context or mp.get_context()
+        specs = _buffer_specs(self.num_games, max_actions)
+        self._blocks = {name: shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+                        for name, (shape, dtype) in specs.items()}
+        buffers = _map_buffers(self._blocks, specs)
+        self.board: np.ndarray = buffers['board']
+        self.scalars: np.ndarray = buffers['scalars']
+        self.actions: np.ndarray = buffers['actions']
+        self.rewards: np.ndarray = buffers['rewards']
+        self.dones: np.ndarray = buffers['dones']
+        self.actions.fill(-1)
+
+        block_names = {name: block.name for name, block in self._blocks.items()}
+        self._conns = []
+        self._processes = []
+        for w in range(num_workers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(target=_worker, daemon=True,
+                                      args=(child_conn, block_names, self.num_games, max_actions,
+                                            w * games_per_worker, (w + 1) * games_per_worker))
+            process.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+        self.closed = False
+
+    def _broadcast(self, command: str) -> None:
+        for conn in self._conns:
+            conn.send(command)
+        for conn in self._conns:
+            conn.recv()
+
+    def reset(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Start new games in every worker.
+
+        :return: The board and scalar observations of all games.
+        """
+        self._broadcast('reset')
+        return self.board, self.scalars
+
+    def step_async(self, actions: Optional[np.ndarray] = None) -> None:
+        """
+        Start playing one turn in every game, without waiting for the workers.
+
+        :param actions: Array of shape (num_games, 2, max_actions, 3). Defaults to the contents of :attr:`actions`.
+        """
+        if actions is not None:
+            self.actions[...] = actions
+        for conn in self._conns:
+            conn.send('step')
+
+    def step_wait(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Wait for the turn started by :meth:`step_async` to be played.
+
+        :return: The board observations, scalar observations, rewards and done flags of all games.
+        """
+        for conn in self._conns:
+            conn.recv()
+        return self.board, self.scalars, self.rewards, self.dones
+
+    def step(self, actions: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Play one turn in every game.
+        """
+        self.step_async(actions)
+        return self.step_wait()
+
+    def close(self) -> None:
+        """
+        Stop the workers and release the shared memory.
+        """
+        if self.closed:
+            return
+        for conn in self._conns:
+            try:
+                conn.send('close')
+            except (BrokenPipeError, EOFError):
+                pass
+        for process in self._processes:
+            process.join()
+        for conn in self._conns:
+            conn.close()
+        del self.board, self.scalars, self.actions, self.rewards, self.dones
+        for block in self._blocks.values():
+            block.close()
+            block.unlink()
+        self.closed = True
+
+    def __enter__(self) -> 'SubprocVecTerminalGame':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,86 @@
+"""
+Batch targeting stage used by :meth:`TerminalGame.resolve_attacks`.
+
+:meth:`Targeting.select_target` narrows the candidates down in five filtering passes, recomputing
+distances, progress and edge distances along the way. :class:`BatchTargeting` instead precomputes
+the per-unit parts of the targeting key once per call, and picks every target with a single
+``min`` over one key per (attacker, candidate) pair:
+
+    (structure, squared distance, health, -progress, edge distance, -creation time, placement order)
+
+The lexicographic minimum of this key is exactly the unit the five passes of
+:meth:`Targeting.select_target` end up with, including its final tie-break on the most recently
+created unit (and the first one in ``game.units`` among those).
+"""
+from typing import Dict, List, Optional, Tuple
+
+from .units import Unit, MobileUnit
+
+class BatchTargeting:
+    """
+    Resolves the targets of a group of attackers against the current state of a game.
+    """
+    def __init__(self, game: 'TerminalGame'):
+        """
+        :param game: The game whose units are targeted.
+        """
+        self.game = game
+
+    def _static_keys(self) -> Dict[int, Tuple]:
+        """
+        Precompute the parts of the targeting key that do not depend on the attacker
+        (beyond its side) and do not change while attacks resolve.
+
+        :return: Maps id(unit) to (structure, -progress towards bottom, -progress towards top,
+            edge distance, -creation time, placement order).
+        """
+        keys = {}
+        for unit in self.game.units:
+            x, y = unit.position
+            keys[id(unit)] = (not isinstance(unit, MobileUnit), y - 27, -y,
+                              min(x, 27 - x, y, 27 - y), -unit.creation_time, unit._index_order)
+        return keys
+
+    def resolve(self, attackers: List[Unit]) -> List[Tuple[Unit, Optional[Unit], float]]:
+        """
+        Let every attacker pick a target and attack it, in the given order.
+
+        Attacks are applied as they are resolved, since the health of a candidate
+        is part of the targeting key of the next attackers.
+
+        :param attackers: Units with a ``get_potential_targets`` and ``deal_damage`` method,
+            i.e. mobile units and turrets.
+        :return: A list of (attacker, target, damage dealt) tuples. Target is None and damage
+            is 0 for attackers without a target in range.
+        """
+        static_keys = self._static_keys()
+        stats = self.game.stats
+        results = []
+        for attacker in attackers:
+            if getattr(attacker, 'has_attacked_this_frame', False):
+                continue  # Unit can only attack once per frame
+            candidates = attacker.get_potential_targets(self.game)
+            if not candidates:
+                results.append((attacker, None, 0))
+                continue
+            if stats is not None:
+                stats.target_selections += 1
+                stats.target_candidates += len(candidates)
+            ax, ay = attacker.position
+            progress = 1 if attacker.side == 'bottom' else 2
+            best_key = None
+            for candidate in candidates:
+                static = static_keys[id(candidate)]
+                cx, cy = candidate.position
+                key = (static[0], (ax - cx) ** 2 + (ay - cy) ** 2, candidate.health,
+                       static[progress], static[3], static[4], static[5])
+                if best_key is None or key < best_key:
+                    best_key = key
+                    target = candidate
+            damage_dealt = attacker.deal_damage(target)
+            if isinstance(attacker, MobileUnit):
+                if attacker._journal is not None:
+                    attacker._journal.save(attacker, 'has_attacked_this_frame')
+                attacker.has_attacked_this_frame = True
+            results.append((attacker, target, damage_dealt))
+        return results
@@ -0,0 +1,174 @@
+"""
+Turret coverage and support shielding per tile, and a path damage estimator built on them.
+
+A :class:`ThreatMap` is kept by every :class:`~termite.map.Map` (``game.map.threats``). It sums, for each side,
+the damage per frame of the turrets covering each tile and the shielding of the supports covering it, and is
+updated as turrets and supports are placed, upgraded and destroyed. Changes that bypass the map (restoring a
+snapshot, rolling back a journal) mark it stale, and it is rebuilt from the structure layer on the next read.
+
+:meth:`ThreatMap.estimate` walks a path, e.g. one returned by :meth:`Pathfinder.find_path`, and estimates what
+a stack of mobile units following it goes through, for screening candidate deployments without playing
+an action phase (see :meth:`TerminalGame.estimate_attack`). The estimate follows the rules of Terminal:
+
+- every enemy turret covering the tile the stack stands on deals its damage once per frame,
+- every friendly support covering a tile of the path shields each unit of the stack once,
+- damage is focused, so units die one after the other.
+
+The estimate ignores enemy mobile units. Note that the engine itself does not resolve turret attacks yet (see
+:meth:`TerminalGame.resolve_attacks`), so played action phases are kinder to mobile units than the estimate.
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .geometry import SPAWN_TILE_SETS
+from .units import Structure, UnitStats, SUPPORT, TURRET
+
+class PathEstimate(NamedTuple):
+    """
+    What a stack of mobile units is expected to go through along a path.
+    """
+    # Turret damage dealt to the stack, capped at what the stack can absorb.
+    damage: float
+    # Shielding received by each unit of the stack.
+    shielding: float
+    # Units left at the end of the path.
+    survivors: int
+    # Units reaching the enemy edge: the survivors, or 0 if the path does not end on the enemy edge.
+    breaches: int
+    # Frames the stack spends on the path.
+    frames: int
+
+class ThreatMap:
+    """
+    Turret damage and support shielding covering every tile, by side of the structures.
+
+    Tiles are indexed by ``y * width + x``; sides by 0 for the bottom player and 1 for the top player.
+    """
+    def __init__(self, game_map: 'Map'):
+        """
+        :param game_map: The map whose turrets and supports are tracked.
+        """
+        self._map = game_map
+        tiles = game_map.width * game_map.height
+        self._damage: Tuple[List[float], List[float]] = ([0.0] * tiles, [0.0] * tiles)
+        self._shielding: Tuple[List[float], List[float]] = ([0.0] * tiles, [0.0] * tiles)
+        # The supports covering each tile, to shield a stack once per support along a path.
+        self._supports: Tuple[List[List[Structure]], List[List[Structure]]] = (
+            [[] for _ in range(tiles)], [[] for _ in range(tiles)])
+        # The stats every tracked structure was counted with.
+        self._counted: Dict[Structure, UnitStats] = {}
+        self._stale = False
+
+    def add(self, structure: Structure) -> None:
+        """
+        Count a structure placed on the map. Only turrets and supports cover tiles.
+        """
+        if structure.type_code == TURRET or structure.type_code == SUPPORT:
+            self._count(structure, structure.stats, 1)
+
+    def remove(self, structure: Structure) -> None:
+        """
+        Stop counting a structure removed from the map.
+        """
+        stats = self._counted.get(structure)
+        if stats is not None:
+            self._count(structure, stats, -1)
+
+    def update(self, structure: Structure) -> None:
+        """
+        Count a structure on the map with its current stats, e.g. after it was upgraded.
+        """
+        stats = self._counted.get(structure)
+        if stats is not None and stats is not structure.stats:
+            self._count(structure, stats, -1)
+            self._count(structure, structure.stats, 1)
+
+    def invalidate(self) -> None:
+        """
+        Rebuild the map from the structure layer on the next read, after structures changed without
+        going through the map.
+        """
+        self._stale = True
+
+    def _count(self, structure: Structure, stats: UnitStats, sign: int) -> None:
+        side = 0 if structure.side == 'bottom' else 1
+        tiles = self._map.index.disc(structure.position, stats.range)
+        if structure.type_code == TURRET:
+            damage = self._damage[side]
+            for tile in tiles:
+                damage[tile] += sign * stats.damage
+        else:
+            shielding = self._shielding[side]
+            supports = self._supports[side]
+            for tile in tiles:
+                shielding[tile] += sign * stats.shielding
+                if sign > 0:
+                    supports[tile].append(structure)
+                else:
+                    supports[tile].remove(structure)
+        if sign > 0:
+            self._counted[structure] = stats
+        else:
+            del self._counted[structure]
+
+    def _sync(self) -> None:
+        if not self._stale:
+            return
+        self._stale = False
+        tiles = len(self._damage[0])
+        for side in (0, 1):
+            self._damage[side][:] = [0.0] * tiles
+            self._shielding[side][:] = [0.0] * tiles
+            for supports in self._supports[side]:
+                supports.clear()
+        self._counted = {}
+        for row in self._map.grid:
+            for structure in row:
+                if structure is not None:
+                    self.add(structure)
+
+    def damage(self, side: int) -> List[float]:
+        """
+        Returns the damage per frame the turrets of a side deal on each tile. Read-only.
+        """
+        self._sync()
+        return self._damage[side]
+
+    def shielding(self, side: int) -> List[float]:
+        """
+        Returns the summed shielding of the supports of a side covering each tile. Read-only.
+        """
+        self._sync()
+        return self._shielding[side]
+
+    def estimate(self, path: Sequence[Tuple[int, int]], side: int, stats: UnitStats, count: int = 1,
+                 enemy_edge: Optional[frozenset] = None) -> PathEstimate:
+        """
+        Estimate what a stack of mobile units goes through along a path.
+
+        :param path: The tiles the stack walks, starting with its spawn tile.
+        :param side: The side of the stack, 0 for the bottom player and 1 for the top player.
+        :param stats: The stats of the units of the stack.
+        :param count: The number of units in the stack.
+        :param enemy_edge: The tiles where the stack breaches. Defaults to the edges of the other side.
+        """
+        self._sync()
+        if enemy_edge is None:
+            enemy_edge = SPAWN_TILE_SETS[1 - side]
+        width = self._map.width
+        damage = self._damage[1 - side]
+        supports = self._supports[side]
+        shielders = set()
+        per_frame = 0.0
+        for x, y in path:
+            tile = y * width + x
+            per_frame += damage[tile]
+            if supports[tile]:
+                shielders.update(supports[tile])
+        shielding = sum(self._counted[support].shielding for support in shielders)
+        frames = len(path) * stats.speed
+        total = per_frame * stats.speed
+        durability = stats.health + shielding
+        killed = min(count, int(total // durability))
+        survivors = count - killed
+        breaches = survivors if path and path[-1] in enemy_edge else 0
+        return PathEstimate(min(total, count * durability), shielding, survivors, breaches, frames)
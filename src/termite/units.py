@@ -1,6 +1,13 @@
-from typing import List, Union, Optional, Container, Tuple
+from typing import List, NamedTuple, Union, Optional, Container, Tuple
+
+from .events import BreachEvent, MoveEvent, SelfDestructEvent
 
 class Targeting:
+    """
+    Reference implementation of Terminal's targeting rules for a single attacker.
+
+    The engine resolves attacks with :class:`termite.targeting.BatchTargeting`, which produces the same choices.
+    """
     @staticmethod
     def select_target(attacker, potential_targets):
         if not potential_targets:
@@ -29,28 +36,92 @@ class Targeting:
         # If still multiple targets, choose the most recently created one
         return max(targets, key=lambda t: t.creation_time)
     
+# Type codes, matching the unit indices used by Terminal replays. Structures come first, so that
+# ``unit.type_code >= SCOUT`` tells mobile units apart.
+WALL, SUPPORT, TURRET, SCOUT, DEMOLISHER, INTERCEPTOR = range(6)
+
+class UnitStats(NamedTuple):
+    """
+    The stats shared by all units of one type, before or after an upgrade.
+    """
+    name: str
+    cost: float
+    health: float
+    range: float
+    damage: float
+    # Frames per move of mobile units, 0 for structures.
+    speed: int = 0
+    # Structure points to upgrade a structure.
+    upgrade_cost: float = 0
+    # Shield a support gives to each mobile unit in range.
+    shielding: float = 0
+
+def _upgradable(stats: UnitStats, **upgrade) -> Tuple[UnitStats, UnitStats]:
+    return stats, stats._replace(**upgrade)
+
+# UNIT_STATS[type_code][upgraded]. Mobile units cannot be upgraded and have the same stats in both rows.
+UNIT_STATS: Tuple[Tuple[UnitStats, UnitStats], ...] = (
+    _upgradable(UnitStats('Wall', cost=1, health=60, range=0, damage=0, upgrade_cost=1), health=120),
+    _upgradable(UnitStats('Support', cost=4, health=30, range=3.5, damage=0, upgrade_cost=4, shielding=3),
+                range=7, shielding=4),
+    _upgradable(UnitStats('Turret', cost=2, health=75, range=2.5, damage=5, upgrade_cost=4), damage=15, range=3.5),
+    _upgradable(UnitStats('Scout', cost=1, health=15, range=3.5, damage=2, speed=1)),
+    _upgradable(UnitStats('Demolisher', cost=3, health=5, range=4.5, damage=8, speed=2)),
+    _upgradable(UnitStats('Interceptor', cost=1, health=40, range=4.5, damage=20, speed=4)),
+)
+
 class Unit:
     """
     Defines the base class for all units in the game.
+
+    Units only hold their mutable state. The stats of their type live in :data:`UNIT_STATS`,
+    and ``stats`` points to the row in use.
     """
-    def __init__(self, unit_type: str, cost: int, health: float, range: float, damage: float):
-        """
-        Initialize a new unit with the given attributes.
-        :param unit_type: The type of unit.
-        :param cost: The cost to deploy the unit.
-        :param health: The health of the unit.
-        :param range: The maximum attack range of the unit, defined in Euclidian distance.
-        :param damage: The damage dealt by the unit per tick.
-        """
-        self.unit_type: str = unit_type
-        self.cost: int = cost
-        self.health: float = health
-        self.max_health: float = health
-        self.range: float = range
-        self.damage: float = damage
-        self.position: float = None
+    __slots__ = ('stats', 'health', 'position', 'creation_time', 'side', 'target_edge',
+                 # Undo journal of the game this unit is placed in, if that game records one.
+                 '_journal',
+                 # Slot of the unit in a columnar store, and placement order in the spatial index.
+                 '_slot', '_index_order')
+    # Integer type code, see WALL ... INTERCEPTOR.
+    type_code: int = -1
+
+    def __init__(self):
+        self.stats: UnitStats = UNIT_STATS[self.type_code][0]
+        self.health: float = self.stats.health
+        self.position: Optional[Tuple[int, int]] = None
         self.creation_time: Optional[int] = None
-        self.side = None
+        self.side: Optional[str] = None
+        self.target_edge: Optional[str] = None
+        self._journal: Optional['Journal'] = None
+
+    @property
+    def unit_type(self) -> str:
+        return self.stats.name
+
+    @property
+    def cost(self) -> float:
+        """
+        The cost to deploy the unit.
+        """
+        return self.stats.cost
+
+    @property
+    def max_health(self) -> float:
+        return self.stats.health
+
+    @property
+    def range(self) -> float:
+        """
+        The maximum attack range of the unit, defined in Euclidian distance.
+        """
+        return self.stats.range
+
+    @property
+    def damage(self) -> float:
+        """
+        The damage dealt by the unit per tick.
+        """
+        return self.stats.damage
 
     def set_side(self, side: str) -> None:
         """
@@ -113,53 +184,92 @@ class Unit:
             target.take_damage(self.damage)
 
     def take_damage(self, damage: float) -> None:
+        if self._journal is not None:
+            self._journal.save(self, 'health')
         self.health = max(0, self.health - damage)
 
 class MobileUnit(Unit):
     """
     Defines the base class for mobile units in the game.
     """
-    def __init__(self, unit_type: str, cost: float, health: float, range: float, damage: float, speed: int):
-        """
-        Initialization function.
-        :param speed: The speed of the unit, defined as the number of ticks it takes to move one tile.
-        """
-        super().__init__(unit_type, cost, health, range, damage)
-        self.speed = speed
+    __slots__ = ('shields', 'frames_since_last_move', 'last_move', 'path', 'needs_repath',
+                 'has_attacked_this_frame', 'distance_moved')
+
+    def __init__(self):
+        super().__init__()
         self.shields = 0
-        self.position: Optional[Tuple[int, int]] = None  # To be set when deployed
-        self.speed = speed
         self.frames_since_last_move = 0
         self.last_move = None
         self.path = []
-        self.destination = None
+        self.needs_repath = False  # Set by the pathfinder when a structure is placed or removed.
+        self.has_attacked_this_frame = False
         self.distance_moved = 0
 
+    @property
+    def speed(self) -> int:
+        """
+        The speed of the unit, defined as the number of ticks it takes to move one tile.
+        """
+        return self.stats.speed
+
     def add_shield(self, shield_amount: float) -> None:
+        if self._journal is not None:
+            self._journal.save(self, 'shields')
         self.shields += shield_amount
 
     def move(self, game: 'TerminalGame') -> None:
+        if self._journal is not None:
+            self._journal.save(self, 'frames_since_last_move', 'last_move', 'position', 'distance_moved', 'needs_repath')
+            self._journal.save(self, 'path')
+            self.path = list(self.path)  # The journal keeps the previous list, which is popped below.
         if self.has_reached_enemy_edge(game):
             self.reach_enemy_edge(game)
         self.frames_since_last_move += 1
         if self.frames_since_last_move >= self.speed:
-            if not self.path:
-                self.path = game.pathfinder.find_path(self, self.position, self.target_edge)
-            print("Path:", self.path)
+            self.update_path(game, self.position)
             if self.path:
                 next_pos = self.path.pop(0)
+                game.map.index.move(self, self.position, next_pos)
+                if self._journal is not None:
+                    self._journal.push(game.map.index.move, self, next_pos, self.position)
                 self.last_move = (next_pos[0] - self.position[0], next_pos[1] - self.position[1])
+                if MoveEvent in game.events:
+                    game.events.emit(MoveEvent(self, self.position, next_pos))
                 self.position = next_pos
                 self.frames_since_last_move = 0
                 self.distance_moved += 1
             else:
                 self.self_destruct(game)
 
+    def update_path(self, game: 'TerminalGame', position: Tuple[int, int]) -> None:
+        """
+        Compute a new path if the current one ran out or was invalidated by a structure change.
+
+        :param position: The current position of the unit.
+        """
+        if self.needs_repath:
+            # Keep zigzagging from the last move, so that the path only changes where the structures changed it.
+            pathfinder = game.pathfinder
+            direction = 0
+            if self.last_move is not None and self.last_move != (0, 0):
+                direction = pathfinder.VERTICAL if self.last_move[0] == 0 else pathfinder.HORIZONTAL
+            # The unit already stands on the first tile of the new path.
+            self.path = pathfinder.find_path(self, position, self.target_edge, direction)[1:]
+            self.needs_repath = False
+        if not self.path:
+            self.path = game.pathfinder.find_path(self, position, self.target_edge)
+
     def reach_enemy_edge(self, game: 'TerminalGame') -> None:
         """
         Deal damage to the opponent when this unit has reached the enemy edge of the diamond-shaped arena.
         """
-        game.get_unit_owner(self.opposite_side(self.side)).health -= 1
+        opponent = game.get_unit_owner(self.opposite_side(self.side))
+        if self._journal is not None:
+            self._journal.save(opponent, 'health')
+            self._journal.save(self, 'health')
+        opponent.health -= 1
+        if BreachEvent in game.events:
+            game.events.emit(BreachEvent(self, self.position, opponent, 1))
         # Demolish yourself
         self.health = 0
 
@@ -193,22 +303,15 @@ class MobileUnit(Unit):
         if self.has_attacked_this_frame:
             return  # Unit can only attack once per frame
 
-        potential_targets = self.get_potential_targets(game_state)
-        target = Targeting.select_target(self, potential_targets)
-
-        if target:
-            damage_dealt = self.deal_damage(target)
-            self.has_attacked_this_frame = True
-            return damage_dealt
-        return 0
+        (_, _, damage_dealt), = game_state.targeting.resolve([self])
+        return damage_dealt
 
     def get_potential_targets(self, game_state: 'TerminalGame') -> List['Unit']:
         """
         Returns all valid targets in range of this unit.
         """
-        return [unit for unit in game_state.units 
+        return [unit for unit in game_state.map.index.query(self.position, self.range)
                 if unit.side != self.side 
-                and self.distance_to(unit) <= self.range 
                 and unit.health > 0]
 
     def deal_damage(self, target: 'Unit') -> float:
@@ -216,7 +319,7 @@ class MobileUnit(Unit):
         Deal damage to a target unit.
         """
         damage = self.damage
-        if isinstance(target, Structure) and self.unit_type == "Interceptor":
+        if self.type_code == INTERCEPTOR and target.type_code < SCOUT:
             return 0  # Interceptors cannot damage structures
         target.take_damage(damage)
         return damage
@@ -225,6 +328,8 @@ class MobileUnit(Unit):
         """
         All mobile units can attack once per frame. This resets the attack status.
         """
+        if self._journal is not None:
+            self._journal.save(self, 'has_attacked_this_frame')
         self.has_attacked_this_frame = False
 
     def self_destruct(self, game) -> None:
@@ -234,16 +339,21 @@ class MobileUnit(Unit):
         In Terminal, a unit will self-destruct if its path to the opposite side is blocked.
         Self-destruct damage is only applied if the unit has moved at least 5 tiles.
         """
+        targets = []
         if self.distance_moved >= 5:
             # Apply area damage
-            for unit in game.units:
-                if unit.side != self.side and self.distance_to(unit) <= 1.5:
-                    unit.take_damage(self.max_health)
+            targets = [unit for unit in game.map.index.query(self.position, 1.5) if unit.side != self.side]
+            for unit in targets:
+                unit.take_damage(self.max_health)
+        if SelfDestructEvent in game.events:
+            game.events.emit(SelfDestructEvent(self, self.position, targets, self.max_health))
 
         # Remove the unit from the game
         game.remove_unit(self)
 
     def take_damage(self, damage: float) -> None:
+        if self._journal is not None:
+            self._journal.save(self, 'health', 'shields')
         if self.shields > 0:
             if damage <= self.shields:
                 self.shields -= damage
@@ -261,8 +371,8 @@ class Scout(MobileUnit):
 
     Useful for taking advantage of openings in the enemy's defense.
     """
-    def __init__(self):
-        super().__init__("Scout", cost=1, health=15, range=3.5, damage=2, speed=1)
+    __slots__ = ()
+    type_code = SCOUT
 
 class Demolisher(MobileUnit):
     """
@@ -270,8 +380,8 @@ class Demolisher(MobileUnit):
 
     Useful for breaking through enemy defenses and dealing heavy damage to structures.
     """
-    def __init__(self):
-        super().__init__("Demolisher", cost=3, health=5, range=4.5, damage=8, speed=2)
+    __slots__ = ()
+    type_code = DEMOLISHER
 
 class Interceptor(MobileUnit):
     """
@@ -279,11 +389,11 @@ class Interceptor(MobileUnit):
 
     Cannot damage structures.
     """
-    def __init__(self):
-        super().__init__("Interceptor", cost=1, health=40, range=4.5, damage=20, speed=4)
+    __slots__ = ()
+    type_code = INTERCEPTOR
 
     def deal_damage(self, target):
-        if isinstance(target, Structure):
+        if target.type_code < SCOUT:
             return 0  # Interceptors cannot damage structures
         return super().deal_damage(target)
 
@@ -293,41 +403,54 @@ class Structure(Unit):
 
     Structure units are stationary units that provide support, defense, or attack capabilities.
     """
-    def __init__(self, unit_type: str, cost: int, health: float, range: float, damage: float, 
-                 upgrade_cost=None, upgrade_stats=None):
+    __slots__ = ('_map', '_hash_key')
+
+    def __init__(self):
+        super().__init__()
+        self._map: Optional['Map'] = None  # The map the structure is placed on, which hashes its state.
+        self._hash_key = 0
+
+    @property
+    def upgrade_cost(self) -> float:
         """
-        Initialization function.
-        :param upgrade_cost: The cost to upgrade the unit.
-        :param upgrade_stats: The stats to upgrade the unit by.
+        The cost to upgrade the unit.
         """
-        super().__init__(unit_type, cost, health, range, damage)
-        self.upgrade_cost = upgrade_cost if upgrade_cost else cost
-        self.upgrade_stats = upgrade_stats
-        self.position = None  # To be set when deployed
-        self.is_upgraded = False
+        return self.stats.upgrade_cost
+
+    @property
+    def is_upgraded(self) -> bool:
+        return self.stats is UNIT_STATS[self.type_code][1]
+
+    @is_upgraded.setter
+    def is_upgraded(self, upgraded: bool) -> None:
+        self.stats = UNIT_STATS[self.type_code][upgraded]
+
+    def take_damage(self, damage: float) -> None:
+        super().take_damage(damage)
+        if self._map is not None:
+            self._map.rehash_structure(self)
 
     def upgrade(self):
         """
         Structures can be upgraded once to improve their stats.
 
-        Damage taken persists through upgrades.
+        Damage taken persists through upgrades: the structure keeps its fraction of max health.
         """
         if not self.is_upgraded:
-            self.is_upgraded = True
-            if self.upgrade_stats:
-                for key, value in self.upgrade_stats.items():
-                    setattr(self, key, value)
+            if self._journal is not None:
+                self._journal.save(self, 'stats', 'health')
             health_percentage = self.health / self.max_health
-            self.max_health = self.upgrade_stats.get('health', self.max_health)
+            self.stats = UNIT_STATS[self.type_code][1]
             self.health = int(self.max_health * health_percentage)
+            if self._map is not None:
+                self._map.upgrade_structure(self)
 
 class Wall(Structure):
     """
     Simple defensive structure that provides a barrier against enemy units.
     """
-    def __init__(self):
-        super().__init__("Wall", cost=1, health=60, range=0, damage=0, 
-                         upgrade_cost=1, upgrade_stats={'health': 120})
+    __slots__ = ()
+    type_code = WALL
 
 class Support(Structure):
     """
@@ -335,43 +458,55 @@ class Support(Structure):
 
     Think of it like a Starcraft 2 shield battery!
     """
+    __slots__ = ('shielded_units',)
+    type_code = SUPPORT
+
     def __init__(self):
-        super().__init__("Support", cost=4, health=30, range=3.5, damage=0,
-                         upgrade_stats={'range': 7, 'base_shielding': 4})
-        self.base_shielding = 3
+        super().__init__()
         self.shielded_units = set()
 
-    def apply_shield(self, mobile_unit: MobileUnit):
+    @property
+    def base_shielding(self) -> float:
+        return self.stats.shielding
+
+    def apply_shield(self, mobile_unit: MobileUnit) -> float:
         """
         Apply shield to a mobile unit if it hasn't been shielded by this support before.
         
         :param mobile_unit: The mobile unit to shield
+        :return: The shield amount applied, 0 if the unit was already shielded by this support.
         """
         if mobile_unit not in self.shielded_units:
-            shield_amount = self.base_shielding
-            if self.is_upgraded:
-                shield_amount = self.upgrade_stats['base_shielding']
+            shield_amount = self.stats.shielding
             mobile_unit.add_shield(shield_amount)
             self.shielded_units.add(mobile_unit)
+            if self._journal is not None:
+                self._journal.push(self.shielded_units.discard, mobile_unit)
+            return shield_amount
+        return 0
 
 class Turret(Structure):
     """
     High-health, high-damage, and high-cost defensive turret.
     """
-    def __init__(self):
-        super().__init__("Turret", cost=2, health=75, range=2.5, damage=5,
-                         upgrade_cost=4, upgrade_stats={'damage': 15, 'range': 3.5})
+    __slots__ = ()
+    type_code = TURRET
 
     def attack(self, game_state):
-        potential_targets = self.get_potential_targets(game_state)
-        target = Targeting.select_target(self, potential_targets)
-        if target:
-            damage_dealt = self.deal_damage(target)
-            return damage_dealt
-        return 0
+        (_, _, damage_dealt), = game_state.targeting.resolve([self])
+        return damage_dealt
+
+    def deal_damage(self, target: 'Unit') -> float:
+        """
+        Deal damage to a target unit.
+        """
+        target.take_damage(self.damage)
+        return self.damage
 
     def get_potential_targets(self, game_state):
-        return [unit for unit in game_state.units 
-                if isinstance(unit, MobileUnit) and unit.side != self.side 
-                and self.distance_to(unit) <= self.range 
-                and unit.health > 0]
\ No newline at end of file
+        return [unit for unit in game_state.map.index.query(self.position, self.range)
+                if unit.type_code >= SCOUT and unit.side != self.side
+                and unit.health > 0]
+
+# Unit classes indexed by their type code.
+UNIT_TYPES = (Wall, Support, Turret, Scout, Demolisher, Interceptor)
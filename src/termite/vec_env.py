@@ -0,0 +1,139 @@
+"""
+Lockstep vectorized environment running many games in one process.
+
+:class:`VecTerminalGame` keeps the unit state of all its games in one :class:`BatchedUnitStore`,
+with a leading game axis. Each game is a :class:`ColumnarTerminalGame` lane over one row of those
+arrays, so the rules (deployment validity, resources, the frame pipeline of ``process_frame``) are
+the ones of the scalar engine. The phases of all games advance together: every call to :meth:`step`
+plays one turn in each running game, and the action phase keeps stepping frames until the last
+game's units are done, masking out games that have finished or whose action phase ended early.
+
+Only :meth:`units_active` computes across the game axis, in one reduction over the batched arrays. Frames
+are still played game by game: :meth:`action_phase` calls the ``process_frame`` of every running lane in
+a Python loop, and each lane vectorizes its steps over its own units only. The batch saves the allocation
+of one store per game and gives a single array view of all games, not per-frame work.
+"""
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+
+from .game import Player
+from .storage import BatchedUnitStore, ColumnarTerminalGame
+from .units import Unit
+
+# Deployments of one game: one list of (unit, position) tuples per player.
+GameDeployments = Tuple[List[Tuple[Unit, Tuple[int, int]]], List[Tuple[Unit, Tuple[int, int]]]]
+# Upgrades of one game: one list of positions per player.
+GameUpgrades = Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]
+
+class VecTerminalGame:
+    """
+    N games of Terminal advanced in lockstep.
+
+    Deployments are given from outside, one entry per game, rather than asked from :class:`Player` objects.
+    """
+    def __init__(self, num_games: int, capacity: int = 64):
+        """
+        :param num_games: The number of concurrent games.
+        :param capacity: The initial number of unit slots per game.
+        """
+        self.num_games = num_games
+        self.store = BatchedUnitStore(num_games, capacity)
+        self.games: List[ColumnarTerminalGame] = [self._new_game(i) for i in range(num_games)]
+        self.done = np.zeros(num_games, dtype=np.bool_)
+
+    def _new_game(self, index: int) -> ColumnarTerminalGame:
+        lane = self.store.lanes[index]
+        lane.clear()
+        return ColumnarTerminalGame(Player(), Player(), store=lane)
+
+    def reset(self, indices: Optional[Sequence[int]] = None) -> None:
+        """
+        Start new games in the given lanes (all lanes by default).
+        """
+        if indices is None:
+            indices = range(self.num_games)
+        for i in indices:
+            self.games[i] = self._new_game(i)
+            self.done[i] = False
+
+    def units_active(self) -> np.ndarray:
+        """
+        Returns a boolean array telling which games still have mobile units on the board.
+        """
+        store = self.store
+        return (store.alive & store.mobile).any(axis=1)
+
+    def deploy_phase(self, deployments: Sequence[GameDeployments], upgrades: Optional[Sequence[GameUpgrades]] = None) -> None:
+        """
+        Apply one batch of deployments and upgrades to every running game.
+
+        :param deployments: For every game, the deployments of player 1 and player 2.
+            Entries for finished games are ignored.
+        :param upgrades: For every game, the positions player 1 and player 2 upgrade. Optional.
+        """
+        for i in np.flatnonzero(~self.done).tolist():
+            game = self.games[i]
+            for player, player_deployments in zip((game.player1, game.player2), deployments[i]):
+                game.apply_deployments(player, player_deployments)
+            if upgrades is not None:
+                # ColumnarTerminalGame.upgrade_structure refreshes the unit objects and writes the upgrades back
+                # to the columns.
+                for player, positions in zip((game.player1, game.player2), upgrades[i]):
+                    player.apply_upgrades(game, positions)
+
+    def action_phase(self) -> np.ndarray:
+        """
+        Step frames in all running games until none has active units left, one game after the other.
+
+        :return: The number of frames played in each game.
+        """
+        frames = np.zeros(self.num_games, dtype=np.int64)
+        running = self.units_active() & ~self.done
+        while running.any():
+            for i in np.flatnonzero(running).tolist():
+                game = self.games[i]
+                game.process_frame()
+                game.frame_count += 1
+            frames += running
+            running &= self.units_active()
+        return frames
+
+    def restore_phase(self) -> None:
+        """
+        End the turn in all running games: advance the turn counter and grant resources.
+        """
+        for i in np.flatnonzero(~self.done).tolist():
+            game = self.games[i]
+            game.current_turn += 1
+            game.restore_phase()
+            self.done[i] = game.is_game_over()
+
+    def step(self, deployments: Sequence[GameDeployments], upgrades: Optional[Sequence[GameUpgrades]] = None) -> np.ndarray:
+        """
+        Play one turn in every running game.
+
+        :return: The done flags of all games.
+        """
+        self.deploy_phase(deployments, upgrades)
+        self.action_phase()
+        self.restore_phase()
+        return self.done.copy()
+
+    @property
+    def health(self) -> np.ndarray:
+        """
+        Player health, shape (num_games, 2).
+        """
+        return np.array([(g.player1.health, g.player2.health) for g in self.games], dtype=np.float64)
+
+    @property
+    def resources(self) -> np.ndarray:
+        """
+        Player resources, shape (num_games, 2, 2): [game, player, (mobile, structure)].
+        """
+        return np.array([[(p.mobile_points, p.structure_points) for p in (g.player1, g.player2)] for g in self.games],
+                        dtype=np.float64)
+
+    @property
+    def current_turn(self) -> np.ndarray:
+        return np.array([g.current_turn for g in self.games], dtype=np.int64)
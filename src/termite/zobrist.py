@@ -0,0 +1,146 @@
+"""
+Zobrist hashing of game states, and a transposition table of action-phase outcomes.
+
+:class:`Map` keeps :attr:`Map.zobrist`, the XOR of one 64-bit key per structure on the board. The key of a
+structure combines random keys for its (type, side, tile) and upgrade flag with a mix of its tile and health,
+so the hash is updated in constant time when a structure is placed, removed, upgraded or damaged.
+Keys are drawn from a fixed seed, so hashes agree across processes.
+
+:class:`TranspositionTable` caches the outcome of action phases keyed by the hash of the state and the
+deployments played from it, so that search agents re-evaluating the same position get a dictionary hit.
+"""
+import random
+import struct
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .units import Unit, Structure
+
+MASK = (1 << 64) - 1
+
+_rng = random.Random(0x7E3A17E)
+# Keys by ((type_code * 2 + side) * 28 + y) * 28 + x, for the 3 structure types and 2 sides.
+PIECE_KEYS = tuple(_rng.getrandbits(64) for _ in range(3 * 2 * 28 * 28))
+UPGRADE_KEYS = tuple(_rng.getrandbits(64) for _ in range(28 * 28))
+HEALTH_KEYS = tuple(_rng.getrandbits(64) for _ in range(28 * 28))
+del _rng
+
+_pack_double = struct.Struct('<d').pack
+
+def mix64(value: int) -> int:
+    """
+    SplitMix64 finalizer: scrambles a 64-bit integer.
+    """
+    value = (value + 0x9E3779B97F4A7C15) & MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK
+    return value ^ (value >> 31)
+
+def structure_key(structure: Structure, x: int, y: int) -> int:
+    """
+    Returns the contribution of a structure placed at (x, y) to the hash of the map.
+    """
+    tile = y * 28 + x
+    side = 0 if structure.side == 'bottom' else 1
+    key = PIECE_KEYS[(structure.type_code * 2 + side) * 784 + tile]
+    if structure.is_upgraded:
+        key ^= UPGRADE_KEYS[tile]
+    health_bits = int.from_bytes(_pack_double(float(structure.health)), 'little')
+    return key ^ mix64(HEALTH_KEYS[tile] ^ health_bits)
+
+def deployments_key(deployments: Tuple[List[Tuple[Unit, Tuple[int, int]]], List[Tuple[Unit, Tuple[int, int]]]],
+                    upgrades: Tuple[List[Tuple[int, int]], List[Tuple[int, int]]] = ([], [])) -> int:
+    """
+    Returns a hash of the deployments and upgrades of both players. Order matters, as in the engine.
+    """
+    return hash((tuple(tuple((unit.type_code, position) for unit, position in player) for player in deployments),
+                 tuple(tuple(player) for player in upgrades)))
+
+class ActionOutcome(NamedTuple):
+    """
+    What an action phase did, per player (player 1, player 2).
+    """
+    # Change of player health.
+    health_delta: Tuple[float, float]
+    # Number of structures of each player destroyed.
+    structures_lost: Tuple[int, int]
+    # Damage dealt by each player to the structures of the opponent.
+    damage_dealt: Tuple[float, float]
+
+class TranspositionTable:
+    """
+    Least-recently-used cache of action-phase outcomes, keyed by (state hash, deployments hash).
+    """
+    def __init__(self, capacity: int = 100_000):
+        """
+        :param capacity: The maximum number of entries kept. The least recently used entry is evicted first.
+        """
+        self.capacity = capacity
+        self._entries: 'OrderedDict[Tuple[int, int], ActionOutcome]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Tuple[int, int]) -> Optional[ActionOutcome]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Tuple[int, int], outcome: ActionOutcome) -> None:
+        entries = self._entries
+        entries[key] = outcome
+        entries.move_to_end(key)
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+
+    def evaluate(self, game: 'TerminalGame',
+                 deployments: Tuple[List[Tuple[Unit, Tuple[int, int]]], List[Tuple[Unit, Tuple[int, int]]]],
+                 upgrades: Tuple[List[Tuple[int, int]], List[Tuple[int, int]]] = ([], [])) -> ActionOutcome:
+        """
+        Returns the outcome of playing the deployments and upgrades from the current state of the game,
+        simulating the action phase only on a cache miss. The game is left in its current state.
+        """
+        key = (game.state_hash(), deployments_key(deployments, upgrades))
+        outcome = self.get(key)
+        if outcome is None:
+            outcome = simulate_action_phase(game, deployments, upgrades)
+            self.put(key, outcome)
+        return outcome
+
+def simulate_action_phase(game: 'TerminalGame',
+                          deployments: Tuple[List[Tuple[Unit, Tuple[int, int]]], List[Tuple[Unit, Tuple[int, int]]]],
+                          upgrades: Tuple[List[Tuple[int, int]], List[Tuple[int, int]]] = ([], [])) -> ActionOutcome:
+    """
+    Play the deployments, upgrades and action phase of one turn, measure what happened, and restore the game.
+    """
+    snapshot = game.snapshot()
+    players = (game.player1, game.player2)
+    health = [player.health for player in players]
+    for player, player_deployments in zip(players, deployments):
+        # Fresh units, so that the given ones can be evaluated again.
+        game.apply_deployments(player, [(type(unit)(), position) for unit, position in player_deployments])
+    for player, positions in zip(players, upgrades):
+        player.apply_upgrades(game, positions)
+    game.sync_views()
+    structures: Dict[int, Tuple[int, float]] = {id(unit): (0 if unit.side == 'bottom' else 1, unit.health)
+                                                for unit in game.units if isinstance(unit, Structure)}
+    game.action_phase()
+    game.sync_views()
+
+    remaining = {id(unit): unit.health for unit in game.units}
+    lost = [0, 0]
+    damage = [0.0, 0.0]
+    for unit_id, (side, start_health) in structures.items():
+        end_health = remaining.get(unit_id, 0)
+        if unit_id not in remaining:
+            lost[side] += 1
+        damage[1 - side] += start_health - end_health
+    outcome = ActionOutcome((players[0].health - health[0], players[1].health - health[1]), tuple(lost), tuple(damage))
+    game.restore(snapshot)
+    return outcome
@@ -0,0 +1,16 @@
+from termite.benchmark import SCENARIOS, Scenario, compare, run
+
+def test_run_and_compare():
+    scenarios = [Scenario(scenario.name, scenario.setup, turns=2) for scenario in SCENARIOS]
+    results = run(scenarios)
+    assert set(results['scenarios']) == {scenario.name for scenario in SCENARIOS}
+    for result in results['scenarios'].values():
+        assert result['frames'] > 0 and result['peak_memory_bytes'] > 0
+        assert set(result['phases']) == {'deploy_phase', 'action_phase', 'find_path'}
+        assert result['phases']['action_phase']['calls'] == 2
+    assert compare(results, results) == []
+
+    slower = {'scenarios': {name: dict(result, frames_per_second=result['frames_per_second'] * 0.5)
+                            for name, result in results['scenarios'].items()}}
+    assert len(compare(slower, results, threshold=0.1)) == len(SCENARIOS)
+    assert compare(slower, results, threshold=0.6) == []
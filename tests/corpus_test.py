@@ -0,0 +1,48 @@
+import glob
+import json
+import multiprocessing as mp
+import os
+
+import numpy as np
+
+from termite.corpus import NO_STRUCTURE, ReplayCorpus, build_corpus, read_turns
+
+REPLAYS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'notebooks', '*.replay')))
+
+def test_read_turns_matches_json():
+    boards, stats, deployments, end_stats = read_turns(REPLAYS[0])
+    assert len(boards) == len(stats) == len(deployments) == end_stats['turns'] + 1
+    with open(REPLAYS[0]) as file:
+        frames = [json.loads(line) for line in file if line.strip()][1:]
+    starts = [frame for frame in frames if frame['turnInfo'][0] == 0]
+    for board, frame in zip(boards, starts):
+        for player, key in ((1, 'p1Units'), (2, 'p2Units')):
+            for code in range(3):
+                for x, y, health, _ in frame[key][code]:
+                    assert (board[y, x]['type'], board[y, x]['player']) == (code, player)
+                    assert board[y, x]['health'] == np.float32(health)
+            for x, y, _, _ in frame[key][7]:
+                assert board[y, x]['upgraded']
+        assert (board['type'] != NO_STRUCTURE).sum() == sum(len(frame[key][code]) for key in ('p1Units', 'p2Units')
+                                                            for code in range(3))
+    first_action = next(frame for frame in frames if frame['turnInfo'][:3] == [1, 0, 0])
+    assert [(int(d['player']), int(d['code']), int(d['x']), int(d['y'])) for d in deployments[0]] == \
+           [(player, code, x, y) for (x, y), code, _, player in first_action['events']['spawn']]
+
+def test_corpus_random_access(tmp_path):
+    build_corpus(REPLAYS * 2, str(tmp_path), replays_per_shard=3, processes=2, context=mp.get_context('spawn'))
+    corpus = ReplayCorpus(str(tmp_path))
+    expected = [read_turns(path) for path in REPLAYS * 2]
+    assert len(corpus.replays) == 4
+    assert len(corpus) == sum(len(boards) for boards, _, _, _ in expected)
+    for replay, (boards, stats, deployments, _) in enumerate(expected):
+        for turn in (0, len(boards) // 2, len(boards) - 1):
+            found = corpus.turn(replay, turn)
+            assert np.array_equal(found.board, boards[turn])
+            assert np.array_equal(found.stats, stats[turn])
+            assert np.array_equal(found.deployments, deployments[turn])
+
+    boards, stats, positions = corpus.sample(np.random.default_rng(0), 16)
+    for board, stat, position in zip(boards, stats, positions):
+        assert np.array_equal(board, corpus[position].board)
+        assert np.array_equal(stat, corpus[position].stats)
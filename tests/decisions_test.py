@@ -0,0 +1,125 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from termite.decisions import DecisionRunner
+from termite.game import TerminalGame
+from termite.storage import ColumnarTerminalGame
+from helpers import ScriptedPlayer, game_summary
+
+class SlowPlayer(ScriptedPlayer):
+    """
+    A scripted player that waits before deploying, as a player searching outside the interpreter would.
+    """
+    def __init__(self, seconds):
+        super().__init__()
+        self.seconds = seconds
+
+    def deploy(self, game_state):
+        time.sleep(self.seconds)
+        return super().deploy(game_state)
+
+class BlockedPlayer(ScriptedPlayer):
+    """
+    A scripted player whose deploy call waits until the test releases it.
+    """
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.finished = threading.Event()
+        self.states = []
+
+    def deploy(self, game_state):
+        self.states.append(game_state)
+        self.release.wait(10)
+        self.finished.set()
+        return super().deploy(game_state)
+
+def test_concurrent_decisions_play_the_same_game():
+    reference = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    with DecisionRunner(concurrent=True) as runner:
+        game = ColumnarTerminalGame(ScriptedPlayer(), ScriptedPlayer())
+        game.decisions = runner
+        for _ in range(6):
+            reference.play_turn()
+            game.play_turn()
+            game.sync_views()
+            assert game_summary(game) == game_summary(reference)
+    assert all(seconds > 0 for seconds in runner.computation_time) and runner.timeouts == [0, 0]
+    assert all(seconds > 0 for seconds in reference.decisions.computation_time)
+
+def test_players_decide_at_the_same_time():
+    # Both calls have to be running at once to get past the barrier.
+    barrier = threading.Barrier(2, timeout=10)
+    class MeetingPlayer(ScriptedPlayer):
+        def deploy(self, game_state):
+            barrier.wait()
+            return super().deploy(game_state)
+
+    with DecisionRunner(concurrent=True) as runner:
+        game = TerminalGame(MeetingPlayer(), MeetingPlayer(), decisions=runner)
+        game.deploy_phase()
+    assert not barrier.broken and len(game.units) > 10
+
+def test_concurrent_calls_get_a_copy_of_the_state():
+    blocked = BlockedPlayer()
+    blocked.release.set()
+    with DecisionRunner(concurrent=True) as runner:
+        game = TerminalGame(blocked, ScriptedPlayer(), decisions=runner)
+        game.play_turn()
+        before = sorted((unit.unit_type, unit.position, unit.health) for unit in game.units)
+        game.deploy_phase()
+    state = blocked.states[-1]
+    assert state['map'] is not game.map.grid and not set(map(id, state['units'])) & set(map(id, game.units))
+    assert sorted((unit.unit_type, unit.position, unit.health) for unit in state['units']) == before
+
+def test_late_concurrent_calls_are_dropped():
+    blocked = BlockedPlayer()
+    with DecisionRunner(turn_budget=0.5, concurrent=True) as runner:
+        game = TerminalGame(blocked, ScriptedPlayer(), decisions=runner)
+        game.deploy_phase()
+        assert not [unit for unit in game.units if unit.side == 'bottom']
+        assert [unit for unit in game.units if unit.side == 'top']
+        assert runner.timeouts == [2, 0]  # The upgrade call was skipped: the budget was spent.
+        assert runner.computation_time[0] == runner.turn_time[0] == 0.5
+
+        # The late call is still running: the player is skipped until it returns.
+        game.decisions.start_turn()
+        game.deploy_phase()
+        assert len(blocked.states) == 1 and runner.timeouts[0] == 4
+        blocked.release.set()
+        assert blocked.finished.wait(10)
+        runner._late[0].result(10)
+        game.decisions.start_turn()
+        game.deploy_phase()
+        assert len(blocked.states) == 2 and runner.timeouts[0] == 4
+
+def test_late_sequential_calls_are_dropped():
+    game = TerminalGame(SlowPlayer(0.3), ScriptedPlayer(), decisions=DecisionRunner(turn_budget=0.1))
+    game.deploy_phase()
+    assert not [unit for unit in game.units if unit.side == 'bottom']
+    assert game.decisions.timeouts == [2, 0] and game.decisions.computation_time[0] == 0.1
+
+def test_ties_go_to_the_faster_player():
+    game = TerminalGame()
+    game.player1.health = game.player2.health = 0
+    game.decisions.computation_time = [2.0, 1.5]
+    assert game.get_winner() == "Player 2"
+    game.decisions.computation_time = [1.0, 1.5]
+    assert game.get_winner() == "Player 1"
+    game.decisions.computation_time = [1.0, 1.0]
+    assert game.get_winner() == "Draw"
+    game.player1.health = 1
+    assert game.get_winner() == "Player 1"
+
+def test_owned_executors_are_shut_down():
+    runner = DecisionRunner(executor=None)
+    assert not runner.concurrent and runner.executor is None
+    thread = DecisionRunner(concurrent=True)
+    thread.call_all([lambda state: threading.current_thread().name] * 2, [None, None])
+    executor = thread.executor
+    thread.close()
+    assert thread.executor is None and executor._shutdown
+    with ThreadPoolExecutor(max_workers=2) as given:
+        DecisionRunner(executor=given).close()
+        assert not given._shutdown
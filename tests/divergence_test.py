@@ -0,0 +1,25 @@
+import glob
+import multiprocessing as mp
+import os
+
+from termite.divergence import Divergence, check_replay, check_replays, format_report, iter_divergences
+from termite.replay import iter_frames
+
+REPLAYS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'notebooks', '*.replay')))
+
+def test_parallel_matches_serial():
+    reports = check_replays(REPLAYS, processes=2, context=mp.get_context('spawn'))
+    assert reports == [check_replay(path) for path in REPLAYS]
+    for report in reports:
+        assert report.error is None
+        assert report.turns > 0
+        turns = [divergence.turn for divergence in report.divergences]
+        assert turns == sorted(set(turns))
+    assert format_report(reports).count('\n') == len(REPLAYS)
+
+def test_reports_tampered_stats():
+    frames = list(iter_frames(REPLAYS[0]))
+    # Player 2 health in the first action frame of turn 0.
+    frames[1].stats[1, 0] += 1
+    divergence = next(iter_divergences(frames))
+    assert divergence == Divergence(0, 1, 'p2.health', frames[1].stats[1, 0], 30)
@@ -0,0 +1,75 @@
+from collections import Counter
+
+import pytest
+
+from termite.events import (EVENT_TYPES, BreachEvent, DamageEvent, DeploymentRejectedEvent, EventBus, MoveEvent,
+                            RefundEvent, SpawnEvent, StructureDestroyedEvent)
+from termite.game import TerminalGame
+from termite.storage import ColumnarTerminalGame
+from termite.units import Scout, Wall
+from helpers import ScriptedPlayer, play_turns
+
+def record(game):
+    events = []
+    for event_type in EVENT_TYPES:
+        game.events.subscribe(event_type, events.append)
+    return events
+
+def test_bus():
+    bus = EventBus()
+    assert SpawnEvent not in bus and not bus
+    received = []
+    callback = bus.subscribe(SpawnEvent, received.append)
+    assert SpawnEvent in bus and MoveEvent not in bus
+    event = SpawnEvent(Scout(), (13, 0))
+    bus.emit(event)
+    bus.emit(MoveEvent(Scout(), (13, 0), (13, 1)))
+    assert received == [event]
+    bus.unsubscribe(SpawnEvent, callback)
+    assert SpawnEvent not in bus
+    with pytest.raises(ValueError):
+        bus.subscribe(int, received.append)
+
+@pytest.mark.parametrize('engine', [TerminalGame, ColumnarTerminalGame])
+def test_listeners_do_not_change_the_game(engine):
+    reference = engine(ScriptedPlayer(), ScriptedPlayer())
+    game = engine(ScriptedPlayer(), ScriptedPlayer())
+    events = record(game)
+    assert play_turns(game, 8) == play_turns(reference, 8)
+
+    kinds = Counter(type(event) for event in events)
+    assert kinds[SpawnEvent] > 0 and kinds[MoveEvent] > 0 and kinds[DamageEvent] > 0
+    breaches = [event for event in events if isinstance(event, BreachEvent)]
+    assert 2 * 30 - game.player1.health - game.player2.health == sum(event.damage for event in breaches)
+
+def test_engines_emit_alike():
+    games = [engine(ScriptedPlayer(), ScriptedPlayer()) for engine in (TerminalGame, ColumnarTerminalGame)]
+    recorded = [record(game) for game in games]
+    for game in games:
+        play_turns(game, 6)
+    counts = [Counter(type(event) for event in events) for events in recorded]
+    assert counts[0] == counts[1]
+    moves = [sorted((event.source, event.destination) for event in events if isinstance(event, MoveEvent))
+             for events in recorded]
+    assert moves[0] == moves[1]
+
+def test_rejected_deployments():
+    game = TerminalGame()
+    rejected = []
+    game.events.subscribe(DeploymentRejectedEvent, rejected.append)
+    game.player1.mobile_points = 1
+    game.apply_deployments(game.player1, [(Scout(), (13, 0)), (Scout(), (13, 0)), (Wall(), (13, 20))])
+    assert [(event.position, event.reason) for event in rejected] == [((13, 0), 'unaffordable'),
+                                                                      ((13, 20), 'invalid')]
+
+def test_structure_destroyed():
+    game = TerminalGame()
+    destroyed, refunds = [], []
+    game.events.subscribe(StructureDestroyedEvent, destroyed.append)
+    game.events.subscribe(RefundEvent, refunds.append)
+    wall = Wall()
+    game.place_unit(game.player1, wall, (13, 10))
+    wall.take_damage(wall.health)
+    game.remove_destroyed_units()
+    assert destroyed == [StructureDestroyedEvent(wall, (13, 10))]
+    assert [(event.player, event.structure) for event in refunds] == [(game.player1, wall)]
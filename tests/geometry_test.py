@@ -0,0 +1,32 @@
+from termite.game import TerminalGame
+from termite.geometry import (ARENA_MASK, ARENA_TILES, EDGE_BITMASKS, EDGE_DIRECTIONS, EDGE_TILE_SETS, EDGE_TILES,
+                              NEIGHBORS, SPAWN_TILE_SETS, STRUCTURE_TILES, WIDTH)
+from termite.map import Map, Pathfinder
+from termite.units import Scout, Wall
+
+def in_arena(x, y):
+    return abs(x - 13.5) + abs(y - 13.5) <= 14
+
+def test_arena():
+    assert ARENA_TILES == tuple((x, y) for y in range(28) for x in range(28) if in_arena(x, y))
+    assert [(i % WIDTH, i // WIDTH) for i, inside in enumerate(ARENA_MASK) if inside] == list(ARENA_TILES)
+    assert all(set(NEIGHBORS[(x, y)]) == {n for n in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)) if in_arena(*n)}
+               for x, y in ARENA_TILES)
+
+def test_edges():
+    assert SPAWN_TILE_SETS[0] == EDGE_TILE_SETS['bottom-left'] | EDGE_TILE_SETS['bottom-right']
+    assert SPAWN_TILE_SETS[1] == EDGE_TILE_SETS['top-left'] | EDGE_TILE_SETS['top-right']
+    for edge, tiles in EDGE_TILES.items():
+        assert len(tiles) == 14 and all(in_arena(*tile) for tile in tiles)
+        assert EDGE_BITMASKS[edge] == sum(1 << (y * WIDTH + x) for x, y in tiles)
+        assert EDGE_DIRECTIONS[edge] == Pathfinder(Map())._get_direction_from_endpoints(tiles)
+
+def test_deployment_tables_match_the_rules():
+    game = TerminalGame()
+    for player, side in ((game.player1, 0), (game.player2, 1)):
+        for x in range(-1, 29):
+            for y in range(-1, 29):
+                on_half = in_arena(x, y) and (y <= 13) == (side == 0)
+                assert game.is_valid_deployment(player, Wall(), (x, y)) == on_half == ((x, y) in STRUCTURE_TILES[side])
+                on_edge = on_half and abs(x - 13.5) + abs(y - 13.5) == 14
+                assert game.is_valid_deployment(player, Scout(), (x, y)) == on_edge
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('gymnasium')
+
+from termite.game import TerminalGame
+from termite.gym_env import TerminalEnv
+from termite.spaces import encode_actions
+from helpers import ScriptedPlayer, game_summary
+
+def test_env_matches_scalar_engine():
+    reference = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    agent = ScriptedPlayer()
+    agent.side = 'bottom'
+    env = TerminalEnv(opponent=ScriptedPlayer)
+    observation, _ = env.reset(seed=0)
+    assert env.observation_space.contains(observation)
+    action = np.zeros(env.action_space.shape, dtype=np.int16)
+    for _ in range(10):
+        state = env.game.get_game_state()
+        encode_actions(agent.deploy(state), agent.upgrade(state), action)
+        assert env.action_space.contains(action)
+        margin = reference.player1.health - reference.player2.health
+        next_observation, reward, terminated, truncated, _ = env.step(action)
+        reference.play_turn()
+        assert next_observation is observation  # Buffers are reused.
+        assert game_summary(env.game) == game_summary(reference)
+        assert reward == reference.player1.health - reference.player2.health - margin
+        assert not truncated
+        if terminated:
+            break
+
+def test_human_mode_prints_the_board(capsys):
+    env = TerminalEnv(opponent=ScriptedPlayer, render_mode='human')
+    env.reset(seed=0)
+    env.step(np.full(env.action_space.shape, -1, dtype=np.int16))
+    assert 'Turn: 1/100' in capsys.readouterr().out
+    env.render_mode = 'ansi'
+    assert 'Turn: 1/100' in env.render() and not capsys.readouterr().out
+
+def test_only_the_opponent_is_timed():
+    env = TerminalEnv(opponent=ScriptedPlayer)
+    env.reset(seed=0)
+    env.step(np.full(env.action_space.shape, -1, dtype=np.int16))
+    agent_time, opponent_time = env.game.decisions.computation_time
+    assert agent_time == 0.0 and opponent_time > 0.0
@@ -0,0 +1,123 @@
+"""
+Players and state summaries shared by the tests.
+"""
+import os
+import random
+
+from termite.game import Player
+from termite.geometry import SPAWN_TILES, SPAWN_TILE_SETS, STRUCTURE_TILES
+from termite.units import Scout, Demolisher, Interceptor, Turret, Support, Wall
+
+# A game of the official client, recorded as a replay.
+REPLAY = os.path.join(os.path.dirname(__file__), '..', 'notebooks', '7-0-2024-18-1-32.replay')
+
+class ScriptedPlayer(Player):
+    """
+    Deterministic player that builds a small defense and sends a different attack every turn.
+    """
+    def deploy(self, game_state):
+        turn = game_state['current_turn']
+        bottom = self.side == 'bottom'
+        mirror = lambda x, y: (x, y) if bottom else (27 - x, 27 - y)
+        deployments = []
+        if turn == 0:
+            for x in (3, 4, 23, 24):
+                deployments.append((Wall(), mirror(x, 12)))
+            deployments.append((Turret(), mirror(4, 11)))
+            deployments.append((Turret(), mirror(23, 11)))
+            deployments.append((Support(), mirror(13, 6)))
+        elif turn == 2:
+            deployments.append((Turret(), mirror(13, 11)))
+        attack = (turn + (0 if bottom else 1)) % 3
+        if attack == 0:
+            deployments += [(Scout(), mirror(13, 0)) for _ in range(4)]
+        elif attack == 1:
+            deployments += [(Demolisher(), mirror(6, 7))]
+        else:
+            deployments += [(Interceptor(), mirror(20, 6)), (Scout(), mirror(8, 5)), (Scout(), mirror(8, 5))]
+        return deployments
+
+    def upgrade(self, game_state):
+        if game_state['current_turn'] == 3:
+            return [(4, 11) if self.side == 'bottom' else (23, 16)]
+        return []
+
+def game_summary(game):
+    structures = sorted((u.unit_type, u.position, float(u.health), u.is_upgraded) for u in game.units)
+    return (game.current_turn, game.frame_count, game.player1.health, game.player2.health,
+            game.player1.structure_points, game.player2.structure_points,
+            game.player1.mobile_points, game.player2.mobile_points, structures)
+
+class AggressivePlayer(ScriptedPlayer):
+    """
+    Sends extra units every turn, so that its games end earlier than the others.
+    """
+    def deploy(self, game_state):
+        deployments = super().deploy(game_state)
+        x, y = (14, 0) if self.side == 'bottom' else (13, 27)
+        return deployments + [(type(deployments[-1][0])(), (x, y)) for _ in range(3)]
+
+def make_players(index):
+    cls = AggressivePlayer if index % 2 else ScriptedPlayer
+    return cls(), cls()
+
+def frame_summary(game):
+    game.sync_views()
+    units = [(u.unit_type, u.position, float(u.health), float(getattr(u, 'shields', 0))) for u in game.units]
+    return (game.frame_count, game.player1.health, game.player2.health, units,
+            [[cell if cell is None else cell.unit_type for cell in row] for row in game.map.grid],
+            bytes(game.map.blocked))
+
+def play_turns(game, turns):
+    summaries = []
+    for _ in range(turns):
+        game.play_turn()
+        game.sync_views()
+        summaries.append(game_summary(game))
+    return summaries
+
+def random_actions(seed, turn, side):
+    """
+    Deployments of one side on one turn of a random but reproducible game: a few structures in the middle
+    of its half, away from the spawn edges so that units keep a way out, and a stack of mobile units.
+    """
+    rng = random.Random(seed * 1000 + turn * 2 + side)
+    tiles = sorted(tile for tile in STRUCTURE_TILES[side]
+                   if 9 <= tile[1] <= 18 and tile not in SPAWN_TILE_SETS[side])
+    deployments = [(rng.choice((Wall, Wall, Turret, Support))(), rng.choice(tiles)) for _ in range(rng.randint(0, 4))]
+    spawn = rng.choice(SPAWN_TILES[side])
+    deployments += [(rng.choice((Scout, Demolisher, Interceptor))(), spawn) for _ in range(rng.randint(1, 6))]
+    return deployments
+
+def play_random_turns(game, seed, turns):
+    summaries = []
+    for _ in range(turns):
+        turn = game.current_turn
+        game.play_actions((random_actions(seed, turn, 0), random_actions(seed, turn, 1)))
+        game.sync_views()
+        summaries.append(game_summary(game))
+    return summaries
+
+def unit_state(unit):
+    state = {}
+    for name in (name for cls in type(unit).__mro__ for name in getattr(cls, '__slots__', ())):
+        if name == '_journal' or not hasattr(unit, name):
+            continue
+        value = getattr(unit, name)
+        if isinstance(value, list):
+            value = tuple(value)
+        elif isinstance(value, set):
+            value = frozenset(id(u) for u in value)
+        state[name] = value
+    return state
+
+def full_state(game):
+    """
+    Everything the simulation reads, compared by unit identity.
+    """
+    grid = [[id(cell) if cell is not None else None for cell in row] for row in game.map.grid]
+    return ([(id(u), unit_state(u)) for u in game.units], grid, bytes(game.map.blocked),
+            [tuple(map(id, tile)) for tile in game.map.index.tiles], game.map.index.next_order,
+            {id(u): edge for u, edge in game.pathfinder.get_routes().items()},
+            [(p.health, p.structure_points, p.mobile_points) for p in (game.player1, game.player2)],
+            game.current_turn, game.frame_count)
@@ -0,0 +1,54 @@
+from termite.events import MoveEvent
+from termite.game import TerminalGame
+from termite.storage import ColumnarTerminalGame
+from helpers import ScriptedPlayer, full_state
+
+def state(game):
+    units = [(u.unit_type, u.position, u.health, getattr(u, 'shields', 0), getattr(u, 'frames_since_last_move', 0),
+              getattr(u, 'last_move', None), list(getattr(u, 'path', ())), getattr(u, 'distance_moved', 0),
+              getattr(u, 'has_attacked_this_frame', False)) for u in game.units]
+    tiles = [[u.position for u in tile] for tile in game.map.index.tiles]
+    return (game.frame_count, game.player1.health, game.player2.health, units, tiles)
+
+def test_skipped_frames_match_stepping():
+    fast, slow = TerminalGame(ScriptedPlayer(), ScriptedPlayer()), TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    skipped = 0
+    for _ in range(9):
+        for game in (fast, slow):
+            game.deploy_phase()
+        while fast.units_active():
+            frames = fast.skip_idle_frames()
+            skipped += frames
+            for _ in range(frames):
+                slow.process_frame()
+                slow.frame_count += 1
+            assert state(fast) == state(slow)
+            for game in (fast, slow):
+                game.process_frame()
+                game.frame_count += 1
+        for game in (fast, slow):
+            game.action_phase()
+            game.current_turn += 1
+            game.restore_phase()
+        assert state(fast) == state(slow)
+    assert skipped > 100
+
+def test_rollback_of_skipped_frames():
+    game = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    game.play_turn()
+    game.enable_journal()
+    mark = game.mark()
+    before = full_state(game)
+    stats = game.enable_stats()
+    game.play_turn()
+    assert stats.skipped_frames > 0
+    game.rollback(mark)
+    assert full_state(game) == before
+
+def test_nothing_is_skipped_for_frame_listeners():
+    game = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    game.events.subscribe(MoveEvent, lambda event: None)
+    stats = game.enable_stats()
+    game.play_turn()
+    assert stats.skipped_frames == 0 and stats.frames == game.frame_count
+    assert ColumnarTerminalGame(ScriptedPlayer(), ScriptedPlayer()).skip_idle_frames() == 0
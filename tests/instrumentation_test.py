@@ -0,0 +1,50 @@
+import pytest
+
+from termite.game import TerminalGame
+from termite.instrumentation import FRAME_STEPS, GameStats
+from termite.storage import ColumnarTerminalGame
+from helpers import ScriptedPlayer, play_turns
+
+@pytest.mark.parametrize('engine', [TerminalGame, ColumnarTerminalGame])
+def test_stats_do_not_change_the_game(engine):
+    reference = engine(ScriptedPlayer(), ScriptedPlayer())
+    game = engine(ScriptedPlayer(), ScriptedPlayer())
+    stats = game.enable_stats()
+    assert play_turns(game, 8) == play_turns(reference, 8)
+
+    assert sum(stats.frames_per_action_phase) == game.frame_count == stats.frames
+    assert len(stats.frames_per_action_phase) == 8
+    assert set(stats.step_seconds) == set(FRAME_STEPS)
+    assert all(seconds > 0 for seconds in stats.step_seconds.values())
+    assert stats.flow_field_searches > 0 and stats.flow_field_nodes >= stats.flow_field_searches
+    assert stats.target_candidates >= stats.target_selections > 0
+    assert max(stats.units_per_frame) > 0
+
+    game.disable_stats()
+    play_turns(game, 1)
+    assert stats.frames == sum(stats.frames_per_action_phase) < game.frame_count
+
+def test_engines_count_alike():
+    games = [engine(ScriptedPlayer(), ScriptedPlayer()) for engine in (TerminalGame, ColumnarTerminalGame)]
+    first, second = (game.enable_stats() for game in games)
+    for game in games:
+        play_turns(game, 6)
+    for key in ('frames_per_action_phase', 'units_per_frame', 'target_selections', 'target_candidates'):
+        assert getattr(first, key) == getattr(second, key)
+
+def test_shared_stats():
+    stats = GameStats()
+    for _ in range(2):
+        game = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+        game.enable_stats(stats)
+        play_turns(game, 3)
+    assert len(stats.frames_per_action_phase) == 6
+    assert stats.search_calls == stats.validate_calls == 0
+
+    game = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    game.pathfinder.use_flow_field = False
+    game.enable_stats(stats)
+    play_turns(game, 2)
+    assert stats.validate_calls == stats.search_calls > 0
+    assert stats.search_nodes > 0 and stats.validate_nodes > 0
+    assert stats.as_dict()['frames_per_action_phase'] == stats.frames_per_action_phase
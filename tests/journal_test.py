@@ -0,0 +1,93 @@
+from termite.events import StructureDestroyedEvent
+from termite.game import TerminalGame
+from termite.storage import ColumnarTerminalGame
+from termite.units import Turret, Wall
+from helpers import ScriptedPlayer, full_state, play_random_turns, play_turns, random_actions
+import pytest
+
+def test_rollback_turns():
+    game = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    play_turns(game, 2)
+    game.enable_journal()
+    before = full_state(game)
+    mark = game.mark()
+    expected = play_turns(game, 4)
+    game.rollback(mark)
+    assert full_state(game) == before
+    assert play_turns(game, 4) == expected
+
+def test_nested_rollbacks_mid_action_phase():
+    game = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    play_turns(game, 2)
+    game.enable_journal()
+    outer = game.mark()
+    outer_state = full_state(game)
+    game.deploy_phase()
+    for _ in range(15):
+        game.process_frame()
+        game.journal.save(game, 'frame_count')  # As action_phase does.
+        game.frame_count += 1
+    inner = game.mark()
+    inner_state = full_state(game)
+    game.action_phase()
+    after_state = full_state(game)
+    game.rollback(inner)
+    assert full_state(game) == inner_state
+    game.action_phase()
+    assert full_state(game) == after_state
+    game.rollback(outer)
+    assert full_state(game) == outer_state
+    assert game.journal.mark() == outer
+
+@pytest.mark.parametrize('seed', [0, 3, 7])
+def test_rollback_random_games(seed):
+    game = TerminalGame()
+    play_random_turns(game, seed, 4)
+    game.enable_journal()
+    before = full_state(game)
+    mark = game.mark()
+    destroyed = []
+    game.events.subscribe(StructureDestroyedEvent, destroyed.append)
+    expected = play_random_turns(game, seed, 6)
+    game.rollback(mark)
+    assert destroyed and full_state(game) == before
+    assert play_random_turns(game, seed, 6) == expected
+
+def test_rollback_mid_route_in_random_games():
+    game = TerminalGame()
+    play_random_turns(game, 1, 3)
+    game.enable_journal()
+    game.apply_deployments(game.player1, random_actions(1, 3, 0))
+    game.apply_deployments(game.player2, random_actions(1, 3, 1))
+    for _ in range(10):
+        game.process_frame()
+        game.journal.save(game, 'frame_count')
+        game.frame_count += 1
+    mark = game.mark()
+    mid_route = full_state(game)
+    destroyed = []
+    game.events.subscribe(StructureDestroyedEvent, destroyed.append)
+    game.action_phase()
+    after = full_state(game)
+    game.rollback(mark)
+    assert destroyed and full_state(game) == mid_route
+    game.action_phase()
+    assert full_state(game) == after
+
+def test_rollback_after_tile_is_reused():
+    game = TerminalGame()
+    wall = Wall()
+    game.place_unit(game.player1, wall, (3, 12))
+    game.enable_journal()
+    mark = game.mark()
+    before = full_state(game), game.state_hash(), game.map.threats.damage(0)
+    wall.take_damage(wall.health)
+    game.remove_destroyed_units()
+    game.place_unit(game.player1, Turret(), (3, 12))
+    game.rollback(mark)
+    assert game.map.grid[12][3] is wall
+    assert (full_state(game), game.state_hash(), game.map.threats.damage(0)) == before
+
+def test_columnar_engine_has_no_journal():
+    with pytest.raises(NotImplementedError):
+        ColumnarTerminalGame(ScriptedPlayer(), ScriptedPlayer()).enable_journal()
@@ -0,0 +1,27 @@
+from termite.game import TerminalGame
+from termite.units import Scout, Turret, Wall
+
+def test_structure_layer_and_bitboard():
+    game = TerminalGame()
+    wall = Wall()
+    game.place_unit(game.player1, wall, (13, 10))
+    game.place_unit(game.player1, Scout(), (13, 0))
+    assert game.map.grid[10][13] is wall and game.map.grid[0][13] is None
+    assert [i for i, blocked in enumerate(game.map.blocked) if blocked] == [10 * 28 + 13]
+    assert game.pathfinder._is_blocked((13, 10)) and not game.pathfinder._is_blocked((13, 0))
+    game.remove_unit(wall)
+    assert game.map.grid[10][13] is None and not any(game.map.blocked)
+
+def test_mobile_units_move_between_tiles():
+    game = TerminalGame()
+    first, second = Scout(), Scout()
+    game.place_unit(game.player1, first, (13, 0))
+    game.place_unit(game.player1, second, (13, 0))
+    assert game.map.mobile_units(13, 0) == [first, second]
+    assert not game.is_valid_deployment(game.player1, Turret(), (13, 0))
+    while first.position == (13, 0):
+        game.move_units()
+    x, y = first.position
+    assert (x, y) != (13, 0) and game.map.mobile_units(x, y) == [first, second]
+    assert game.map.mobile_units(13, 0) == [] and game.map.grid[y][x] is None
+    assert game.is_valid_deployment(game.player1, Turret(), (13, 0))
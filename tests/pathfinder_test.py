@@ -0,0 +1,118 @@
+from termite.game import TerminalGame
+from termite.map import Map, Pathfinder
+from termite.units import Scout, Wall
+from helpers import play_random_turns
+import random
+import pytest
+
+EDGES = ['top-left', 'top-right', 'bottom-left', 'bottom-right']
+
+def random_map(seed: int, walls: int) -> Map:
+    rng = random.Random(seed)
+    game_map = Map()
+    tiles = [(x, y) for y in range(28) for x in range(28) if game_map.is_in_arena(x, y)]
+    for x, y in rng.sample(tiles, walls):
+        game_map.place_unit(Wall(), x, y)
+    return game_map
+
+@pytest.mark.parametrize("seed,walls", [(0, 0), (1, 60), (2, 200), (3, 400)])
+def test_flow_field_matches_search(seed, walls, capsys):
+    game_map = random_map(seed, walls)
+    search = Pathfinder(game_map, use_flow_field=False)
+    flow = Pathfinder(game_map, use_flow_field=True)
+    starts = [(x, y) for y in range(28) for x in range(28)
+              if game_map.is_in_arena(x, y) and game_map.grid[y][x] is None]
+    for start in random.Random(seed).sample(starts, min(40, len(starts))):
+        for edge in EDGES:
+            assert flow.find_path(Scout(), start, edge) == search.find_path(Scout(), start, edge)
+
+def test_flow_field_repaired_after_structure_change(capsys):
+    game_map = Map()
+    pathfinder = Pathfinder(game_map)
+    flow_field = pathfinder.get_flow_field('top-right')
+    wall = Wall()
+    game_map.place_unit(wall, 14, 1)
+    assert pathfinder.get_flow_field('top-right') is flow_field
+    assert (14, 1) not in pathfinder.find_path(Scout(), (13, 0), 'top-right')
+    game_map.remove_unit(wall, 14, 1)
+    assert pathfinder.find_path(Scout(), (13, 0), 'top-right') == \
+        Pathfinder(game_map, use_flow_field=False).find_path(Scout(), (13, 0), 'top-right')
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_repaired_flow_field_matches_rebuilt(seed, capsys):
+    rng = random.Random(seed)
+    game_map = Map()
+    tiles = [(x, y) for y in range(28) for x in range(28) if game_map.is_in_arena(x, y)]
+    pathfinder = Pathfinder(game_map)
+    for edge in EDGES:
+        pathfinder.get_flow_field(edge)
+    walls = {}
+    for _ in range(150):
+        if walls and rng.random() < 0.3:
+            position = rng.choice(sorted(walls))
+            game_map.remove_unit(walls.pop(position), *position)
+        else:
+            position = rng.choice(tiles)
+            if position in walls:
+                continue
+            walls[position] = Wall()
+            game_map.place_unit(walls[position], *position)
+        rebuilt = Pathfinder(game_map)
+        for edge in EDGES:
+            repaired_field, rebuilt_field = pathfinder.get_flow_field(edge), rebuilt.get_flow_field(edge)
+            assert all(repaired_field.pathlength(tile) == rebuilt_field.pathlength(tile) for tile in tiles)
+            start = rng.choice(tiles)
+            if start not in walls:
+                assert pathfinder.find_path(None, start, edge) == rebuilt.find_path(None, start, edge)
+
+def test_flow_field_built_after_repair_keeps_earlier_fields_repaired(capsys):
+    game_map = Map()
+    pathfinder = Pathfinder(game_map)
+    pathfinder.get_flow_field('top-right')
+    game_map.place_unit(Wall(), 20, 10)
+    pathfinder.get_flow_field('top-left')  # Built after a repair, with regions relabelled.
+    path = pathfinder.find_path(None, (13, 0), 'top-right')
+    game_map.place_unit(Wall(), *path[5])
+    assert pathfinder.find_path(None, (13, 0), 'top-right') == Pathfinder(game_map).find_path(None, (13, 0), 'top-right')
+
+@pytest.mark.parametrize("use_flow_field", [True, False])
+def test_all_routes_are_invalidated(use_flow_field, capsys):
+    # Whether a unit repaths must not depend on which flow fields happen to be cached.
+    game_map = Map()
+    pathfinder = Pathfinder(game_map, use_flow_field=use_flow_field)
+    left, right = Scout(), Scout()
+    left.path = pathfinder.find_path(left, (13, 0), 'top-right')
+    right.path = pathfinder.find_path(right, (27, 13), 'top-left')
+    game_map.place_unit(Wall(), *left.path[3])
+    assert left.needs_repath and right.needs_repath
+
+def test_repath_keeps_the_course(capsys):
+    game = TerminalGame()
+    scout = Scout()
+    game.place_unit(game.player1, scout, (13, 0))
+    for _ in range(6):
+        game.process_frame()
+    expected = list(scout.path)
+    game.place_unit(game.player2, Wall(), (5, 16))
+    assert scout.needs_repath and (5, 16) not in expected
+    game.process_frame()
+    assert scout.position == expected[0] and scout.path == expected[1:]
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_flow_field_games_match_search_games(seed, capsys):
+    # Structures are destroyed while units are on their way, so units repath mid-route.
+    search = TerminalGame()
+    search.pathfinder = Pathfinder(search.map, use_flow_field=False)
+    assert play_random_turns(search, seed, 8) == play_random_turns(TerminalGame(), seed, 8)
+
+def test_path_terminates_with_wall_on_end_point(capsys):
+    game_map = Map()
+    # (14, 0) is an end point of the bottom-right edge. Seeding it would give (13, 1)
+    # a pathlength of 1 with no free neighbor at 0, and the path would never end.
+    game_map.place_unit(Wall(), 14, 0)
+    game_map.place_unit(Wall(), 14, 1)
+    end_points = [(x, x - 14) for x in range(14, 28)]
+    for use_flow_field in (True, False):
+        path = Pathfinder(game_map, use_flow_field=use_flow_field).find_path(Scout(), (12, 1), 'bottom-right')
+        assert path[-1] in end_points
+        assert (14, 0) not in path
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from termite.divergence import check_replay
+from termite.game import TerminalGame
+from termite.recorder import ReplayRecorder, unit_information
+from termite.replay import ReplayReader, ReplayWriter, load_replay
+from termite.storage import ColumnarTerminalGame
+from helpers import REPLAY, ScriptedPlayer
+
+@pytest.mark.parametrize('engine', [TerminalGame, ColumnarTerminalGame])
+def test_recorded_game_replays_without_divergence(engine, tmp_path):
+    path = str(tmp_path / 'game.replay.gz')
+    game = engine(ScriptedPlayer(), ScriptedPlayer())
+    with ReplayRecorder(game, path, buffer_size=4096):
+        for _ in range(6):
+            game.play_turn()
+
+    report = check_replay(path, engine)
+    assert report.error is None and report.turns == 6 and report.divergences == []
+
+    replay = load_replay(path)
+    phases, turns, frames_in_turn, frames = replay.turn_info.T
+    assert phases[0] == 0 and phases[-1] == 2 and set(phases[1:-1].tolist()) == {0, 1}
+    assert list(frames[:-1]) == list(range(len(frames) - 1)) and frames[-1] == frames[-2]
+    assert len(frames) - 7 == game.frame_count  # One deploy frame per turn and the end frame.
+    assert replay.end_stats['turns'] == 6 and replay.end_stats['frames'] == frames[-1]
+    assert replay.stats[-1, 0, 0] == game.player1.health and replay.stats[-1, 1, 0] == game.player2.health
+    spawns = replay.events['spawn']
+    assert set(spawns['type'].tolist()) >= {0, 1, 2, 3, 4, 5, 7}
+    assert len(set(spawns['id'].tolist())) == len(spawns)
+
+def test_recorder_stops_listening_when_closed(tmp_path):
+    game = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    recorder = ReplayRecorder(game, str(tmp_path / 'game.replay'))
+    game.play_turn()
+    recorder.close()
+    assert not game.events
+    game.play_turn()
+    with ReplayReader(str(tmp_path / 'game.replay')) as reader:
+        assert [frame.turn_info[1] for frame in reader][-1] == 0
+
+def test_writer_buffers(tmp_path):
+    path = tmp_path / 'frames.replay'
+    writer = ReplayWriter(str(path), {'unitInformation': []}, buffer_size=100)
+    assert path.read_bytes() == b''
+    writer.write_frame({'turnInfo': [0, 0, -1, 0], 'padding': 'x' * 100})
+    assert path.read_bytes().count(b'\n') == 2
+    writer.write_frame({'turnInfo': [1, 0, 0, 1]})
+    assert path.read_bytes().count(b'\n') == 2
+    writer.close()
+    assert [json.loads(line)['turnInfo'] for line in path.read_text().splitlines()[1:]] == [[0, 0, -1, 0], [1, 0, 0, 1]]
+
+def test_unit_information_matches_terminal():
+    with ReplayReader(REPLAY) as reader:
+        official = reader.unit_information
+    ours = unit_information()
+    assert len(ours) == len(official)
+    for expected, actual in zip(official, ours):
+        for key in ('shorthand', 'unitCategory', 'cost1', 'cost2', 'startHealth', 'speed', 'shieldRange'):
+            assert expected.get(key) == actual.get(key)
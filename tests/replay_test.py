@@ -0,0 +1,96 @@
+import gzip
+import json
+import shutil
+
+import numpy as np
+import pytest
+
+from termite.game import TerminalGame
+from termite.replay import ReplayReader, iter_frames, load_replay
+from termite.storage import ColumnarTerminalGame
+from termite.units import UNIT_TYPES
+from helpers import REPLAY, game_summary, play_turns
+
+def json_frames():
+    with open(REPLAY) as file:
+        lines = [json.loads(line) for line in file if line.strip()]
+    return lines[0], lines[1:]
+
+def test_frames_match_json():
+    header, frames = json_frames()
+    with ReplayReader(REPLAY) as reader:
+        assert reader.header == header
+        assert len(reader.unit_information) == 8
+        decoded = list(reader)
+        assert reader.end_stats == frames[-1]['endStats']
+    assert len(decoded) == len(frames)
+    for frame, expected in zip(decoded, frames):
+        assert frame.turn_info.tolist() == expected['turnInfo']
+        assert np.allclose(frame.stats, [expected['p1Stats'], expected['p2Stats']])
+        for player, key in ((1, 'p1Units'), (2, 'p2Units')):
+            units = frame.units[frame.units['player'] == player]
+            assert len(units) == sum(map(len, expected[key]))
+            for code, units_of_type in enumerate(expected[key]):
+                of_type = units[units['type'] == code]
+                assert of_type['id'].tolist() == [int(unit[3]) for unit in units_of_type]
+                assert np.allclose(of_type['health'], [unit[2] for unit in units_of_type])
+        for kind, events in expected['events'].items():
+            assert len(frame.events[kind]) == len(events)
+        for row, event in zip(frame.events['attack'], expected['events']['attack']):
+            assert (row['x'], row['y'], row['to_x'], row['to_y']) == (*event[0], *event[1])
+            assert (row['damage'], row['type'], row['id'], row['target_id'], row['player']) == \
+                   (event[2], event[3], int(event[4]), int(event[5]), event[6])
+
+def test_load_replay_columns(tmp_path):
+    replay = load_replay(REPLAY)
+    frames = list(iter_frames(REPLAY))
+    assert replay.end_stats['turns'] == replay.turn_info[-1, 1]
+    assert len(replay.unit_offsets) == len(frames) + 1
+    for index in (0, len(frames) // 2, len(frames) - 1):
+        frame = replay.frame(index)
+        assert np.array_equal(frame.units, frames[index].units)
+        assert all(np.array_equal(frame.events[kind], events) for kind, events in frames[index].events.items())
+
+    compressed = tmp_path / 'replay.replay.gz'
+    with open(REPLAY, 'rb') as source, gzip.open(compressed, 'wb') as target:
+        shutil.copyfileobj(source, target)
+    assert np.array_equal(load_replay(str(compressed)).units, replay.units)
+
+def placed_game(engine, frame):
+    """
+    Build the position of a deploy-phase frame through the regular placement code.
+    """
+    game = engine()
+    _, game.current_turn, _, game.frame_count = frame['turnInfo']
+    for player, stats in ((game.player1, frame['p1Stats']), (game.player2, frame['p2Stats'])):
+        player.health, player.structure_points, player.mobile_points, _ = stats
+    for player, key in ((game.player1, 'p1Units'), (game.player2, 'p2Units')):
+        upgraded = {(x, y) for x, y, _, _ in frame[key][7]}
+        for code in range(3):
+            for x, y, health, _ in frame[key][code]:
+                unit = UNIT_TYPES[code]()
+                game.place_unit(player, unit, (x, y))
+                if (x, y) in upgraded:
+                    unit.upgrade()
+                unit.health = health
+                game.map.rehash_structure(unit)
+    if isinstance(game, ColumnarTerminalGame):
+        for unit in game.units:
+            game.store.pull(unit)
+    return game
+
+@pytest.mark.parametrize('engine', [TerminalGame, ColumnarTerminalGame])
+def test_from_replay_frame(engine):
+    _, frames = json_frames()
+    starts = [frame for frame in frames if frame['turnInfo'][0] == 0]
+    for frame in starts[1::4]:
+        game = engine.from_replay_frame(frame)
+        reference = placed_game(engine, frame)
+        assert game_summary(game) == game_summary(reference)
+        assert game.state_hash() == reference.state_hash()
+        assert [[type(cell) for cell in row] for row in game.map.grid] == \
+               [[type(cell) for cell in row] for row in reference.map.grid]
+        assert play_turns(game, 2) == play_turns(reference, 2)
+
+    with pytest.raises(ValueError):
+        engine.from_replay_frame(next(frame for frame in frames if sum(map(len, frame['p1Units'][3:6]))))
@@ -0,0 +1,90 @@
+from termite.game import TerminalGame
+from termite.storage import ColumnarTerminalGame
+from termite.events import StructureDestroyedEvent
+from helpers import ScriptedPlayer, frame_summary, play_random_turns, play_turns, random_actions
+import pytest
+
+ENGINES = [TerminalGame, ColumnarTerminalGame]
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_restore_replays_identical_turns(engine):
+    game = engine(ScriptedPlayer(), ScriptedPlayer())
+    play_turns(game, 3)
+    snapshot = game.snapshot()
+    expected = play_turns(game, 5)
+    game.restore(snapshot)
+    assert play_turns(game, 5) == expected
+    game.restore(snapshot)
+    assert play_turns(game, 5) == expected
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_restore_mid_action_phase(engine):
+    game = engine(ScriptedPlayer(), ScriptedPlayer())
+    play_turns(game, 2)
+    game.deploy_phase()
+    for _ in range(12):
+        game.process_frame()
+        game.frame_count += 1
+    snapshot = game.snapshot()
+    expected = []
+    while game.units_active():
+        game.process_frame()
+        game.frame_count += 1
+        expected.append(frame_summary(game))
+    assert len(expected) > 5
+    game.restore(snapshot)
+    replayed = []
+    while game.units_active():
+        game.process_frame()
+        game.frame_count += 1
+        replayed.append(frame_summary(game))
+    assert replayed == expected
+
+def test_clone_continues_independently():
+    game = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    play_turns(game, 4)
+    clone = clone_with_players(game)
+    expected = play_turns(game, 4)
+    assert play_turns(clone, 4) == expected
+
+def clone_with_players(game):
+    clone = game.clone()
+    clone.player1.__class__ = clone.player2.__class__ = ScriptedPlayer
+    return clone
+
+@pytest.mark.parametrize('seed', [0, 3, 7])
+def test_clone_continues_random_games(seed):
+    game = TerminalGame()
+    play_random_turns(game, seed, 4)
+    clone = game.clone()
+    snapshot = game.snapshot()
+    destroyed = []
+    game.events.subscribe(StructureDestroyedEvent, destroyed.append)
+    expected = play_random_turns(game, seed, 6)
+    assert destroyed and play_random_turns(clone, seed, 6) == expected
+    game.restore(snapshot)
+    assert play_random_turns(game, seed, 6) == expected
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_restore_mid_route_in_random_games(engine):
+    # Structures are destroyed while the restored units are on their way, so they repath mid-route.
+    game = engine()
+    play_random_turns(game, 1, 3)
+    game.apply_deployments(game.player1, random_actions(1, 3, 0))
+    game.apply_deployments(game.player2, random_actions(1, 3, 1))
+    for _ in range(10):
+        game.process_frame()
+        game.frame_count += 1
+    snapshot = game.snapshot()
+    clone = game.clone() if engine is TerminalGame else None
+    destroyed = []
+    game.events.subscribe(StructureDestroyedEvent, destroyed.append)
+    game.action_phase()
+    expected = frame_summary(game)
+    assert destroyed
+    game.restore(snapshot)
+    game.action_phase()
+    assert frame_summary(game) == expected
+    if clone is not None:
+        clone.action_phase()
+        assert frame_summary(clone) == expected
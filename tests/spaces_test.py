@@ -0,0 +1,55 @@
+import numpy as np
+import tracemalloc
+
+from termite.game import TerminalGame
+from termite.spaces import (ACTION_MASK_SHAPE, BOARD_SHAPE, NUM_SCALARS, UPGRADE_CODE, UNIT_TYPES,
+                            encode_observation, write_action_mask)
+from helpers import ScriptedPlayer
+
+def mid_game():
+    game = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    for _ in range(4):
+        game.play_turn()
+    return game
+
+def test_action_mask_matches_engine_checks():
+    game = mid_game()
+    board = np.zeros(BOARD_SHAPE, dtype=np.float32)
+    scalars = np.zeros(NUM_SCALARS, dtype=np.float32)
+    mask = np.zeros(ACTION_MASK_SHAPE, dtype=np.bool_)
+    free = np.zeros(BOARD_SHAPE[1:], dtype=np.bool_)
+    encode_observation(game, board, scalars)
+    for index, player in enumerate((game.player1, game.player2)):
+        write_action_mask(board, scalars, index, mask, free)
+        for code, unit_type in enumerate(UNIT_TYPES):
+            unit = unit_type()
+            expected = [[game.is_valid_deployment(player, unit, (x, y)) and player.can_afford(unit) for x in range(28)]
+                        for y in range(28)]
+            assert mask[code].tolist() == expected
+        expected = [[(s := game.map.grid[y][x]) is not None and game.get_unit_owner(s) is player
+                     and not s.is_upgraded and player.structure_points >= s.upgrade_cost for x in range(28)]
+                    for y in range(28)]
+        assert mask[UPGRADE_CODE].tolist() == expected
+        assert mask[UPGRADE_CODE].any()
+
+def test_observation_does_not_allocate():
+    game = mid_game()
+    board = np.zeros(BOARD_SHAPE, dtype=np.float32)
+    scalars = np.zeros(NUM_SCALARS, dtype=np.float32)
+    mask = np.zeros(ACTION_MASK_SHAPE, dtype=np.bool_)
+    free = np.zeros(BOARD_SHAPE[1:], dtype=np.bool_)
+    tracemalloc.start()
+    try:
+        for _ in range(5):
+            encode_observation(game, board, scalars)
+            write_action_mask(board, scalars, 0, mask, free)
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        for _ in range(20):
+            encode_observation(game, board, scalars)
+            write_action_mask(board, scalars, 0, mask, free)
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert after - before < 1024  # Nothing accumulates over the steps.
+    assert peak - before < 4096  # No array-sized temporaries (a board is 31 kB).
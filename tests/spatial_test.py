@@ -0,0 +1,47 @@
+from termite.spatial import SpatialIndex, UNIT_RANGES
+from termite.units import Scout, Wall
+import random
+
+def test_query_matches_distance_scan():
+    rng = random.Random(0)
+    index = SpatialIndex()
+    units = []
+    for _ in range(200):
+        unit = Scout() if rng.random() < 0.5 else Wall()
+        unit.position = (rng.randrange(28), rng.randrange(28))
+        index.add(unit)
+        units.append(unit)
+    for unit in units[::2]:
+        new_position = (rng.randrange(28), rng.randrange(28))
+        index.move(unit, unit.position, new_position)
+        unit.position = new_position
+    for unit in units[::7]:
+        index.remove(unit)
+        units.remove(unit)
+
+    probe = Scout()
+    for _ in range(50):
+        probe.position = (rng.randrange(28), rng.randrange(28))
+        for radius in UNIT_RANGES:
+            expected = [u for u in units if probe.distance_to(u) <= radius]
+            assert index.query(probe.position, radius) == expected
+
+def test_batch_targeting_matches_select_target():
+    from termite.game import TerminalGame
+    from termite.units import Demolisher, Interceptor, Turret, Targeting
+    rng = random.Random(1)
+    game = TerminalGame()
+    for _ in range(120):
+        unit = rng.choice([Scout, Demolisher, Interceptor, Wall, Turret])()
+        player = rng.choice([game.player1, game.player2])
+        x, y = rng.randrange(28), rng.randrange(28)
+        if not game.map.is_in_arena(x, y) or (not isinstance(unit, (Scout, Demolisher, Interceptor)) and game.map.grid[y][x] is not None):
+            continue
+        game.frame_count = rng.randrange(3)
+        game.place_unit(player, unit, (x, y))
+        unit.health = rng.choice([unit.health, unit.health / 2, 1])
+    attackers = [u for u in game.units if u.range > 0]
+    for attacker in attackers:
+        expected = Targeting.select_target(attacker, attacker.get_potential_targets(game))
+        (_, target, _), = game.targeting.resolve([attacker])
+        assert target is expected
@@ -0,0 +1,43 @@
+from termite.game import TerminalGame
+from termite.storage import ColumnarTerminalGame
+from termite.units import Turret
+from helpers import ScriptedPlayer, game_summary
+
+def test_columnar_matches_object_engine():
+    reference = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    columnar = ColumnarTerminalGame(ScriptedPlayer(), ScriptedPlayer(), capacity=4)
+    for _ in range(12):
+        reference.play_turn()
+        columnar.play_turn()
+        columnar.sync_views()
+        assert game_summary(columnar) == game_summary(reference)
+
+def test_columnar_frames_match_object_engine():
+    reference = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    columnar = ColumnarTerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    for game in (reference, columnar):
+        game.deploy_phase()
+    while reference.units_active():
+        assert columnar.units_active()
+        for game in (reference, columnar):
+            game.process_frame()
+            game.frame_count += 1
+        state = columnar.get_game_state()
+        assert [(u.unit_type, u.position, u.health, u.shields if hasattr(u, 'shields') else None) for u in state['units']] == \
+               [(u.unit_type, u.position, u.health, u.shields if hasattr(u, 'shields') else None) for u in reference.units]
+    assert not columnar.units_active()
+
+def test_upgrading_damaged_structure_keeps_damage():
+    game = ColumnarTerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    damaged = []
+    while not damaged:
+        game.play_turn()
+        # Read the columns directly: the unit objects are only refreshed on demand.
+        damaged = [u for u in game.units if isinstance(u, Turret) and not u.is_upgraded
+                   and game.store.health[u._slot] < game.store.max_health[u._slot]]
+    turret = damaged[0]
+    health_fraction = game.store.health[turret._slot] / game.store.max_health[turret._slot]
+    game.player1.structure_points = game.player2.structure_points = 100
+    assert game.upgrade_structure(game.get_unit_owner(turret), turret)
+    assert game.store.health[turret._slot] == int(turret.max_health * health_fraction)
+    assert turret.health < turret.max_health
@@ -0,0 +1,51 @@
+import numpy as np
+
+from termite.game import TerminalGame
+from termite.spaces import BOARD_SHAPE, NUM_SCALARS, decode_actions, encode_actions, encode_observation
+from termite.subproc_env import SubprocVecTerminalGame
+from helpers import ScriptedPlayer, make_players
+
+def test_subproc_env_matches_scalar_engine():
+    num_workers, games_per_worker = 2, 2
+    num_games = num_workers * games_per_worker
+    references = [TerminalGame() for _ in range(num_games)]
+    scripts = [make_players(i) for i in range(num_games)]
+    for p1, p2 in scripts:
+        p1.side, p2.side = 'bottom', 'top'
+    board = np.zeros(BOARD_SHAPE, dtype=np.float32)
+    scalars = np.zeros(NUM_SCALARS, dtype=np.float32)
+
+    with SubprocVecTerminalGame(num_workers, games_per_worker) as env:
+        obs_board, obs_scalars = env.reset()
+        finished = np.zeros(num_games, dtype=bool)
+        for _ in range(12):
+            for i, game in enumerate(references):
+                state = game.get_game_state()
+                for side, player in enumerate(scripts[i]):
+                    encode_actions(player.deploy(state), player.upgrade(state), env.actions[i, side])
+            margins = [g.player1.health - g.player2.health for g in references]
+            for i, game in enumerate(references):
+                game.play_actions(*zip(*(decode_actions(env.actions[i, side]) for side in range(2))))
+            obs_board, obs_scalars, rewards, dones = env.step()
+            for i, game in enumerate(references):
+                change = game.player1.health - game.player2.health - margins[i]
+                assert rewards[i].tolist() == [change, -change]
+                assert dones[i] == game.is_game_over()
+                if dones[i]:
+                    finished[i] = True
+                    references[i] = game = TerminalGame()
+                encode_observation(game, board, scalars)
+                assert np.array_equal(obs_board[i], board)
+                assert np.array_equal(obs_scalars[i], scalars)
+        assert finished.any()  # Aggressive games were reset by their worker.
+    assert env.closed
+
+def test_encode_actions_round_trip():
+    player = ScriptedPlayer()
+    player.side = 'bottom'
+    deployments = player.deploy({'current_turn': 0})
+    out = np.zeros((32, 3), dtype=np.int16)
+    encode_actions(deployments, [(4, 11)], out)
+    decoded, upgrades = decode_actions(out)
+    assert [(type(u), p) for u, p in decoded] == [(type(u), p) for u, p in deployments]
+    assert upgrades == [(4, 11)]
@@ -0,0 +1,83 @@
+import time
+
+from termite.game import TerminalGame
+from termite.threat import ThreatMap
+from termite.units import Scout, Demolisher, Support, Turret, Wall
+from helpers import ScriptedPlayer, play_turns
+
+def tile(x, y):
+    return y * 28 + x
+
+def rebuilt(game_map):
+    threats = ThreatMap(game_map)
+    threats.invalidate()
+    return ([threats.damage(side) for side in (0, 1)], [threats.shielding(side) for side in (0, 1)])
+
+def current(game_map):
+    return ([game_map.threats.damage(side) for side in (0, 1)], [game_map.threats.shielding(side) for side in (0, 1)])
+
+def test_turret_coverage_follows_the_turret():
+    game = TerminalGame()
+    turret = Turret()
+    game.place_unit(game.player2, turret, (13, 16))
+    damage = game.map.threats.damage(1)
+    assert (damage[tile(13, 14)], damage[tile(13, 13)], game.map.threats.damage(0)[tile(13, 14)]) == (5, 0, 0)
+    turret.upgrade()
+    assert (damage[tile(13, 14)], damage[tile(13, 13)]) == (15, 15)
+    turret.take_damage(turret.health)
+    game.remove_destroyed_units()
+    assert not any(damage)
+
+def test_incremental_maps_match_a_rebuild():
+    game = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    game.place_unit(game.player1, Support(), (10, 5))
+    assert any(game.map.threats.shielding(0))
+    for _ in range(6):
+        game.play_turn()
+        assert current(game.map) == rebuilt(game.map)
+    assert any(game.map.threats.damage(0))
+
+def test_maps_follow_rollbacks_and_restores():
+    game = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    play_turns(game, 3)
+    snapshot = game.snapshot()
+    expected = current(game.map)
+    play_turns(game, 3)
+    game.restore(snapshot)
+    assert current(game.map) == expected
+
+    game.enable_journal()
+    mark = game.mark()
+    game.play_turn()
+    game.rollback(mark)
+    assert current(game.map) == expected == rebuilt(game.map)
+
+def test_estimate():
+    game = TerminalGame()
+    estimate = game.estimate_attack(game.player1, Scout, (13, 0), count=3)
+    assert (estimate.damage, estimate.survivors, estimate.breaches) == (0, 3, 3)
+    assert estimate.frames == len(game.pathfinder.find_path(None, (13, 0), 'top-right'))
+
+    for x in range(8, 20, 2):
+        game.place_unit(game.player2, Turret(), (x, 16))
+    game.place_unit(game.player2, Wall(), (13, 27))
+    path = game.pathfinder.find_path(None, (13, 0), 'top-right')
+    per_frame = sum(game.map.threats.damage(1)[tile(x, y)] for x, y in path)
+    estimate = game.estimate_attack(game.player1, Scout, (13, 0), count=3)
+    assert estimate.damage == min(per_frame, 3 * 15)
+    assert estimate.survivors == 3 - min(3, int(per_frame // 15)) == estimate.breaches
+
+    game.place_unit(game.player1, Support(), (13, 2))
+    shielded = game.estimate_attack(game.player1, Scout, (13, 0), count=3)
+    assert shielded.shielding == 3 and shielded.survivors >= estimate.survivors
+    # Demolishers spend two frames per tile.
+    assert game.estimate_attack(game.player1, Demolisher, (13, 0)).frames == 2 * len(path)
+
+def test_estimate_is_cheap():
+    game = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    play_turns(game, 3)
+    game.estimate_attack(game.player1, Scout, (13, 0))
+    start = time.perf_counter()
+    for x in range(14):
+        game.estimate_attack(game.player1, Scout, (x, 13 - x), count=5)
+    assert (time.perf_counter() - start) / 14 < 0.005
@@ -0,0 +1,37 @@
+import pytest
+
+from termite.game import TerminalGame
+from termite.units import UNIT_STATS, UNIT_TYPES, SCOUT, Scout, Support, Turret, Wall
+
+@pytest.mark.parametrize('unit_type', UNIT_TYPES)
+def test_units_have_no_instance_dict(unit_type):
+    unit = unit_type()
+    assert not hasattr(unit, '__dict__')
+    assert unit.stats is UNIT_STATS[unit.type_code][0]
+    assert (unit.type_code >= SCOUT) == (unit.stats.speed > 0)
+
+def test_stats_are_shared():
+    first, second = Turret(), Turret()
+    assert first.stats is second.stats
+    second.upgrade()
+    assert first.stats is not second.stats and first.damage == 5 and second.damage == 15
+    assert (second.range, second.upgrade_cost, second.is_upgraded) == (3.5, 4, True)
+
+def test_upgrade_keeps_the_fraction_of_health():
+    wall = Wall()
+    wall.upgrade()
+    assert (wall.health, wall.max_health) == (120, 120)
+    damaged = Wall()
+    damaged.take_damage(30)
+    damaged.upgrade()
+    assert damaged.health == 60
+
+def test_supports_forget_shielded_units_after_the_action_phase():
+    game = TerminalGame()
+    support = Support()
+    game.place_unit(game.player1, support, (13, 2))
+    game.place_unit(game.player1, Scout(), (13, 0))
+    game.apply_support_shields()
+    assert len(support.shielded_units) == 1
+    game.action_phase()
+    assert support.shielded_units == set()
@@ -0,0 +1,36 @@
+from termite.game import TerminalGame
+from termite.units import Wall
+from termite.vec_env import VecTerminalGame
+from helpers import game_summary, make_players
+
+def test_vec_env_matches_scalar_engine():
+    num_games = 3
+    references = [TerminalGame(*make_players(i)) for i in range(num_games)]
+    scripts = [make_players(i) for i in range(num_games)]
+    for p1, p2 in scripts:
+        p1.side, p2.side = 'bottom', 'top'
+    vec = VecTerminalGame(num_games, capacity=8)
+
+    for _ in range(40):
+        running = [i for i in range(num_games) if not vec.done[i]]
+        if not running:
+            break
+        deployments, upgrades = [], []
+        for i in range(num_games):
+            state = vec.games[i].get_game_state()
+            deployments.append(tuple(player.deploy(state) for player in scripts[i]))
+            upgrades.append(tuple(player.upgrade(state) for player in scripts[i]))
+        vec.step(deployments, upgrades)
+        for i in running:
+            references[i].play_turn()
+            vec.games[i].sync_views()
+            assert game_summary(vec.games[i]) == game_summary(references[i])
+            assert vec.done[i] == references[i].is_game_over()
+    assert vec.done.all()
+    assert len(set(vec.current_turn.tolist())) > 1  # Games finished at different turns.
+
+def test_lane_players_are_not_asked_for_decisions():
+    vec = VecTerminalGame(2)
+    vec.step([([(Wall(), (3, 12))], []) for _ in range(2)], [([(3, 12)], []), ([], [])])
+    assert vec.games[0].map.grid[12][3].is_upgraded and not vec.games[1].map.grid[12][3].is_upgraded
+    assert all(game.decisions.computation_time == [0.0, 0.0] for game in vec.games)
@@ -0,0 +1,77 @@
+from termite.game import TerminalGame
+from termite.units import Scout, Structure, Wall, Turret
+from termite.zobrist import TranspositionTable, simulate_action_phase
+from helpers import ScriptedPlayer, play_turns
+
+def rehashed(game):
+    game_map = game.map
+    zobrist = game_map.zobrist
+    game_map.rehash(u for u in game.units if isinstance(u, Structure))
+    return zobrist, game_map.zobrist
+
+def test_incremental_hash_matches_recomputed():
+    game = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    for _ in range(8):
+        game.play_turn()
+        incremental, recomputed = rehashed(game)
+        assert incremental == recomputed
+
+def test_hash_ignores_placement_order():
+    first, second = TerminalGame(), TerminalGame()
+    first.place_unit(first.player1, Wall(), (3, 12))
+    first.place_unit(first.player1, Turret(), (4, 11))
+    second.place_unit(second.player1, Turret(), (4, 11))
+    second.place_unit(second.player1, Wall(), (3, 12))
+    assert first.state_hash() == second.state_hash()
+    first.map.grid[12][3].take_damage(5)
+    assert first.state_hash() != second.state_hash()
+    second.map.grid[12][3].take_damage(5)
+    assert first.state_hash() == second.state_hash()
+
+def test_hash_restored_with_snapshot_and_rollback():
+    game = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    play_turns(game, 2)
+    before = game.state_hash()
+    snapshot = game.snapshot()
+    play_turns(game, 2)
+    game.restore(snapshot)
+    assert game.state_hash() == before
+    game.enable_journal()
+    mark = game.mark()
+    play_turns(game, 2)
+    game.rollback(mark)
+    assert game.state_hash() == before
+
+def test_transposition_table_caches_outcomes():
+    game = TerminalGame(ScriptedPlayer(), ScriptedPlayer())
+    play_turns(game, 2)
+    table = TranspositionTable(capacity=2)
+    attack = ([(Scout(), (13, 0)) for _ in range(5)], [])
+    outcome = table.evaluate(game, attack)
+    assert outcome == simulate_action_phase(game, attack)
+    assert outcome.health_delta[1] < 0
+    assert table.evaluate(game, attack) is outcome
+    assert (table.hits, table.misses) == (1, 1)
+    table.evaluate(game, ([], [(Scout(), (13, 27))]))
+    table.evaluate(game, ([], []))
+    assert len(table) == 2
+    table.evaluate(game, attack)  # Evicted as least recently used.
+    assert table.misses == 4
+
+def test_hash_follows_structures_restored_on_reused_tiles():
+    game = TerminalGame()
+    wall = Wall()
+    game.place_unit(game.player1, wall, (3, 12))
+    snapshot = game.snapshot()
+    wall.take_damage(wall.health)
+    game.remove_destroyed_units()
+    game.place_unit(game.player1, Turret(), (3, 12))
+    game.restore(snapshot)
+    assert game.map.grid[12][3] is wall
+    wall.take_damage(5)
+
+    fresh = TerminalGame()
+    fresh.place_unit(fresh.player1, Wall(), (3, 12))
+    fresh.map.grid[12][3].take_damage(5)
+    assert game.state_hash() == fresh.state_hash()
+    assert game.map.threats.damage(0) == fresh.map.threats.damage(0)